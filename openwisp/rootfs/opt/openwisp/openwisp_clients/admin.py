@@ -1,11 +1,20 @@
 from django import forms
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import Q
+from django.http import HttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
 
+from .bulk import export_clients, guess_format, import_clients, parse
 from .models import (
     Client,
     ClientClassification,
     ClientClassificationSubnet,
     ClientMacAddress,
+    mac_to_int,
+    oui_to_int,
 )
 
 
@@ -30,8 +39,27 @@ class ClientAdminForm(forms.ModelForm):
         js = ("openwisp_clients/psk-generator.js",)
 
 
+class ClientImportForm(forms.Form):
+    file = forms.FileField(help_text="A .csv or .json file")
+
+
+class ClientMacAddressFormSet(forms.BaseInlineFormSet):
+    def clean(self):
+        super().clean()
+        seen = set()
+        for form in self.forms:
+            mac = form.cleaned_data.get("mac_address") if form.is_valid() else None
+            if not mac or form.cleaned_data.get("DELETE"):
+                continue
+            value = mac_to_int(mac)
+            if value in seen:
+                raise ValidationError(f"MAC address {mac} is given more than once.")
+            seen.add(value)
+
+
 class ClientMacAddressInline(admin.TabularInline):
     model = ClientMacAddress
+    formset = ClientMacAddressFormSet
     extra = 1
 
 
@@ -40,8 +68,88 @@ class ClientAdmin(admin.ModelAdmin):
     form = ClientAdminForm
     list_display = ("name", "macs", "classification")
     list_filter = ("classification",)
-    search_fields = ("name", "mac_addresses__mac_address")
+    search_fields = ("name",)
     inlines = (ClientMacAddressInline,)
+    actions = ("export_csv", "export_json")
+    change_list_template = "admin/openwisp_clients/client/change_list.html"
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term
+        )
+        # A MAC address or OUI is looked up on the indexed integer column
+        # instead of scanning the text of every address
+        term = search_term.strip()
+        try:
+            mac_filter = Q(mac_addresses__mac=mac_to_int(term))
+        except ValueError:
+            try:
+                start = oui_to_int(term) << 24
+            except ValueError:
+                return results, may_have_duplicates
+            mac_filter = Q(
+                mac_addresses__mac__gte=start, mac_addresses__mac__lt=start + (1 << 24)
+            )
+        return results | queryset.filter(mac_filter), True
+
+    def get_urls(self):
+        return [
+            path(
+                "import/",
+                self.admin_site.admin_view(self.import_view),
+                name="openwisp_clients_client_import",
+            ),
+            *super().get_urls(),
+        ]
+
+    def import_view(self, request):
+        if not self.has_add_permission(request) or not self.has_change_permission(
+            request
+        ):
+            raise PermissionDenied
+
+        form = ClientImportForm(request.POST or None, request.FILES or None)
+        if form.is_valid():
+            upload = form.cleaned_data["file"]
+            try:
+                content = upload.read().decode("utf-8-sig")
+                result = import_clients(*parse(content, guess_format(upload.name)))
+            except UnicodeDecodeError:
+                form.add_error("file", "The file must be UTF-8 encoded.")
+            except ValidationError as e:
+                for message in e.messages:
+                    form.add_error(None, message)
+            else:
+                self.message_user(
+                    request, f"Imported {upload.name}: {result}", messages.SUCCESS
+                )
+                return redirect("admin:openwisp_clients_client_changelist")
+
+        return TemplateResponse(
+            request,
+            "admin/openwisp_clients/client/import.html",
+            {
+                **self.admin_site.each_context(request),
+                "opts": self.model._meta,
+                "title": "Import clients",
+                "form": form,
+            },
+        )
+
+    def _export(self, queryset, format, content_type):
+        response = HttpResponse(
+            export_clients(format, queryset), content_type=content_type
+        )
+        response["Content-Disposition"] = f'attachment; filename="clients.{format}"'
+        return response
+
+    @admin.action(description="Export selected clients as CSV")
+    def export_csv(self, request, queryset):
+        return self._export(queryset, "csv", "text/csv")
+
+    @admin.action(description="Export selected clients as JSON")
+    def export_json(self, request, queryset):
+        return self._export(queryset, "json", "application/json")
 
     def macs(self, obj):
         return ", ".join(
@@ -0,0 +1,5 @@
+from django.conf import settings
+
+# Seconds to wait after a client change before re-rendering configs, so a
+# burst of changes (an admin save with inlines, an import) renders once
+RERENDER_DELAY = getattr(settings, "OPENWISP_CLIENTS_RERENDER_DELAY", 5)
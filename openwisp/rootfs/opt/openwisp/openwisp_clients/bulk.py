@@ -0,0 +1,345 @@
+"""Bulk import and export of clients, their MAC addresses and classifications.
+
+Clients are matched by name: an import creates new clients, updates the PSK
+and classification of existing ones and replaces their MAC addresses.
+Classifications named by clients are created if they don't exist. Every row
+is validated before anything is written; the writes then happen in one
+transaction with bulk queries, and configs are re-rendered once afterwards.
+
+JSON documents look like::
+
+    {
+        "classifications": [{"name": "iot", "description": "IoT devices"}],
+        "clients": [
+            {
+                "name": "thermostat",
+                "psk": "...",
+                "classification": "iot",
+                "mac_addresses": ["AA:BB:CC:DD:EE:FF"]
+            }
+        ]
+    }
+
+CSV files have a row per client with the columns name, psk, classification
+and mac_addresses (separated by spaces).
+"""
+
+import csv
+import io
+import json
+import re
+from dataclasses import dataclass
+
+from django.core.exceptions import ValidationError
+from django.core.validators import MaxLengthValidator
+from django.db import transaction
+from django.utils import timezone
+
+from .context import classification_variable_error
+from .models import (
+    Client,
+    ClientClassification,
+    ClientMacAddress,
+    mac_to_int,
+    normalize_mac,
+    validate_hostname,
+    validate_mac,
+    validate_psk,
+)
+from .signals import schedule_config_rerender, suppress_config_rerender
+
+FORMATS = ("csv", "json")
+CSV_FIELDS = ("name", "psk", "classification", "mac_addresses")
+BATCH_SIZE = 500
+
+_MAC_SEPARATOR_RE = re.compile(r"[\s,;]+")
+
+
+@dataclass
+class ImportResult:
+    classifications_created: int = 0
+    clients_created: int = 0
+    clients_updated: int = 0
+    mac_addresses_created: int = 0
+    mac_addresses_deleted: int = 0
+
+    def __str__(self):
+        return (
+            f"{self.clients_created} clients created, "
+            f"{self.clients_updated} updated, "
+            f"{self.classifications_created} classifications created, "
+            f"{self.mac_addresses_created} MAC addresses added, "
+            f"{self.mac_addresses_deleted} removed"
+        )
+
+
+def guess_format(filename):
+    return "json" if filename.lower().endswith(".json") else "csv"
+
+
+def parse(content, format):
+    """Parse a CSV or JSON document into (classifications, clients) rows."""
+    if format == "json":
+        try:
+            data = json.loads(content)
+        except ValueError as e:
+            raise ValidationError(f"Invalid JSON: {e}")
+        if isinstance(data, list):
+            data = {"clients": data}
+        if not isinstance(data, dict):
+            raise ValidationError("Expected a JSON object or a list of clients.")
+        classifications = data.get("classifications", [])
+        clients = data.get("clients", [])
+        if not isinstance(classifications, list) or not isinstance(clients, list):
+            raise ValidationError('"classifications" and "clients" must be lists.')
+        return classifications, clients
+
+    reader = csv.DictReader(io.StringIO(content))
+    missing = {"name", "classification"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValidationError(f"Missing CSV columns: {', '.join(sorted(missing))}")
+    clients = [
+        {
+            "name": (row.get("name") or "").strip(),
+            "psk": (row.get("psk") or "").strip(),
+            "classification": (row.get("classification") or "").strip(),
+            "mac_addresses": row.get("mac_addresses") or "",
+        }
+        for row in reader
+    ]
+    return [], clients
+
+
+def import_clients(classifications, clients):
+    """Validate and write parsed rows; raises ValidationError listing every problem."""
+    classifications, clients = _validate(classifications, clients)
+
+    with transaction.atomic():
+        with suppress_config_rerender():
+            result = _write(classifications, clients)
+        schedule_config_rerender()
+    return result
+
+
+def _max_length(model, field_name):
+    return MaxLengthValidator(model._meta.get_field(field_name).max_length)
+
+
+def _validate(classifications, clients):
+    errors = []
+    # Over-long values would otherwise fail in the database mid-import
+    classification_name_length = _max_length(ClientClassification, "name")
+    client_name_length = _max_length(Client, "name")
+    psk_length = _max_length(Client, "psk")
+
+    def check(label, validator, value):
+        try:
+            validator(value)
+        except ValidationError as e:
+            errors.extend(f"{label}: {message}" for message in e.messages)
+
+    valid_classifications = {}
+    for number, row in enumerate(classifications, start=1):
+        if not isinstance(row, dict):
+            errors.append(f"Classification {number}: expected an object")
+            continue
+        name = str(row.get("name") or "").strip()
+        if not name:
+            errors.append(f"Classification {number}: name is required")
+            continue
+        check(f"Classification {number}", classification_name_length, name)
+        valid_classifications[name] = str(row.get("description") or "")
+
+    valid_clients = []
+    names = set()
+    mac_owners = {}
+    for number, row in enumerate(clients, start=1):
+        if not isinstance(row, dict):
+            errors.append(f"Client {number}: expected an object")
+            continue
+        name = str(row.get("name") or "").strip()
+        label = f"Client {number} ({name or 'no name'})"
+        if not name:
+            errors.append(f"{label}: name is required")
+            continue
+        if name in names:
+            errors.append(f"{label}: appears more than once")
+        names.add(name)
+        check(label, client_name_length, name)
+        check(label, validate_hostname, name)
+
+        psk = str(row.get("psk") or "")
+        check(label, psk_length, psk)
+        check(label, validate_psk, psk)
+
+        classification = str(row.get("classification") or "").strip()
+        if not classification:
+            errors.append(f"{label}: classification is required")
+        check(label, classification_name_length, classification)
+
+        macs = row.get("mac_addresses") or []
+        if isinstance(macs, str):
+            macs = [mac for mac in _MAC_SEPARATOR_RE.split(macs) if mac]
+        elif not isinstance(macs, list):
+            errors.append(f"{label}: mac_addresses must be a list or a string")
+            macs = []
+        normalized = []
+        for mac in macs:
+            if not isinstance(mac, str):
+                errors.append(f"{label}: MAC address {mac!r} is not a string")
+                continue
+            check(label, validate_mac, mac)
+            try:
+                mac = normalize_mac(mac)
+            except ValueError:
+                continue
+            normalized.append(mac)
+            owner = mac_owners.setdefault(mac, name)
+            if owner != name:
+                errors.append(f"{label}: MAC address {mac} is also given to {owner}")
+
+        valid_clients.append(
+            {
+                "name": name,
+                "psk": psk,
+                "classification": classification,
+                "mac_addresses": list(dict.fromkeys(normalized)),
+            }
+        )
+
+    # MAC addresses can't move away from clients that aren't being imported
+    taken = ClientMacAddress.objects.exclude(client__name__in=names).filter(
+        mac__in=[mac_to_int(mac) for mac in mac_owners]
+    )
+    for mac, owner in taken.values_list("mac_address", "client__name"):
+        errors.append(f"MAC address {mac} belongs to {owner}, which isn't imported")
+
+    # New classifications must get context variables of their own
+    existing = set(ClientClassification.objects.values_list("name", flat=True))
+    added = set(valid_classifications) | {c["classification"] for c in valid_clients}
+    added = sorted(name for name in added - existing if name)
+    for name in added:
+        error = classification_variable_error(name, existing.union(added))
+        if error:
+            errors.append(f"Classification {error}")
+
+    if errors:
+        raise ValidationError(errors)
+    return valid_classifications, valid_clients
+
+
+def _write(classifications, clients):
+    result = ImportResult()
+
+    names = set(classifications) | {client["classification"] for client in clients}
+    by_name = ClientClassification.objects.in_bulk(names, field_name="name")
+    new_classifications = [
+        ClientClassification(name=name, description=classifications.get(name, ""))
+        for name in sorted(names - set(by_name))
+    ]
+    ClientClassification.objects.bulk_create(new_classifications, batch_size=BATCH_SIZE)
+    result.classifications_created = len(new_classifications)
+    changed_descriptions = []
+    for name, description in classifications.items():
+        classification = by_name.get(name)
+        if classification and classification.description != description:
+            classification.description = description
+            changed_descriptions.append(classification)
+    ClientClassification.objects.bulk_update(
+        changed_descriptions, ["description"], batch_size=BATCH_SIZE
+    )
+    by_name.update((c.name, c) for c in new_classifications)
+
+    existing = Client.objects.in_bulk([c["name"] for c in clients], field_name="name")
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for row in clients:
+        classification = by_name[row["classification"]]
+        client = existing.get(row["name"])
+        if client is None:
+            to_create.append(
+                Client(name=row["name"], psk=row["psk"], classification=classification)
+            )
+        elif client.psk != row["psk"] or client.classification_id != classification.pk:
+            client.psk = row["psk"]
+            client.classification = classification
+            client.updated_at = now
+            to_update.append(client)
+    Client.objects.bulk_create(to_create, batch_size=BATCH_SIZE)
+    Client.objects.bulk_update(
+        to_update, ["psk", "classification", "updated_at"], batch_size=BATCH_SIZE
+    )
+    result.clients_created = len(to_create)
+    result.clients_updated = len(to_update)
+
+    # Replace each imported client's MAC addresses, leaving unchanged ones be
+    clients_by_name = {**existing, **{client.name: client for client in to_create}}
+    wanted = {
+        (clients_by_name[row["name"]].pk, mac)
+        for row in clients
+        for mac in row["mac_addresses"]
+    }
+    current = {
+        (client_id, mac): pk
+        for pk, client_id, mac in ClientMacAddress.objects.filter(
+            client__in=clients_by_name.values()
+        ).values_list("pk", "client_id", "mac_address")
+    }
+    stale = [pk for key, pk in current.items() if key not in wanted]
+    if stale:
+        result.mac_addresses_deleted, _ = ClientMacAddress.objects.filter(
+            pk__in=stale
+        ).delete()
+    # bulk_create doesn't call save(), so the integer is set here
+    new_macs = [
+        ClientMacAddress(client_id=client_id, mac_address=mac, mac=mac_to_int(mac))
+        for client_id, mac in sorted(wanted - set(current))
+    ]
+    ClientMacAddress.objects.bulk_create(new_macs, batch_size=BATCH_SIZE)
+    result.mac_addresses_created = len(new_macs)
+    return result
+
+
+def export_clients(format, queryset=None):
+    """Serialize clients (all, or a queryset) in a format import_clients accepts."""
+    if queryset is None:
+        queryset = Client.objects.all()
+    queryset = (
+        queryset.select_related("classification")
+        .prefetch_related("mac_addresses")
+        .order_by("pk")
+    )
+    rows = [
+        {
+            "name": client.name,
+            "psk": client.psk,
+            "classification": client.classification.name,
+            "mac_addresses": sorted(
+                mac.mac_address for mac in client.mac_addresses.all() if mac.mac_address
+            ),
+        }
+        for client in queryset.iterator(chunk_size=BATCH_SIZE)
+    ]
+
+    if format == "json":
+        classifications = ClientClassification.objects.filter(
+            name__in={row["classification"] for row in rows}
+        ).order_by("pk")
+        return json.dumps(
+            {
+                "classifications": [
+                    {"name": c.name, "description": c.description}
+                    for c in classifications
+                ],
+                "clients": rows,
+            },
+            indent=2,
+        )
+
+    output = io.StringIO()
+    writer = csv.DictWriter(output, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for row in rows:
+        writer.writerow({**row, "mac_addresses": " ".join(row["mac_addresses"])})
+    return output.getvalue()
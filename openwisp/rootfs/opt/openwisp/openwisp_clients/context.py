@@ -1,14 +1,154 @@
+import hashlib
+import io
 import json
+import logging
+import re
+import threading
+import time
 
 from django.apps import apps
+from django.core.cache import cache
+from django.db.models import Prefetch
+
+# The cached context is stored under a version that is bumped whenever client
+# data changes, so every process (uWSGI workers, Celery) stops using the old
+# one at once without having to delete it.
+CONTEXT_VERSION_KEY = "openwisp_clients:context:version"
+CONTEXT_KEY = "openwisp_clients:context:{version}"
+CONTEXT_TIMEOUT = 24 * 60 * 60
+
+# Suffix of a classification's variables: "IoT devices" -> clients_iot_devices
+_VARIABLE_SUFFIX_RE = re.compile(r"[^a-z0-9]+")
+
+_ENCODER = json.JSONEncoder(separators=(",", ":"))
+
+logger = logging.getLogger(__name__)
+
+# In-process copy of the context for the current version: (version, context)
+_local_context = (None, None)
+_local_lock = threading.Lock()
 
 
 def get_clients_config_context(config=None):
+    global _local_context
+
+    version = _get_context_version()
+    local_version, context = _local_context
+    if local_version == version:
+        return context
+
+    key = CONTEXT_KEY.format(version=version)
+    context = cache.get(key)
+    if context is None:
+        context = build_clients_config_context()
+        cache.set(key, context, CONTEXT_TIMEOUT)
+
+    with _local_lock:
+        _local_context = (version, context)
+    return context
+
+
+def invalidate_clients_config_context():
+    try:
+        cache.incr(CONTEXT_VERSION_KEY)
+    except ValueError:
+        _get_context_version()
+
+
+def _get_context_version():
+    version = cache.get(CONTEXT_VERSION_KEY)
+    if version is None:
+        # No version yet, or it was evicted: start from one that can't match a
+        # context cached under an earlier version.
+        cache.add(CONTEXT_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(CONTEXT_VERSION_KEY)
+    return version
+
+
+def classification_variable(name):
+    """Name of the context variable holding a classification's clients."""
+    return "clients_" + _VARIABLE_SUFFIX_RE.sub("_", name.lower()).strip("_")
+
+
+def hash_variable(variable):
+    # Variable names never contain "__", so this can't name another variable
+    return f"{variable}__hash"
+
+
+def classification_variable_error(name, other_names):
+    """Why a classification can't be named `name` alongside `other_names`, or None."""
+    variable = classification_variable(name)
+    if variable == "clients_":
+        return f'"{name}" needs a letter or digit to name its context variable.'
+    for other in other_names:
+        if other != name and classification_variable(other) == variable:
+            return (
+                f'"{name}" would share the context variable {variable} '
+                f'with "{other}".'
+            )
+    return None
+
+
+class _JsonArrayWriter:
+    """Encode a JSON array one item at a time."""
+
+    def __init__(self):
+        self._buffer = io.StringIO()
+        self._buffer.write("[")
+        self._empty = True
+
+    def append(self, encoded_item):
+        if not self._empty:
+            self._buffer.write(",")
+        self._buffer.write(encoded_item)
+        self._empty = False
+
+    def getvalue(self):
+        return self._buffer.getvalue() + "]"
+
+
+def build_clients_config_context():
+    """Context with every client, plus variables per classification.
+
+    "clients" holds every client as JSON. For each classification,
+    "clients_<classification>" holds only its clients, so a device that
+    serves one classification renders (and changes checksum) only when
+    those clients change. Each variable has a "<variable>__hash" with a
+    SHA-256 of its value, for templates that only need to notice changes.
+
+    Clients, their MAC addresses and classifications are ordered by primary
+    key and encoded compactly as they are read, so the same data always
+    renders the same value and only one client is held decoded at a time.
+    """
     Client = apps.get_model("openwisp_clients", "Client")
+    ClientClassification = apps.get_model("openwisp_clients", "ClientClassification")
+    ClientMacAddress = apps.get_model("openwisp_clients", "ClientMacAddress")
 
-    clients = []
-    queryset = Client.objects.select_related("classification").prefetch_related(
-        "mac_addresses"
+    clients = _JsonArrayWriter()
+    # Every classification gets its variables, even without clients
+    clients_by_variable = {}
+    variable_owners = {}
+    for name in ClientClassification.objects.order_by("pk").values_list(
+        "name", flat=True
+    ):
+        variable = classification_variable(name)
+        if variable in variable_owners or variable == "clients_":
+            # Saved before names were checked; the oldest classification wins
+            logger.warning(
+                "Classification %r has no context variable: %s is taken by %r",
+                name,
+                variable,
+                variable_owners.get(variable),
+            )
+            continue
+        variable_owners[variable] = name
+        clients_by_variable[variable] = _JsonArrayWriter()
+    queryset = (
+        Client.objects.select_related("classification")
+        .prefetch_related(
+            Prefetch("mac_addresses", queryset=ClientMacAddress.objects.order_by("pk"))
+        )
+        .order_by("pk")
     )
     for client in queryset.iterator(chunk_size=200):
         classification = None
@@ -18,18 +158,26 @@ def get_clients_config_context(config=None):
                 "name": client.classification.name,
                 "description": client.classification.description,
             }
-        clients.append(
-            {
-                "id": client.id,
-                "name": client.name,
-                "psk": client.psk,
-                "classification": classification,
-                "mac_addresses": [
-                    mac.mac_address
-                    for mac in client.mac_addresses.all()
-                    if mac.mac_address
-                ],
-            }
-        )
+        entry = {
+            "id": client.id,
+            "name": client.name,
+            "psk": client.psk,
+            "classification": classification,
+            "mac_addresses": [
+                mac.mac_address for mac in client.mac_addresses.all() if mac.mac_address
+            ],
+        }
+        encoded = _ENCODER.encode(entry)
+        clients.append(encoded)
+        if classification is not None:
+            variable = classification_variable(classification["name"])
+            if variable_owners.get(variable) == classification["name"]:
+                clients_by_variable[variable].append(encoded)
 
-    return {"clients": json.dumps(clients)}
+    context = {}
+    variables = [("clients", clients), *clients_by_variable.items()]
+    for variable, writer in variables:
+        value = writer.getvalue()
+        context[variable] = value
+        context[hash_variable(variable)] = hashlib.sha256(value.encode()).hexdigest()
+    return context
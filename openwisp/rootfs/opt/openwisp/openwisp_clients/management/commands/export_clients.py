@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ...bulk import FORMATS, export_clients
+
+
+class Command(BaseCommand):
+    help = "Export clients, MAC addresses and classifications as CSV or JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=FORMATS, default="json")
+        parser.add_argument("--output", help="file to write; defaults to stdout")
+
+    def handle(self, format, output=None, **options):
+        content = export_clients(format)
+        if output is None:
+            self.stdout.write(content, ending="")
+            return
+        with open(output, "w", encoding="utf-8", newline="") as file:
+            file.write(content)
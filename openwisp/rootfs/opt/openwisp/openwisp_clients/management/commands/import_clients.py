@@ -0,0 +1,24 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from ...bulk import FORMATS, guess_format, import_clients, parse
+
+
+class Command(BaseCommand):
+    help = "Import clients, MAC addresses and classifications from CSV or JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument(
+            "--format", choices=FORMATS, help="defaults to the file's extension"
+        )
+
+    def handle(self, path, format=None, **options):
+        with open(path, encoding="utf-8") as file:
+            content = file.read()
+
+        try:
+            result = import_clients(*parse(content, format or guess_format(path)))
+        except ValidationError as e:
+            raise CommandError("\n".join(e.messages))
+        self.stdout.write(self.style.SUCCESS(f"Imported {path}: {result}"))
@@ -0,0 +1,93 @@
+import re
+
+from django.db import migrations, models
+
+import openwisp_clients.models
+
+# Copies of the helpers in openwisp_clients.models as of this migration, so
+# later changes to them can't change what this migration does
+_MAC_SEPARATORS_RE = re.compile(r"[:.\-]")
+_MAC_HEX_RE = re.compile(r"^[0-9A-Fa-f]{12}$")
+
+
+def mac_to_int(value):
+    digits = _MAC_SEPARATORS_RE.sub("", value.strip())
+    if not _MAC_HEX_RE.match(digits):
+        raise ValueError(f"Not a MAC address: {value!r}")
+    return int(digits, 16)
+
+
+def int_to_mac(value):
+    digits = f"{value:012X}"
+    return ":".join(digits[i : i + 2] for i in range(0, 12, 2))
+
+
+def normalize_client_macs(apps, schema_editor):
+    ClientMacAddress = apps.get_model("openwisp_clients", "ClientMacAddress")
+    rows = ClientMacAddress.objects.order_by("pk").values_list(
+        "pk", "client_id", "client__name", "mac_address"
+    )
+    # integer value -> (pk, client id, client name, address) of each row
+    by_value = {}
+    for pk, client_id, client_name, mac_address in rows.iterator(chunk_size=200):
+        if not mac_address:
+            continue
+        try:
+            value = mac_to_int(mac_address)
+        except ValueError:
+            continue
+        by_value.setdefault(value, []).append((pk, client_id, client_name, mac_address))
+
+    # Addresses that only differed in case or notation. Within one client they
+    # are the same address twice, so the first one wins; across clients only
+    # an admin can tell which client really has the device.
+    conflicts = []
+    duplicates = []
+    for value, matches in by_value.items():
+        if len({client_id for _, client_id, _, _ in matches}) > 1:
+            conflicts.append(
+                f"{int_to_mac(value)}: "
+                + ", ".join(
+                    f"pk {pk} {mac_address!r} of client {client_name!r}"
+                    for pk, _, client_name, mac_address in matches
+                )
+            )
+        else:
+            duplicates.extend(pk for pk, _, _, _ in matches[1:])
+    if conflicts:
+        raise RuntimeError(
+            "These MAC addresses are given to more than one client; remove all "
+            "but one of each before migrating:\n" + "\n".join(conflicts)
+        )
+
+    # mac_address is still unique here, so duplicates go before rewriting any
+    ClientMacAddress.objects.filter(pk__in=duplicates).delete()
+    for value, matches in by_value.items():
+        ClientMacAddress.objects.filter(pk=matches[0][0]).update(
+            mac=value, mac_address=int_to_mac(value)
+        )
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("openwisp_clients", "0002_client_macs_and_psk"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="clientmacaddress",
+            name="mac",
+            field=models.BigIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(normalize_client_macs, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="clientmacaddress",
+            name="mac",
+            field=models.BigIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name="clientmacaddress",
+            name="mac_address",
+            field=models.CharField(blank=True, default="", max_length=17, validators=[openwisp_clients.models.validate_mac]),
+        ),
+    ]
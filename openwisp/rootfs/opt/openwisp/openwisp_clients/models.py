@@ -4,11 +4,42 @@ from django.core.exceptions import ValidationError
 from django.db import models
 from swapper import get_model_name
 
+from .context import classification_variable_error
+
 
 _HOSTNAME_RE = re.compile(
     r"^(?=.{1,255}$)([A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?)(\\.([A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?))*$"
 )
-_MAC_RE = re.compile(r"^([0-9A-Fa-f]{2}:){5}[0-9A-Fa-f]{2}$")
+# AA:BB:CC:DD:EE:FF, AA-BB-CC-DD-EE-FF, AABB.CCDD.EEFF or AABBCCDDEEFF
+_MAC_SEPARATORS_RE = re.compile(r"[:.\-]")
+_MAC_HEX_RE = re.compile(r"^[0-9A-Fa-f]{12}$")
+_OUI_HEX_RE = re.compile(r"^[0-9A-Fa-f]{6}$")
+
+
+def mac_to_int(value):
+    """The 48-bit integer of a MAC address in any common notation."""
+    digits = _MAC_SEPARATORS_RE.sub("", value.strip())
+    if not _MAC_HEX_RE.match(digits):
+        raise ValueError(f"Not a MAC address: {value!r}")
+    return int(digits, 16)
+
+
+def int_to_mac(value):
+    digits = f"{value:012X}"
+    return ":".join(digits[i : i + 2] for i in range(0, 12, 2))
+
+
+def normalize_mac(value):
+    """A MAC address in canonical form: upper case, colon separated."""
+    return int_to_mac(mac_to_int(value))
+
+
+def oui_to_int(value):
+    """The 24-bit integer of an OUI (the first three bytes of a MAC address)."""
+    digits = _MAC_SEPARATORS_RE.sub("", value.strip())
+    if not _OUI_HEX_RE.match(digits):
+        raise ValueError(f"Not an OUI: {value!r}")
+    return int(digits, 16)
 
 
 def validate_hostname(value):
@@ -19,7 +50,9 @@ def validate_hostname(value):
 def validate_mac(value):
     if value in ("", None):
         return
-    if not _MAC_RE.match(value):
+    try:
+        mac_to_int(value)
+    except ValueError:
         raise ValidationError("Enter a valid MAC address (AA:BB:CC:DD:EE:FF).")
 
 
@@ -44,6 +77,14 @@ class ClientClassification(models.Model):
     def __str__(self):
         return self.name
 
+    def clean(self):
+        others = ClientClassification.objects.exclude(pk=self.pk).values_list(
+            "name", flat=True
+        )
+        error = classification_variable_error(self.name, others)
+        if error:
+            raise ValidationError({"name": error})
+
 
 class ClientClassificationSubnet(models.Model):
     classification = models.ForeignKey(
@@ -85,17 +126,32 @@ class Client(models.Model):
         return self.name
 
 
+class ClientMacAddressQuerySet(models.QuerySet):
+    def matching(self, mac):
+        """MAC addresses equal to a MAC in any notation; an index seek."""
+        return self.filter(mac=mac_to_int(mac))
+
+    def in_oui(self, oui):
+        """MAC addresses with an OUI such as "AA:BB:CC"; an index range scan."""
+        start = oui_to_int(oui) << 24
+        return self.filter(mac__gte=start, mac__lt=start + (1 << 24))
+
+
 class ClientMacAddress(models.Model):
     client = models.ForeignKey(
         Client, on_delete=models.CASCADE, related_name="mac_addresses"
     )
+    # Canonical form of the address, kept in step with `mac` by save()
     mac_address = models.CharField(
         max_length=17,
-        unique=True,
         blank=True,
         default="",
         validators=[validate_mac],
     )
+    # The address as a 48-bit integer, for indexed exact and OUI lookups
+    mac = models.BigIntegerField(unique=True, null=True, blank=True, editable=False)
+
+    objects = ClientMacAddressQuerySet.as_manager()
 
     class Meta:
         verbose_name = "Client MAC address"
@@ -103,3 +159,25 @@ class ClientMacAddress(models.Model):
 
     def __str__(self):
         return f"{self.client} - {self.mac_address or 'blank'}"
+
+    def normalize(self):
+        if self.mac_address:
+            self.mac = mac_to_int(self.mac_address)
+            self.mac_address = int_to_mac(self.mac)
+        else:
+            self.mac = None
+
+    def clean(self):
+        try:
+            self.normalize()
+        except ValueError:
+            return  # reported by the field validator
+        duplicate = ClientMacAddress.objects.filter(mac=self.mac).exclude(pk=self.pk)
+        if self.mac is not None and duplicate.exists():
+            raise ValidationError(
+                {"mac_address": "This MAC address is already assigned to a client."}
+            )
+
+    def save(self, *args, **kwargs):
+        self.normalize()
+        super().save(*args, **kwargs)
@@ -1,27 +1,88 @@
+import contextlib
+import logging
+import threading
+
+from django.core.cache import cache
 from django.db import transaction
 from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
+from swapper import load_model
 
+from . import app_settings, usage
+from .context import invalidate_clients_config_context
 from .models import Client, ClientClassification, ClientMacAddress
+from .tasks import RERENDER_PENDING_KEY, rerender_client_configs
+
+logger = logging.getLogger(__name__)
+
+_suppressed = threading.local()
+
+
+@contextlib.contextmanager
+def suppress_config_rerender():
+    """Don't re-render configs for the client changes made in this block.
+
+    For bulk writes, which schedule a single re-render themselves afterwards.
+    """
+    _suppressed.active = True
+    try:
+        yield
+    finally:
+        _suppressed.active = False
+
 
+def schedule_config_rerender():
+    """Re-render the configs using the clients context once this transaction commits."""
+    if getattr(_suppressed, "active", False):
+        return
 
-def _schedule_config_rerender():
-    from openwisp_controller.config.models import Config
+    # One re-render per transaction, however many rows it changed
+    connection = transaction.get_connection()
+    if any(func is _enqueue_rerender for _, func, *_ in connection.run_on_commit):
+        return
+    transaction.on_commit(_enqueue_rerender)
 
-    def _rerender():
-        for config in Config.objects.all().iterator(chunk_size=200):
-            config.update_status_if_checksum_changed()
 
-    transaction.on_commit(_rerender)
+def _enqueue_rerender():
+    # Renders from now on see the committed clients
+    invalidate_clients_config_context()
+
+    # A pass already queued will see this change too
+    timeout = app_settings.RERENDER_DELAY * 10
+    if not cache.add(RERENDER_PENDING_KEY, True, timeout=timeout):
+        return
+    try:
+        rerender_client_configs.apply_async(countdown=app_settings.RERENDER_DELAY)
+    except Exception:
+        cache.delete(RERENDER_PENDING_KEY)
+        logger.exception("Failed to queue config re-render after client change")
 
 
 @receiver(post_save, sender=Client)
 @receiver(post_delete, sender=Client)
 def _client_changed(*args, **kwargs):
-    _schedule_config_rerender()
+    schedule_config_rerender()
 
 
 @receiver(post_save, sender=ClientMacAddress)
 @receiver(post_delete, sender=ClientMacAddress)
 def _client_mac_changed(*args, **kwargs):
-    _schedule_config_rerender()
+    schedule_config_rerender()
+
+
+@receiver(post_save, sender=ClientClassification)
+@receiver(post_delete, sender=ClientClassification)
+def _client_classification_changed(*args, **kwargs):
+    schedule_config_rerender()
+
+
+@receiver(post_save, sender=load_model("config", "Template"))
+@receiver(post_delete, sender=load_model("config", "Template"))
+def _template_changed(instance, signal, **kwargs):
+    usage.update_usage("templates", instance, deleted=signal is post_delete)
+
+
+@receiver(post_save, sender=load_model("config", "Config"))
+@receiver(post_delete, sender=load_model("config", "Config"))
+def _config_changed(instance, signal, **kwargs):
+    usage.update_usage("configs", instance, deleted=signal is post_delete)
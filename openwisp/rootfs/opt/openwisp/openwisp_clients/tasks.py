@@ -0,0 +1,14 @@
+from celery import shared_task
+from django.core.cache import cache
+
+from .usage import get_consuming_configs
+
+RERENDER_PENDING_KEY = "openwisp_clients:rerender:pending"
+
+
+@shared_task
+def rerender_client_configs():
+    # Changes committed from now on schedule another pass
+    cache.delete(RERENDER_PENDING_KEY)
+    for config in get_consuming_configs().iterator(chunk_size=200):
+        config.update_status_if_checksum_changed()
@@ -0,0 +1,155 @@
+from django.core.exceptions import ValidationError
+from django.test import TestCase
+
+from .. import bulk
+from ..models import Client, ClientClassification, ClientMacAddress
+
+PSK = "correct horse battery"
+
+
+class BulkImportValidationTest(TestCase):
+    def import_errors(self, clients, classifications=()):
+        with self.assertRaises(ValidationError) as raised:
+            bulk.import_clients(list(classifications), clients)
+        # Every row is validated before anything is written
+        self.assertFalse(Client.objects.exists())
+        return raised.exception.messages
+
+    def assertMentioned(self, fragment, messages):
+        self.assertTrue(
+            any(fragment in message for message in messages),
+            f"{fragment!r} not in {messages}",
+        )
+
+    def client(self, **row):
+        return {"name": "thermostat", "psk": PSK, "classification": "iot", **row}
+
+    def test_overlong_classification_names_are_rejected(self):
+        name = "x" * 101
+        messages = self.import_errors(
+            [self.client(classification=name)],
+            [{"name": name, "description": ""}],
+        )
+        self.assertMentioned(
+            "Classification 1: Ensure this value has at most 100", messages
+        )
+        self.assertMentioned(
+            "Client 1 (thermostat): Ensure this value has at most 100", messages
+        )
+
+    def test_overlong_psks_are_rejected(self):
+        messages = self.import_errors([self.client(psk="a" * 65)])
+        self.assertMentioned("at most 64 characters", messages)
+
+    def test_overlong_client_names_are_rejected(self):
+        messages = self.import_errors([self.client(name="a" * 256)])
+        self.assertMentioned("at most 255 characters", messages)
+
+    def test_rows_of_the_wrong_type_are_rejected(self):
+        messages = self.import_errors(
+            ["thermostat", self.client(mac_addresses={"mac": "AA:BB:CC:DD:EE:FF"})],
+            ["iot"],
+        )
+        self.assertMentioned("Classification 1: expected an object", messages)
+        self.assertMentioned("Client 1: expected an object", messages)
+        self.assertMentioned("mac_addresses must be a list or a string", messages)
+
+    def test_every_problem_is_reported(self):
+        messages = self.import_errors(
+            [
+                self.client(mac_addresses=["not a mac"]),
+                self.client(name="doorbell", mac_addresses="aa-bb-cc-dd-ee-ff"),
+                self.client(name="camera", mac_addresses=["AABB.CCDD.EEFF"]),
+                self.client(name="doorbell"),
+            ]
+        )
+        self.assertMentioned("Enter a valid MAC address", messages)
+        self.assertMentioned(
+            "MAC address AA:BB:CC:DD:EE:FF is also given to doorbell", messages
+        )
+        self.assertMentioned("Client 4 (doorbell): appears more than once", messages)
+
+    def test_macs_of_clients_not_imported_are_rejected(self):
+        classification = ClientClassification.objects.create(name="iot")
+        owner = Client.objects.create(name="camera", classification=classification)
+        ClientMacAddress.objects.create(client=owner, mac_address="AA:BB:CC:DD:EE:FF")
+
+        with self.assertRaises(ValidationError) as raised:
+            bulk.import_clients([], [self.client(mac_addresses=["aabbccddeeff"])])
+        self.assertMentioned(
+            "AA:BB:CC:DD:EE:FF belongs to camera", raised.exception.messages
+        )
+
+    def test_classifications_sharing_a_variable_are_rejected(self):
+        messages = self.import_errors(
+            [self.client(classification="IoT devices")],
+            [{"name": "iot-devices"}],
+        )
+        self.assertMentioned("would share the context variable", messages)
+
+
+class BulkImportTest(TestCase):
+    def test_import_creates_and_normalizes(self):
+        result = bulk.import_clients(
+            [{"name": "iot", "description": "IoT devices"}],
+            [
+                {
+                    "name": "thermostat",
+                    "psk": PSK,
+                    "classification": "iot",
+                    "mac_addresses": "aa-bb-cc-dd-ee-ff AABB.CCDD.EE00",
+                }
+            ],
+        )
+        self.assertEqual(result.clients_created, 1)
+        self.assertEqual(result.classifications_created, 1)
+        client = Client.objects.get(name="thermostat")
+        self.assertEqual(client.classification.description, "IoT devices")
+        self.assertEqual(
+            sorted(client.mac_addresses.values_list("mac_address", "mac")),
+            [
+                ("AA:BB:CC:DD:EE:00", 0xAABBCCDDEE00),
+                ("AA:BB:CC:DD:EE:FF", 0xAABBCCDDEEFF),
+            ],
+        )
+
+    def test_reimport_replaces_macs_and_updates_clients(self):
+        row = {
+            "name": "thermostat",
+            "psk": PSK,
+            "classification": "iot",
+            "mac_addresses": ["AA:BB:CC:DD:EE:FF", "AA:BB:CC:DD:EE:00"],
+        }
+        bulk.import_clients([], [row])
+        result = bulk.import_clients(
+            [], [{**row, "psk": "", "mac_addresses": ["aa:bb:cc:dd:ee:ff"]}]
+        )
+        self.assertEqual(result.clients_updated, 1)
+        self.assertEqual(result.mac_addresses_created, 0)
+        self.assertEqual(result.mac_addresses_deleted, 1)
+        client = Client.objects.get(name="thermostat")
+        self.assertEqual(client.psk, "")
+        self.assertEqual(
+            list(client.mac_addresses.values_list("mac_address", flat=True)),
+            ["AA:BB:CC:DD:EE:FF"],
+        )
+
+    def test_export_round_trips(self):
+        bulk.import_clients(
+            [{"name": "iot", "description": "IoT devices"}],
+            [
+                {
+                    "name": "thermostat",
+                    "psk": PSK,
+                    "classification": "iot",
+                    "mac_addresses": ["AA:BB:CC:DD:EE:FF"],
+                }
+            ],
+        )
+        for format in bulk.FORMATS:
+            exported = bulk.export_clients(format)
+            result = bulk.import_clients(*bulk.parse(exported, format))
+            self.assertEqual(result.clients_created, 0)
+            self.assertEqual(result.clients_updated, 0)
+            self.assertEqual(result.mac_addresses_created, 0)
+            self.assertEqual(result.mac_addresses_deleted, 0)
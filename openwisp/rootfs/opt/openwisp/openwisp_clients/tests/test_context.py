@@ -0,0 +1,66 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from .. import context
+from ..models import Client, ClientClassification
+
+LOCMEM_CACHES = {
+    "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ContextVersionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        context._local_context = (None, None)
+        self.addCleanup(setattr, context, "_local_context", (None, None))
+
+    def build_counted(self):
+        return mock.patch.object(
+            context,
+            "build_clients_config_context",
+            wraps=context.build_clients_config_context,
+        )
+
+    def test_context_is_built_once_per_version(self):
+        with self.build_counted() as build:
+            first = context.get_clients_config_context()
+            second = context.get_clients_config_context()
+        self.assertEqual(build.call_count, 1)
+        self.assertEqual(first, second)
+
+    def test_invalidating_rebuilds_with_the_new_data(self):
+        context.get_clients_config_context()
+        classification = ClientClassification.objects.create(name="iot")
+        Client.objects.create(name="thermostat", classification=classification)
+
+        context.invalidate_clients_config_context()
+        with self.build_counted() as build:
+            result = context.get_clients_config_context()
+        self.assertEqual(build.call_count, 1)
+        self.assertIn('"name":"thermostat"', result["clients"])
+
+    def test_other_processes_share_the_cached_context(self):
+        context.get_clients_config_context()
+        # Another process bumped the version and cached its context
+        context.invalidate_clients_config_context()
+        version = context._get_context_version()
+        shared = {"clients": "[]", "clients__hash": "shared"}
+        cache.set(context.CONTEXT_KEY.format(version=version), shared)
+
+        with self.build_counted() as build:
+            self.assertEqual(context.get_clients_config_context(), shared)
+        build.assert_not_called()
+
+    def test_evicted_version_does_not_reuse_an_old_one(self):
+        old = context._get_context_version()
+        context.invalidate_clients_config_context()
+        cache.delete(context.CONTEXT_VERSION_KEY)
+        self.assertNotIn(context._get_context_version(), (old, old + 1))
+
+    def test_invalidating_without_a_version_starts_one(self):
+        context.invalidate_clients_config_context()
+        self.assertIsNotNone(cache.get(context.CONTEXT_VERSION_KEY))
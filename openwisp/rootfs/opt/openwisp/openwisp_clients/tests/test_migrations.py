@@ -0,0 +1,88 @@
+import importlib
+
+from django.apps import apps
+from django.test import TestCase
+
+from ..models import (
+    Client,
+    ClientClassification,
+    ClientMacAddress,
+    int_to_mac,
+    mac_to_int,
+)
+
+migration = importlib.import_module("openwisp_clients.migrations.0003_client_mac_int")
+
+
+class NormalizeClientMacsTest(TestCase):
+    """normalize_client_macs, run against rows saved as 0002 left them."""
+
+    def setUp(self):
+        classification = ClientClassification.objects.create(name="iot")
+        self.thermostat = Client.objects.create(
+            name="thermostat", classification=classification
+        )
+        self.doorbell = Client.objects.create(
+            name="doorbell", classification=classification
+        )
+
+    def add_macs(self, *rows):
+        # bulk_create skips save(), so addresses keep their original notation
+        return ClientMacAddress.objects.bulk_create(
+            ClientMacAddress(client=client, mac_address=mac_address)
+            for client, mac_address in rows
+        )
+
+    def test_addresses_are_normalized(self):
+        mac, blank = self.add_macs(
+            (self.thermostat, "aa-bb-cc-dd-ee-0f"), (self.thermostat, "")
+        )
+        migration.normalize_client_macs(apps, None)
+
+        mac.refresh_from_db()
+        self.assertEqual(mac.mac_address, "AA:BB:CC:DD:EE:0F")
+        self.assertEqual(mac.mac, 0xAABBCCDDEE0F)
+        blank.refresh_from_db()
+        self.assertIsNone(blank.mac)
+
+    def test_duplicates_within_a_client_are_merged(self):
+        first, _ = self.add_macs(
+            (self.thermostat, "aa:bb:cc:dd:ee:0f"),
+            (self.thermostat, "AABB.CCDD.EE0F"),
+        )
+        migration.normalize_client_macs(apps, None)
+
+        self.assertEqual(
+            list(ClientMacAddress.objects.values_list("pk", "mac_address")),
+            [(first.pk, "AA:BB:CC:DD:EE:0F")],
+        )
+
+    def test_duplicates_across_clients_stop_the_migration(self):
+        first, second = self.add_macs(
+            (self.thermostat, "aa:bb:cc:dd:ee:0f"),
+            (self.doorbell, "AA-BB-CC-DD-EE-0F"),
+        )
+        with self.assertRaises(RuntimeError) as raised:
+            migration.normalize_client_macs(apps, None)
+
+        message = str(raised.exception)
+        self.assertIn(
+            f"pk {first.pk} 'aa:bb:cc:dd:ee:0f' of client 'thermostat'", message
+        )
+        self.assertIn(
+            f"pk {second.pk} 'AA-BB-CC-DD-EE-0F' of client 'doorbell'", message
+        )
+        # Nothing was deleted or rewritten
+        self.assertEqual(
+            sorted(ClientMacAddress.objects.values_list("mac_address", flat=True)),
+            ["AA-BB-CC-DD-EE-0F", "aa:bb:cc:dd:ee:0f"],
+        )
+
+    def test_helpers_match_the_models(self):
+        for value in ("aa-bb-cc-dd-ee-0f", "AABB.CCDD.EE0F", "aabbccddee0f"):
+            with self.subTest(value=value):
+                self.assertEqual(migration.mac_to_int(value), mac_to_int(value))
+                self.assertEqual(
+                    migration.int_to_mac(mac_to_int(value)),
+                    int_to_mac(mac_to_int(value)),
+                )
@@ -0,0 +1,82 @@
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+
+from ..models import (
+    Client,
+    ClientClassification,
+    ClientMacAddress,
+    int_to_mac,
+    mac_to_int,
+    normalize_mac,
+    oui_to_int,
+)
+
+
+class MacConversionTest(SimpleTestCase):
+    def test_common_notations_convert_to_the_same_integer(self):
+        for value in (
+            "AA:BB:CC:DD:EE:0F",
+            "aa:bb:cc:dd:ee:0f",
+            "AA-BB-CC-DD-EE-0F",
+            "AABB.CCDD.EE0F",
+            "aabbccddee0f",
+            " AA:BB:CC:DD:EE:0F\n",
+        ):
+            with self.subTest(value=value):
+                self.assertEqual(mac_to_int(value), 0xAABBCCDDEE0F)
+
+    def test_invalid_addresses_are_rejected(self):
+        for value in (
+            "",
+            "AA:BB:CC:DD:EE",
+            "AA:BB:CC:DD:EE:FF:00",
+            "GG:BB:CC:DD:EE:FF",
+        ):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    mac_to_int(value)
+
+    def test_integers_convert_to_canonical_form(self):
+        self.assertEqual(int_to_mac(0), "00:00:00:00:00:00")
+        self.assertEqual(int_to_mac(0xAABBCCDDEE0F), "AA:BB:CC:DD:EE:0F")
+        self.assertEqual(int_to_mac(2**48 - 1), "FF:FF:FF:FF:FF:FF")
+        self.assertEqual(normalize_mac("aabb.ccdd.ee0f"), "AA:BB:CC:DD:EE:0F")
+
+    def test_ouis_convert_to_24_bit_integers(self):
+        self.assertEqual(oui_to_int("aa-bb-cc"), 0xAABBCC)
+        with self.assertRaises(ValueError):
+            oui_to_int("AA:BB:CC:DD")
+
+
+class ClientMacAddressTest(TestCase):
+    def setUp(self):
+        classification = ClientClassification.objects.create(name="iot")
+        self.client_ = Client.objects.create(
+            name="thermostat", classification=classification
+        )
+
+    def add_mac(self, mac_address):
+        return ClientMacAddress.objects.create(
+            client=self.client_, mac_address=mac_address
+        )
+
+    def test_save_normalizes_and_stores_the_integer(self):
+        mac = self.add_mac("aa-bb-cc-dd-ee-0f")
+        self.assertEqual(mac.mac_address, "AA:BB:CC:DD:EE:0F")
+        self.assertEqual(mac.mac, 0xAABBCCDDEE0F)
+
+        mac.mac_address = ""
+        mac.save()
+        self.assertIsNone(mac.mac)
+
+    def test_lookups_match_any_notation(self):
+        mac = self.add_mac("AA:BB:CC:DD:EE:0F")
+        self.add_mac("AA:BB:CD:00:00:00")
+        self.assertEqual(list(ClientMacAddress.objects.matching("aabbccddee0f")), [mac])
+        self.assertEqual(list(ClientMacAddress.objects.in_oui("aa-bb-cc")), [mac])
+
+    def test_clean_rejects_an_address_in_another_notation(self):
+        self.add_mac("AA:BB:CC:DD:EE:0F")
+        duplicate = ClientMacAddress(client=self.client_, mac_address="aabbccddee0f")
+        with self.assertRaises(ValidationError):
+            duplicate.clean()
@@ -0,0 +1,74 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from swapper import load_model
+
+from .. import app_settings, context, signals, tasks
+from ..models import Client, ClientClassification, ClientMacAddress
+from .test_context import LOCMEM_CACHES
+
+Config = load_model("config", "Config")
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class ConfigRerenderTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        # A re-render left pending here would absorb the ones tests schedule
+        with signals.suppress_config_rerender():
+            self.classification = ClientClassification.objects.create(name="iot")
+        patcher = mock.patch.object(signals.rerender_client_configs, "apply_async")
+        self.apply_async = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def scheduled(self, callbacks):
+        return [c for c in callbacks if c is signals._enqueue_rerender]
+
+    def test_one_rerender_per_transaction(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            client = Client.objects.create(
+                name="thermostat", classification=self.classification
+            )
+            ClientMacAddress.objects.create(
+                client=client, mac_address="AA:BB:CC:DD:EE:FF"
+            )
+            Client.objects.create(name="doorbell", classification=self.classification)
+        self.assertEqual(len(self.scheduled(callbacks)), 1)
+
+    def test_commit_queues_a_delayed_rerender(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.create(name="thermostat", classification=self.classification)
+        self.apply_async.assert_called_once_with(countdown=app_settings.RERENDER_DELAY)
+
+    def test_commit_invalidates_the_context(self):
+        version = context._get_context_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Client.objects.create(name="thermostat", classification=self.classification)
+        self.assertNotEqual(context._get_context_version(), version)
+
+    def test_only_one_pass_is_queued_until_it_runs(self):
+        signals._enqueue_rerender()
+        signals._enqueue_rerender()
+        self.assertEqual(self.apply_async.call_count, 1)
+
+        with mock.patch.object(
+            tasks, "get_consuming_configs", return_value=Config.objects.none()
+        ):
+            tasks.rerender_client_configs()
+        signals._enqueue_rerender()
+        self.assertEqual(self.apply_async.call_count, 2)
+
+    def test_failing_to_queue_lets_the_next_change_retry(self):
+        self.apply_async.side_effect = ConnectionError("broker unavailable")
+        with self.assertLogs(signals.logger, "ERROR"):
+            signals._enqueue_rerender()
+        self.assertIsNone(cache.get(tasks.RERENDER_PENDING_KEY))
+
+    def test_suppressed_changes_schedule_nothing(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            with signals.suppress_config_rerender():
+                Client.objects.create(
+                    name="thermostat", classification=self.classification
+                )
+        self.assertEqual(self.scheduled(callbacks), [])
@@ -0,0 +1,89 @@
+import json
+import re
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from swapper import load_model
+
+# netjsonconfig replaces "{{ name }}" with the context variable of that name
+CLIENTS_VARIABLE_RE = re.compile(r"\{\{\s*clients\w*\s*\}\}")
+
+# Primary keys of the templates and configs whose JSON references a clients
+# variable, built from a scan when first needed. Like the clients context it is
+# stored under a version: a change in usage bumps the version instead of
+# editing the shared index, so concurrent changes can't overwrite each other
+# and a scan that overlaps a change is never used.
+USAGE_VERSION_KEY = "openwisp_clients:usage:version"
+USAGE_INDEX_KEY = "openwisp_clients:usage:{version}"
+USAGE_INDEX_TIMEOUT = 60 * 60
+
+
+def uses_clients_context(netjson):
+    return bool(CLIENTS_VARIABLE_RE.search(json.dumps(netjson or {})))
+
+
+def get_usage_index():
+    version = _get_usage_version()
+    key = USAGE_INDEX_KEY.format(version=version)
+    index = cache.get(key)
+    if index is None:
+        index = _build_usage_index()
+        cache.set(key, index, USAGE_INDEX_TIMEOUT)
+    return index
+
+
+def _get_usage_version():
+    version = cache.get(USAGE_VERSION_KEY)
+    if version is None:
+        cache.add(USAGE_VERSION_KEY, time.time_ns() // 1000, timeout=None)
+        version = cache.get(USAGE_VERSION_KEY)
+    return version
+
+
+def _build_usage_index():
+    Template = load_model("config", "Template")
+    Config = load_model("config", "Config")
+    return {
+        "templates": {
+            pk
+            for pk, netjson in Template.objects.values_list("pk", "config").iterator()
+            if uses_clients_context(netjson)
+        },
+        "configs": {
+            pk
+            for pk, netjson in Config.objects.values_list("pk", "config").iterator()
+            if uses_clients_context(netjson)
+        },
+    }
+
+
+def update_usage(kind, instance, deleted=False):
+    """Record whether a template or config ("templates" or "configs") uses clients.
+
+    Never scans: the index is only read if it is cached, and is rebuilt by the
+    next get_usage_index() if the change affects it.
+    """
+    pk = instance.pk
+    uses = not deleted and uses_clients_context(instance.config)
+
+    def invalidate():
+        index = cache.get(USAGE_INDEX_KEY.format(version=_get_usage_version()))
+        if index is not None and (pk in index[kind]) == uses:
+            return
+        try:
+            cache.incr(USAGE_VERSION_KEY)
+        except ValueError:
+            _get_usage_version()
+
+    transaction.on_commit(invalidate)
+
+
+def get_consuming_configs():
+    """Configs rendering a clients variable, from their templates or their own JSON."""
+    Config = load_model("config", "Config")
+    index = get_usage_index()
+    return Config.objects.filter(
+        Q(templates__in=index["templates"]) | Q(pk__in=index["configs"])
+    ).distinct()
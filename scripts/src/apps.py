@@ -0,0 +1,42 @@
+"""Registry of the apps the add-on can run.
+
+Apps are referenced as "module:Class" strings and only imported once an
+enabled app asks for them, so disabled apps cost nothing at startup. Apps
+shipped in other packages can register under the "scripts.apps" entry point
+group.
+"""
+
+import importlib
+import importlib.metadata
+import typing
+
+ENTRY_POINT_GROUP = "scripts.apps"
+
+# App name (the `name` in the add-on's `apps` options) -> "module:Class"
+BUILTIN_APPS = {
+    "lights": ".lights_app:LightsApp",
+}
+
+
+class App(typing.Protocol):
+    app_config: dict
+
+    async def initialize(self) -> None: ...
+
+
+def load_app_class(name: str) -> typing.Callable[..., App]:
+    """Import and return the class registered for an app name.
+
+    Raises KeyError for names with no registered app.
+    """
+    reference = BUILTIN_APPS.get(name)
+    if reference is None:
+        entry_points = importlib.metadata.entry_points(
+            group=ENTRY_POINT_GROUP, name=name
+        )
+        for entry_point in entry_points:
+            return entry_point.load()
+        raise KeyError(name)
+
+    module_name, _, class_name = reference.partition(":")
+    return getattr(importlib.import_module(module_name, __package__), class_name)
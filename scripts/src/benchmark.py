@@ -0,0 +1,288 @@
+"""Benchmark the Zigbee and lights code paths against a virtual zigbee2mqtt fleet.
+
+Runs discovery, a full lighting sweep and a health pass over the real
+MqttClient, ZigBeeClient and LightsApp. MqttClient's paho transport is
+replaced by an in-process broker connected to simulated coordinators, so
+paho's socket and network thread are the only parts not measured. Time is
+virtual, so "simulated" durations include device latency and pacing, while
+"wall" durations are the CPU cost:
+
+    python -m src.benchmark
+    python -m src.benchmark --devices 1000 --latency lognormal:0.05:0.8 \\
+        --drop-rate 0.01 --unresponsive-rate 0.005
+"""
+
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import statistics
+import tempfile
+import time
+import typing
+
+import pydantic
+import yaml
+
+from . import clocks, fleet, lights_app, simulation, zigbee
+
+# generate_config creates two lights and a switch per circuit
+DEVICES_PER_CIRCUIT = 3
+APP_CLIENT = "scripts"
+
+
+class PhaseResult(pydantic.BaseModel):
+    simulated_seconds: float
+    wall_seconds: float
+    operations: int
+    sent: int
+    received: int
+
+    def format(self, name: str) -> str:
+        operations = max(1, self.operations)
+        return (
+            f"  {name:<10} {self.simulated_seconds:>9.1f}s simulated "
+            f"{self.wall_seconds:>8.3f}s wall  "
+            f"{self.sent / operations:>6.2f} sent/op "
+            f"{self.received / operations:>6.2f} received/op"
+        )
+
+
+class BenchmarkResult(pydantic.BaseModel):
+    devices: int
+    circuits: int
+    discovery: PhaseResult
+    sweep: PhaseResult
+    sweep_circuit_seconds_p50: float
+    sweep_circuit_seconds_p95: float
+    sweep_unreported_circuits: int
+    health_pass: PhaseResult
+    unhealthy_circuits: int
+
+    def format(self) -> str:
+        return "\n".join(
+            [
+                f"{self.devices} devices, {self.circuits} circuits",
+                self.discovery.format("discovery"),
+                self.sweep.format("sweep"),
+                f"             circuit reported after "
+                f"p50 {self.sweep_circuit_seconds_p50:.1f}s, "
+                f"p95 {self.sweep_circuit_seconds_p95:.1f}s, "
+                f"{self.sweep_unreported_circuits} never",
+                self.health_pass.format("health"),
+                f"             {self.unhealthy_circuits} circuits unhealthy",
+            ]
+        )
+
+
+class _Phase:
+    """Measure simulated time, wall time and the app's MQTT traffic across a block."""
+
+    def __init__(self, broker: fleet.LocalBroker, operations: int):
+        self._broker = broker
+        self._operations = operations
+
+    def __enter__(self) -> "_Phase":
+        self._started = asyncio.get_running_loop().time()
+        self._wall_started = time.perf_counter()
+        self._sent, self._received = self._messages()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        sent, received = self._messages()
+        self.result = PhaseResult(
+            simulated_seconds=asyncio.get_running_loop().time() - self._started,
+            wall_seconds=time.perf_counter() - self._wall_started,
+            operations=self._operations,
+            sent=sent - self._sent,
+            received=received - self._received,
+        )
+
+    def _messages(self) -> tuple[int, int]:
+        return (
+            self._broker.sent_by_client[APP_CLIENT],
+            self._broker.received_by_client[APP_CLIENT],
+        )
+
+
+async def _no_schedulers() -> None:
+    """Stand-in for LightsApp._setup_schedulers; phases are driven directly."""
+
+
+async def _cancel_tasks(tasks: typing.Iterable[asyncio.Task]) -> None:
+    tasks = list(tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _percentile(values: list[float], pct: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+async def _benchmark(
+    devices: int,
+    *,
+    coordinators: int,
+    latency: fleet.Latency,
+    drop_rate: float,
+    unresponsive_rate: float,
+    start: datetime.datetime,
+    app_config: dict,
+    seed: int,
+) -> BenchmarkResult:
+    logger = logging.getLogger("scripts.benchmark")
+    loop = asyncio.get_running_loop()
+    clock = clocks.LoopClock(start)
+
+    circuits = max(1, devices // DEVICES_PER_CIRCUIT)
+    config_data = simulation.generate_config(circuits, coordinators)
+    config = lights_app.LightsConfig(**config_data)
+
+    broker = fleet.LocalBroker(logger)
+    virtual_coordinators = fleet.build_fleet(
+        broker,
+        config,
+        latency=latency,
+        drop_rate=drop_rate,
+        unresponsive_rate=unresponsive_rate,
+        seed=seed,
+    )
+    for coordinator in virtual_coordinators.values():
+        coordinator.start()
+
+    # ZigBeeClient is a process-wide singleton; each run needs its own client
+    client = zigbee.ZigBeeClient.__wrapped__(  # type: ignore[attr-defined]
+        logger,
+        {"zigbee_base_topics": sorted(virtual_coordinators)},
+        clock=clock,
+        mqtt_client=broker.mqtt_client(APP_CLIENT),
+    )
+    with _Phase(broker, operations=len(virtual_coordinators)) as discovery:
+        await client.initialize()
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        config_file = os.path.join(state_dir, "lights.yaml")
+        with open(config_file, "w") as file:
+            yaml.safe_dump(config_data, file)
+
+        app = lights_app.LightsApp(
+            logger,
+            addon_config={"zigbee_base_topics": sorted(virtual_coordinators)},
+            app_config=app_config
+            | {
+                "config_file": config_file,
+                "state_file": os.path.join(state_dir, "lights_last_sent.json"),
+            },
+            clock=clock,
+            zigbee_client=client,
+        )
+        app._setup_schedulers = _no_schedulers  # type: ignore[method-assign]
+        await app.initialize()
+
+        with _Phase(broker, operations=circuits) as sweep:
+            started = loop.time()
+            tasks = set(app._background_tasks)
+            app._update_circuits_lighting(config.circuits, clock.now())
+            await asyncio.gather(*(app._background_tasks - tasks))
+            # Give the last commands time to be reported back
+            await asyncio.sleep(lights_app.VERIFY_TIMEOUT_SECONDS)
+
+        reported_after = [
+            reported_at - started
+            for coordinator in virtual_coordinators.values()
+            for reported_at in coordinator.group_reported_at.values()
+        ]
+        # Read-backs scheduled by the sweep would pollute the health pass
+        await _cancel_tasks(app._background_tasks)
+
+        with _Phase(broker, operations=circuits) as health_pass:
+            await app._run_healthchecks(clock.now())
+
+        await _cancel_tasks(app._background_tasks)
+
+    return BenchmarkResult(
+        devices=devices,
+        circuits=circuits,
+        discovery=discovery.result,
+        sweep=sweep.result,
+        sweep_circuit_seconds_p50=_percentile(reported_after, 50),
+        sweep_circuit_seconds_p95=_percentile(reported_after, 95),
+        sweep_unreported_circuits=circuits - len(reported_after),
+        health_pass=health_pass.result,
+        unhealthy_circuits=sum(
+            1 for status in app._health_statuses.values() if status.state != "healthy"
+        ),
+    )
+
+
+def run_benchmark(
+    devices: int,
+    *,
+    coordinators: int = 2,
+    latency: str = "0.05",
+    drop_rate: float = 0.0,
+    unresponsive_rate: float = 0.0,
+    start: datetime.datetime | None = None,
+    app_config: dict | None = None,
+    seed: int = 0,
+) -> BenchmarkResult:
+    """Benchmark discovery, a lighting sweep and a health pass for a fleet size."""
+    start = start or datetime.datetime.combine(
+        datetime.date.today(), datetime.time(12, 0)
+    )
+    with asyncio.Runner(loop_factory=clocks.VirtualTimeEventLoop) as runner:
+        return runner.run(
+            _benchmark(
+                devices,
+                coordinators=coordinators,
+                latency=fleet.parse_latency(latency),
+                drop_rate=drop_rate,
+                unresponsive_rate=unresponsive_rate,
+                start=start,
+                app_config=app_config or {},
+                seed=seed,
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--devices", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--coordinators", type=int, default=2)
+    parser.add_argument(
+        "--latency",
+        default="0.05",
+        help='seconds, or "uniform:LOW:HIGH", "exponential:MEAN", '
+        '"lognormal:MEDIAN:SIGMA"',
+    )
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    parser.add_argument("--unresponsive-rate", type=float, default=0.0)
+    parser.add_argument("--start", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.WARNING),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    for devices in args.devices:
+        result = run_benchmark(
+            devices,
+            coordinators=args.coordinators,
+            latency=args.latency,
+            drop_rate=args.drop_rate,
+            unresponsive_rate=args.unresponsive_rate,
+            start=args.start,
+            seed=args.seed,
+        )
+        print(result.format())
+
+
+if __name__ == "__main__":
+    main()
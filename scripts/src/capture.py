@@ -0,0 +1,175 @@
+"""Binary capture files of MQTT traffic.
+
+MqttClient can tee every message it sends and receives into a capture: an
+append-only log of length-prefixed, timestamped records, rotated by size like
+logging's RotatingFileHandler (capture.bin, capture.bin.1, ...). Each file
+starts with the current value of every retained topic, so it can be replayed
+on its own. See src/replay.py for feeding a capture back through the client.
+"""
+
+import glob
+import os
+import re
+import struct
+import threading
+import time
+import typing
+
+FILE_MAGIC = b"MQTTCAP1"
+INBOUND = 0
+OUTBOUND = 1
+# A retained message re-recorded at the start of a rotated file
+RETAINED = 2
+
+# Record length (excluding this field), timestamp, direction, topic length;
+# followed by the topic and the raw payload.
+_RECORD_LENGTH = struct.Struct("<I")
+_RECORD_HEADER = struct.Struct("<dBH")
+
+
+class CapturedMessage(typing.NamedTuple):
+    timestamp: float
+    direction: int
+    topic: str
+    payload: bytes
+
+
+class CaptureWriter:
+    """Append messages to a size-rotated capture file.
+
+    Writes come from both the paho network thread (inbound) and the event
+    loop (outbound), so they are serialised with a lock. The file is flushed
+    at most once a second to keep the hot path free of syscalls.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_bytes: int = 64 * 1024 * 1024,
+        backups: int = 3,
+        flush_interval: float = 1.0,
+    ):
+        self.path = path
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        self._retained: dict[str, bytes] = {}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = self._open()
+
+    def write(
+        self, direction: int, topic: str, payload: bytes, *, retain: bool = False
+    ) -> None:
+        """Append a message.
+
+        Brokers only flag retained messages when replaying them to a new
+        subscriber, so once a topic has been seen retained, later messages on
+        it are tracked as its current retained value too.
+        """
+        record = self._record(time.time(), direction, topic, payload)
+
+        with self._lock:
+            # The paho thread can still be mid-message when the writer closes
+            if self._file.closed:
+                return
+            if retain or topic in self._retained:
+                if payload:
+                    self._retained[topic] = payload
+                else:
+                    self._retained.pop(topic, None)
+
+            if self._file.tell() + len(record) > self._max_bytes:
+                self._rotate()
+            self._file.write(record)
+
+            now = time.monotonic()
+            if now - self._last_flush >= self._flush_interval:
+                self._file.flush()
+                self._last_flush = now
+
+    def close(self) -> None:
+        with self._lock:
+            if not self._file.closed:
+                self._file.close()
+
+    def _record(
+        self, timestamp: float, direction: int, topic: str, payload: bytes
+    ) -> bytes:
+        topic_bytes = topic.encode("utf-8")
+        return b"".join(
+            [
+                _RECORD_LENGTH.pack(
+                    _RECORD_HEADER.size + len(topic_bytes) + len(payload)
+                ),
+                _RECORD_HEADER.pack(timestamp, direction, len(topic_bytes)),
+                topic_bytes,
+                payload,
+            ]
+        )
+
+    def _open(self) -> typing.BinaryIO:
+        file = open(self.path, "ab")
+        if file.tell() == 0:
+            file.write(FILE_MAGIC)
+            timestamp = time.time()
+            for topic, payload in self._retained.items():
+                file.write(self._record(timestamp, RETAINED, topic, payload))
+        return file
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self._backups > 0:
+            for i in range(self._backups - 1, 0, -1):
+                source = f"{self.path}.{i}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{i + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self._file = self._open()
+
+
+def capture_files(path: str) -> list[str]:
+    """Return a capture's files, oldest first."""
+    backups = [
+        (int(match.group(1)), backup)
+        for backup in glob.glob(f"{glob.escape(path)}.*")
+        if (match := re.fullmatch(re.escape(path) + r"\.(\d+)", backup))
+    ]
+    files = [backup for _, backup in sorted(backups, reverse=True)]
+    if os.path.exists(path):
+        files.append(path)
+    return files
+
+
+def read_capture(path: str) -> typing.Iterator[CapturedMessage]:
+    """Read every message of a capture, including its rotated files, in order.
+
+    A record cut short by the writer being killed ends its file quietly.
+    """
+    for file_path in capture_files(path):
+        with open(file_path, "rb") as file:
+            if file.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                raise ValueError(f"{file_path} is not an MQTT capture")
+
+            while True:
+                length_bytes = file.read(_RECORD_LENGTH.size)
+                if len(length_bytes) < _RECORD_LENGTH.size:
+                    break
+                (length,) = _RECORD_LENGTH.unpack(length_bytes)
+                record = file.read(length)
+                if len(record) < length:
+                    break
+
+                timestamp, direction, topic_length = _RECORD_HEADER.unpack_from(record)
+                topic_end = _RECORD_HEADER.size + topic_length
+                yield CapturedMessage(
+                    timestamp,
+                    direction,
+                    record[_RECORD_HEADER.size : topic_end].decode("utf-8"),
+                    record[topic_end:],
+                )
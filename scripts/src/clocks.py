@@ -0,0 +1,59 @@
+import asyncio
+import datetime
+
+
+class Clock:
+    """Source of wall-clock time and sleeping for apps.
+
+    Apps take a clock instead of calling datetime.datetime.now() and
+    asyncio.sleep() directly so they can be driven in simulated time.
+    """
+
+    def now(self) -> datetime.datetime:
+        return datetime.datetime.now()
+
+    async def sleep(self, seconds: float) -> None:
+        await asyncio.sleep(seconds)
+
+
+class LoopClock(Clock):
+    """Wall-clock time derived from the running event loop's clock.
+
+    Paired with VirtualTimeEventLoop, time only advances when every task is
+    waiting, so a simulated day runs as fast as the app can process it.
+    """
+
+    def __init__(self, start: datetime.datetime):
+        self._start = start
+        self._origin = asyncio.get_running_loop().time()
+
+    def now(self) -> datetime.datetime:
+        elapsed = asyncio.get_running_loop().time() - self._origin
+        return self._start + datetime.timedelta(seconds=elapsed)
+
+
+class VirtualTimeEventLoop(asyncio.SelectorEventLoop):
+    """Event loop that jumps its clock forward instead of blocking.
+
+    Whenever the loop would wait for the next timer, it polls for I/O without
+    blocking and advances its clock by the time it would have waited. Timers,
+    asyncio.sleep() and asyncio.wait_for() timeouts all follow the virtual
+    clock, so runs are deterministic and independent of real time.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._virtual_time = 0.0
+        selector = self._selector
+        poll = selector.select
+
+        def select(timeout: float | None = None):
+            events = poll(0)
+            if not events and timeout:
+                self._virtual_time += timeout
+            return events
+
+        selector.select = select  # type: ignore[method-assign]
+
+    def time(self) -> float:
+        return self._virtual_time
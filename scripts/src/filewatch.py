@@ -0,0 +1,117 @@
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import typing
+
+# inotify(7) event masks
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_EVENT_HEADER = struct.Struct("iIII")
+
+
+class FileWatcher:
+    """Notify when a file changes, using inotify with an mtime polling fallback.
+
+    The parent directory is watched rather than the file itself so that editors
+    which save by writing a new file and renaming it over the old one are seen.
+    Polling still runs (slowly) alongside inotify, since inotify can miss
+    changes made through some bind mounts.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        path: str,
+        *,
+        poll_interval: float = 30.0,
+        fallback_poll_interval: float = 5.0,
+        debounce: float = 0.5,
+    ):
+        self.logger = logger
+        self.path = path
+        self._poll_interval = poll_interval
+        self._fallback_poll_interval = fallback_poll_interval
+        self._debounce = debounce
+        self._changed = asyncio.Event()
+        self._fd: int | None = None
+
+    async def changes(self) -> typing.AsyncIterator[None]:
+        """Yield once for every change to the file's modification time or size."""
+        loop = asyncio.get_running_loop()
+        poll_interval = self._poll_interval
+        if not self._start_inotify(loop):
+            poll_interval = self._fallback_poll_interval
+
+        last_signature = self._signature()
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), poll_interval)
+                    # Let editors finish writing before reading the file
+                    await asyncio.sleep(self._debounce)
+                except asyncio.TimeoutError:
+                    pass
+                self._changed.clear()
+
+                signature = self._signature()
+                if signature != last_signature:
+                    last_signature = signature
+                    yield
+        finally:
+            self._stop_inotify(loop)
+
+    def _signature(self) -> tuple[int, int] | None:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _start_inotify(self, loop: asyncio.AbstractEventLoop) -> bool:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+            directory = os.path.dirname(os.path.abspath(self.path))
+            mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+            if libc.inotify_add_watch(fd, directory.encode(), mask) < 0:
+                os.close(fd)
+                raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        except (OSError, AttributeError) as e:
+            self.logger.info(f"inotify unavailable for {self.path}, polling: {e}")
+            return False
+
+        self._fd = fd
+        loop.add_reader(fd, self._on_inotify_readable)
+        return True
+
+    def _stop_inotify(self, loop: asyncio.AbstractEventLoop) -> None:
+        if self._fd is None:
+            return
+        loop.remove_reader(self._fd)
+        os.close(self._fd)
+        self._fd = None
+
+    def _on_inotify_readable(self) -> None:
+        try:
+            data = os.read(typing.cast(int, self._fd), 4096)
+        except BlockingIOError:
+            return
+
+        name = os.path.basename(self.path).encode()
+        offset = 0
+        while offset + _IN_EVENT_HEADER.size <= len(data):
+            _, _, _, length = _IN_EVENT_HEADER.unpack_from(data, offset)
+            offset += _IN_EVENT_HEADER.size
+            event_name = data[offset : offset + length].rstrip(b"\0")
+            offset += length
+            if event_name == name:
+                self._changed.set()
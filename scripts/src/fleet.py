@@ -0,0 +1,431 @@
+"""Virtual zigbee2mqtt coordinators behind an in-process MQTT broker.
+
+The fleet speaks the zigbee2mqtt MQTT contract closely enough to run the real
+MqttClient-facing code paths (ZigBeeClient discovery, group casts, bridge
+requests, state reports) without hardware or a broker process.
+"""
+
+import asyncio
+import collections
+import json
+import logging
+import math
+import random
+import re
+import typing
+
+import paho.mqtt.client
+
+from . import lights_app, mqtt
+
+Callback = typing.Callable[[str, str], None]
+Latency = typing.Callable[[random.Random], float]
+
+# zigbee2mqtt's generic command API, mapped back onto the state it changes
+_COMMAND_PROPERTIES = {
+    ("genLevelCtrl", "moveToLevel"): ("brightness", "level"),
+    ("lightingColorCtrl", "moveToColorTemp"): ("color_temp", "colortemp"),
+}
+
+
+def parse_latency(spec: str) -> Latency:
+    """Parse a latency distribution in seconds.
+
+    Accepts a fixed value ("0.05"), "uniform:LOW:HIGH", "exponential:MEAN" or
+    "lognormal:MEDIAN:SIGMA".
+    """
+    kind, _, args = spec.partition(":")
+    try:
+        if not args:
+            value = float(kind)
+            return lambda rng: value
+
+        params = [float(arg) for arg in args.split(":")]
+        if kind == "uniform":
+            low, high = params
+            return lambda rng: rng.uniform(low, high)
+        elif kind == "exponential":
+            (mean,) = params
+            return lambda rng: rng.expovariate(1 / mean)
+        elif kind == "lognormal":
+            median, sigma = params
+            return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    except ValueError:
+        pass
+    raise ValueError(f"Invalid latency distribution: {spec}")
+
+
+class LocalBroker:
+    """In-process stand-in for an MQTT broker.
+
+    Messages are delivered on the event loop rather than inline, keeping the
+    ordering a subscriber would see from a real broker. Retained messages are
+    replayed to new subscriptions, and messages are counted per client as
+    they are sent and delivered.
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self._subscriptions: list[tuple[str, str, re.Pattern, Callback]] = []
+        self._retained: dict[str, str] = {}
+        self.sent_by_client: collections.Counter[str] = collections.Counter()
+        self.received_by_client: collections.Counter[str] = collections.Counter()
+
+    def client(self, name: str) -> "BrokerClient":
+        """Return a client with the same interface as mqtt.MqttClient."""
+        return BrokerClient(self, name)
+
+    def mqtt_client(self, name: str) -> mqtt.MqttClient:
+        """Return a real MqttClient whose paho transport is this broker."""
+        # MqttClient is a process-wide singleton; each caller needs its own
+        return mqtt.MqttClient.__wrapped__(  # type: ignore[attr-defined]
+            self.logger,
+            {"mqtt_host": "localhost", "mqtt_username": "", "mqtt_password": ""},
+            client_factory=lambda: PahoTransport(self, name),
+        )
+
+    def publish(self, client: str, topic: str, payload: str, retain: bool) -> None:
+        self.sent_by_client[client] += 1
+        if retain:
+            self._retained[topic] = payload
+
+        loop = asyncio.get_running_loop()
+        for subscriber, _, pattern, callback in self._subscriptions:
+            if pattern.match(topic):
+                loop.call_soon(self._deliver, subscriber, callback, topic, payload)
+
+    def subscribe(self, client: str, topic: str, callback: Callback) -> None:
+        pattern = mqtt.topic_pattern(topic)
+        self._subscriptions.append((client, topic, pattern, callback))
+
+        loop = asyncio.get_running_loop()
+        for retained_topic, payload in self._retained.items():
+            if pattern.match(retained_topic):
+                loop.call_soon(self._deliver, client, callback, retained_topic, payload)
+
+    def unsubscribe(self, client: str, topic: str, callback: Callback) -> None:
+        self._subscriptions = [
+            s
+            for s in self._subscriptions
+            if s[0] != client or s[1] != topic or s[3] != callback
+        ]
+
+    def _deliver(
+        self, client: str, callback: Callback, topic: str, payload: str
+    ) -> None:
+        self.received_by_client[client] += 1
+        try:
+            callback(topic, payload)
+        except Exception as e:
+            self.logger.error(f"Error in callback for topic {topic}: {e}")
+
+
+class BrokerClient:
+    """LocalBroker connection that can be passed wherever an MqttClient is used."""
+
+    def __init__(self, broker: LocalBroker, name: str):
+        self._broker = broker
+        self.name = name
+
+    async def initialize(self) -> None:
+        pass
+
+    def publish(
+        self, topic: str, payload: dict | list, qos: int = 0, retain: bool = False
+    ):
+        self._broker.publish(self.name, topic, json.dumps(payload), retain)
+
+    def subscribe(self, topic: str, callback: Callback, qos: int = 0):
+        self._broker.subscribe(self.name, topic, callback)
+
+    def unsubscribe(self, topic: str, callback: Callback):
+        self._broker.unsubscribe(self.name, topic, callback)
+
+    @property
+    def is_connected(self) -> bool:
+        return True
+
+
+class PahoTransport:
+    """Stands in for paho's Client under a real MqttClient, over a LocalBroker.
+
+    Publishes, subscriptions and received messages go through MqttClient's
+    own encoding, capture and topic dispatch, so they are measured too.
+    Messages are delivered on the event loop rather than paho's network
+    thread.
+    """
+
+    def __init__(self, broker: LocalBroker, name: str):
+        self._broker = broker
+        self.name = name
+        self._callbacks: dict[str, Callback] = {}
+        self.on_connect: typing.Callable | None = None
+        self.on_disconnect: typing.Callable | None = None
+        self.on_message: typing.Callable | None = None
+
+    def username_pw_set(self, username: str, password: str) -> None:
+        pass
+
+    def connect(self, host: str, port: int, keepalive: int) -> None:
+        pass
+
+    def loop_start(self) -> None:
+        assert self.on_connect is not None
+        self.on_connect(self, None, {}, paho.mqtt.client.MQTT_ERR_SUCCESS)
+
+    def publish(
+        self, topic: str, payload: str, qos: int = 0, retain: bool = False
+    ) -> tuple[int, None]:
+        self._broker.publish(self.name, topic, payload, retain)
+        return paho.mqtt.client.MQTT_ERR_SUCCESS, None
+
+    def subscribe(self, topic: str, qos: int = 0) -> tuple[int, None]:
+        callback = self._callbacks.setdefault(topic, self._deliver)
+        self._broker.subscribe(self.name, topic, callback)
+        return paho.mqtt.client.MQTT_ERR_SUCCESS, None
+
+    def unsubscribe(self, topic: str) -> tuple[int, None]:
+        callback = self._callbacks.pop(topic, None)
+        if callback is not None:
+            self._broker.unsubscribe(self.name, topic, callback)
+        return paho.mqtt.client.MQTT_ERR_SUCCESS, None
+
+    def _deliver(self, topic: str, payload: str) -> None:
+        message = paho.mqtt.client.MQTTMessage(topic=topic.encode("utf-8"))
+        message.payload = payload.encode("utf-8")
+        assert self.on_message is not None
+        self.on_message(self, None, message)
+
+
+class VirtualDevice:
+    def __init__(self, ieee: str, type: str, model_id: str | None):
+        self.ieee_address = f"0x{ieee.replace(':', '')}"
+        self.friendly_name = self.ieee_address
+        self.type = type
+        self.model_id = model_id
+        self.responsive = True
+        self.state: dict[str, typing.Any] = {"state": "ON", "linkquality": 120}
+
+    def describe(self, network_address: int) -> dict:
+        """Return the device as listed in bridge/devices."""
+        return {
+            "ieee_address": self.ieee_address,
+            "type": self.type,
+            "network_address": network_address,
+            "friendly_name": self.friendly_name,
+            "interview_completed": True,
+            "interviewing": False,
+            "supported": True,
+            "power_source": "Mains (single phase)",
+            "model_id": self.model_id,
+        }
+
+
+class VirtualGroup:
+    def __init__(self, id: int, friendly_name: str):
+        self.id = id
+        self.friendly_name = friendly_name
+        self.members: list[VirtualDevice] = []
+
+    def describe(self) -> dict:
+        """Return the group as listed in bridge/groups."""
+        return {
+            "id": self.id,
+            "friendly_name": self.friendly_name,
+            "members": [
+                {"ieee_address": member.ieee_address, "endpoint": 1}
+                for member in self.members
+            ],
+        }
+
+
+class VirtualCoordinator:
+    """A zigbee2mqtt instance and its devices, attached to a LocalBroker.
+
+    Handles /set and /get for devices and groups (a group cast reaches every
+    member), and bridge/request/* with transaction-tagged responses. Each
+    device reply is delayed by a draw from the latency distribution and lost
+    with probability drop_rate; unresponsive devices never reply.
+    """
+
+    def __init__(
+        self,
+        broker: LocalBroker,
+        base_topic: str,
+        *,
+        latency: Latency,
+        drop_rate: float = 0.0,
+        rng: random.Random | None = None,
+    ):
+        self.base_topic = base_topic
+        self._mqtt = broker.client(base_topic)
+        self._latency = latency
+        self._drop_rate = drop_rate
+        self._rng = rng or random.Random()
+        self.devices: dict[str, VirtualDevice] = {}
+        self.groups: dict[str, VirtualGroup] = {}
+
+        # Loop time at which each group last had a set command reported back
+        self.group_reported_at: dict[str, float] = {}
+
+    def add_device(self, device: VirtualDevice) -> None:
+        self.devices[device.friendly_name] = device
+
+    def add_group(self, group: VirtualGroup) -> None:
+        self.groups[group.friendly_name] = group
+
+    def start(self) -> None:
+        """Publish the retained device and group lists and start handling requests."""
+        self._publish_devices()
+        self._publish_groups()
+        self._mqtt.subscribe(f"{self.base_topic}/+/set", self._on_set)
+        self._mqtt.subscribe(f"{self.base_topic}/+/get", self._on_get)
+        self._mqtt.subscribe(f"{self.base_topic}/bridge/request/#", self._on_request)
+
+    def _publish_devices(self) -> None:
+        self._mqtt.publish(
+            f"{self.base_topic}/bridge/devices",
+            [device.describe(i + 1) for i, device in enumerate(self.devices.values())],
+            retain=True,
+        )
+
+    def _publish_groups(self) -> None:
+        self._mqtt.publish(
+            f"{self.base_topic}/bridge/groups",
+            [group.describe() for group in self.groups.values()],
+            retain=True,
+        )
+
+    def _resolve(self, topic: str) -> tuple[VirtualGroup | None, list[VirtualDevice]]:
+        friendly_name = topic.split("/")[-2]
+        if friendly_name in self.groups:
+            group = self.groups[friendly_name]
+            return group, group.members
+        elif friendly_name in self.devices:
+            return None, [self.devices[friendly_name]]
+        return None, []
+
+    def _on_set(self, topic: str, payload: str) -> None:
+        group, targets = self._resolve(topic)
+        data = json.loads(payload)
+
+        changes = data
+        if "command" in data:
+            command = data["command"]
+            property, field = _COMMAND_PROPERTIES.get(
+                (command.get("cluster"), command.get("command")), (None, None)
+            )
+            if property is None:
+                return
+            changes = {property: command["payload"][field]}
+
+        if group is not None:
+            # zigbee2mqtt optimistically publishes the group's new state
+            self._mqtt.publish(f"{self.base_topic}/{group.friendly_name}", changes)
+
+        for device in targets:
+            if device.responsive:
+                device.state |= changes
+            self._reply_later(device, group)
+
+    def _on_get(self, topic: str, payload: str) -> None:
+        _, targets = self._resolve(topic)
+        for device in targets:
+            self._reply_later(device, None)
+
+    def _reply_later(self, device: VirtualDevice, group: VirtualGroup | None) -> None:
+        if not device.responsive or self._rng.random() < self._drop_rate:
+            return
+
+        asyncio.get_running_loop().call_later(
+            self._latency(self._rng), self._report, device, group
+        )
+
+    def _report(self, device: VirtualDevice, group: VirtualGroup | None) -> None:
+        self._mqtt.publish(f"{self.base_topic}/{device.friendly_name}", device.state)
+        if group is not None:
+            self.group_reported_at[group.friendly_name] = (
+                asyncio.get_running_loop().time()
+            )
+
+    def _on_request(self, topic: str, payload: str) -> None:
+        name = topic.removeprefix(f"{self.base_topic}/bridge/request/")
+        data = json.loads(payload)
+
+        response: dict[str, typing.Any] = {"data": {}, "status": "ok"}
+        delay = self._latency(self._rng)
+        if name == "permit_join":
+            response["data"] = {"time": data.get("time", 0)}
+        elif name in ("group/members/add", "group/members/remove"):
+            group = self.groups.get(data.get("group"))
+            device = self.devices.get(data.get("device"))
+            if group is None or device is None:
+                response = {"status": "error", "error": "Group or device not found"}
+            elif not device.responsive:
+                # The coordinator waits on the device before giving up
+                delay = 10.0
+                response = {"status": "error", "error": "Timeout"}
+            else:
+                if name == "group/members/add" and device not in group.members:
+                    group.members.append(device)
+                elif name == "group/members/remove" and device in group.members:
+                    group.members.remove(device)
+                response["data"] = {"group": group.friendly_name}
+                self._publish_groups()
+        elif name == "health_check":
+            response["data"] = {"healthy": True}
+        else:
+            response = {"status": "error", "error": f"Unknown request {name}"}
+
+        if "transaction" in data:
+            response["transaction"] = data["transaction"]
+
+        asyncio.get_running_loop().call_later(
+            delay,
+            self._mqtt.publish,
+            f"{self.base_topic}/bridge/response/{name}",
+            response,
+        )
+
+
+def build_fleet(
+    broker: LocalBroker,
+    config: lights_app.LightsConfig,
+    *,
+    latency: Latency,
+    drop_rate: float = 0.0,
+    unresponsive_rate: float = 0.0,
+    light_model: str | None = None,
+    seed: int = 0,
+) -> dict[str, VirtualCoordinator]:
+    """Create coordinators for every circuit in a lights config.
+
+    Circuits go to the coordinator named by their group id prefix ("a-1" is
+    group 1 on zigbee2mqtt-a) and every light and switch is a group member.
+    A random unresponsive_rate fraction of lights never reply.
+    """
+    rng = random.Random(seed)
+    coordinators: dict[str, VirtualCoordinator] = {}
+    for circuit in config.circuits:
+        base_topic = f"zigbee2mqtt-{circuit.group_id[0]}"
+        coordinator = coordinators.get(base_topic)
+        if coordinator is None:
+            coordinator = coordinators[base_topic] = VirtualCoordinator(
+                broker, base_topic, latency=latency, drop_rate=drop_rate, rng=rng
+            )
+
+        group = VirtualGroup(
+            int(circuit.group_id.split("-")[-1]), circuit.friendly_name
+        )
+        for light in circuit.lights:
+            device = VirtualDevice(light.ieee, "Router", light_model)
+            device.responsive = rng.random() >= unresponsive_rate
+            coordinator.add_device(device)
+            group.members.append(device)
+        for switch in circuit.switches:
+            device = VirtualDevice(switch.ieee, "Router", None)
+            coordinator.add_device(device)
+            group.members.append(device)
+        coordinator.add_group(group)
+
+    return coordinators
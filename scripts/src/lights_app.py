@@ -1,15 +1,16 @@
 import asyncio
+import collections
 import datetime
+import heapq
 import logging
 import math
 import os
-import random
 import typing
 
 import pydantic
 import yaml
 
-from . import zigbee
+from . import clocks, filewatch, pacing, schedule, status, zigbee
 
 
 class LightDevice(pydantic.BaseModel):
@@ -21,6 +22,9 @@ class SwitchDevice(pydantic.BaseModel):
     type: typing.Literal["hardwired"] | None = None
 
 
+CircuitDevice = LightDevice | SwitchDevice
+
+
 class LightCircuit(pydantic.BaseModel):
     id: str
 
@@ -41,6 +45,19 @@ class LightCircuitHealth(pydantic.BaseModel):
     is_healthy: bool
 
 
+HealthState = typing.Literal[
+    "unknown", "healthy", "unhealthy", "healing", "healed", "mitigated", "failed"
+]
+
+
+class CircuitHealthStatus(pydantic.BaseModel):
+    state: HealthState = "unknown"
+    changed_at: datetime.datetime | None = None
+    checked_at: datetime.datetime | None = None
+    consecutive_failures: int = 0
+    missed_verifications: int = 0
+
+
 class LightSchedule(pydantic.BaseModel):
     time: str | int
     brightness: int
@@ -53,68 +70,346 @@ class LightsConfig(pydantic.BaseModel):
     schedule: list[LightSchedule]
 
 
+def _expected_base_topic(circuit: LightCircuit) -> str:
+    """The base topic of the coordinator a circuit's group id names, e.g. a-1."""
+    return f"zigbee2mqtt-{circuit.group_id[0]}"
+
+
+class SentLighting(pydantic.BaseModel):
+    brightness: int
+    temperature: int
+    settles_at: datetime.datetime
+
+
+SentLightingByCircuit = pydantic.TypeAdapter(dict[str, SentLighting])
+
+
+HEALTH_INTERVAL_MINUTES = 15
+
+REAPPLY_DEBOUNCE_SECONDS = 0.25
+# Extra time after a transition before reading back what the lights settled at
+VERIFY_AFTER_SETTLE_SECONDS = 5
+VERIFY_TIMEOUT_SECONDS = 10
+LAST_SENT_FLUSH_SECONDS = 5
+# A lighting update is a set and a get for both brightness and color_temp
+LIGHTING_UPDATE_MESSAGES = 4
+
+
 class LightsApp:
     """Main app for managing home lighting with adaptive features and health monitoring."""
 
     _zigbee: zigbee.ZigBeeClient
     _config: LightsConfig
-    _lighting_lock: asyncio.Lock = asyncio.Lock()
+    _schedule: schedule.CompiledSchedule
     _health_lock: asyncio.Lock = asyncio.Lock()
 
-    def __init__(self, logger: logging.Logger, addon_config: dict, app_config: dict):
+    def __init__(
+        self,
+        logger: logging.Logger,
+        addon_config: dict,
+        app_config: dict,
+        *,
+        clock: clocks.Clock | None = None,
+        zigbee_client: "zigbee.ZigBeeClient | None" = None,
+        status_board: status.StatusBoard | None = None,
+    ):
         self.logger = logger
         self.addon_config = addon_config
         self.app_config = app_config
-        self._last_sent: dict[str, tuple[int, int]] = {}
+        self._clock = clock or clocks.Clock()
+        self._zigbee_client = zigbee_client
+        self._config_file = app_config.get("config_file", "/config/lights.yaml")
+        self._last_sent: dict[str, SentLighting] = {}
+        self._last_sent_file = app_config.get(
+            "state_file", "/data/lights_last_sent.json"
+        )
+        # A worker process running the circuits of one coordinator
+        self._shard: str | None = addon_config.get("shard")
+        if self._shard is not None:
+            root, extension = os.path.splitext(self._last_sent_file)
+            self._last_sent_file = f"{root}.{self._shard}{extension}"
+        self._last_sent_flush: asyncio.Task | None = None
+        self._drift_corrected: dict[str, tuple[int, int]] = {}
+        self._brightness_profiles: dict[str, str] = {}
+        self._circuits_by_id: dict[str, LightCircuit] = {}
+        self._circuits_by_ieee: dict[str, list[LightCircuit]] = {}
+        self._pending_reapplies: set[str] = set()
+
+        # Single timer heap of (due, circuit id) across all circuits; entries
+        # superseded by a later reschedule are skipped when popped.
+        self._lighting_timers: list[tuple[datetime.datetime, str]] = []
+        self._lighting_due: dict[str, datetime.datetime] = {}
+        self._lighting_wakeup = asyncio.Event()
+        self._background_tasks: set[asyncio.Task] = set()
+
+        self._pacer = pacing.TopicPacer(app_config.get("max_messages_per_second", 4))
+        self._dispatch_window = app_config.get("dispatch_window_seconds", 60)
+
+        self._health_concurrency = app_config.get("health_checks_per_coordinator", 4)
+        self._health_checks_per_pass: int | None = app_config.get(
+            "health_checks_per_pass"
+        )
+        self._max_health_staleness = datetime.timedelta(
+            minutes=app_config.get("max_health_staleness_minutes", 60)
+        )
+        self._health_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._heal_semaphores: dict[str, asyncio.Semaphore] = {}
+        self._heal_jobs: dict[str, asyncio.Task] = {}
+        self._health_statuses: dict[str, CircuitHealthStatus] = {}
+
+        # Status documents are refreshed as circuits change, with circuits
+        # counted by (base topic, health state) so summaries stay O(1).
+        self._status = status_board or status.StatusBoard()
+        self._status_path = f"/status/apps/{app_config.get('name', 'lights')}"
+        self._status_keys: dict[str, tuple[str, HealthState]] = {}
+        self._health_counts: collections.Counter[tuple[str, HealthState]] = (
+            collections.Counter()
+        )
 
     async def initialize(self) -> None:
         """Initialize the app and its components."""
 
-        # Load lights configuration from file
-        config_file = self.app_config.get("config_file", "/config/lights.yaml")
-        if not os.path.exists(config_file):
-            self.logger.error(f"Lights config file not found: {config_file}")
-            raise FileNotFoundError(f"Config file not found: {config_file}")
-
-        with open(config_file, "r") as file:
-            config_data = yaml.safe_load(file)
-
-        self._config = LightsConfig(**config_data)
+        self._config = self._load_config()
+        self._index_circuits()
+        self._load_last_sent()
         self.logger.info(f"Loaded {len(self._config.circuits)} circuits from config")
 
-        self._zigbee = zigbee.ZigBeeClient(self.logger, self.addon_config)
+        self._zigbee = self._zigbee_client or zigbee.ZigBeeClient(
+            self.logger, self.addon_config
+        )
         await self._zigbee.initialize()
 
+        self._compile_lighting()
+        self._zigbee.add_state_listener(self._on_device_state)
+        self._zigbee.add_announce_listener(self._on_device_announce)
+        for circuit in self._config.circuits:
+            self._publish_circuit_status(circuit)
+
         await self._setup_schedulers()
 
+    def _load_config(self) -> LightsConfig:
+        """Load lights configuration from file."""
+        if not os.path.exists(self._config_file):
+            self.logger.error(f"Lights config file not found: {self._config_file}")
+            raise FileNotFoundError(f"Config file not found: {self._config_file}")
+
+        with open(self._config_file, "r") as file:
+            config_data = yaml.safe_load(file)
+
+        config = LightsConfig(**config_data)
+        if self._shard is not None:
+            config.circuits = [
+                circuit
+                for circuit in config.circuits
+                if _expected_base_topic(circuit) == self._shard
+            ]
+        return config
+
+    async def _config_watch_loop(self):
+        """Reload the config whenever the file changes."""
+        watcher = filewatch.FileWatcher(self.logger, self._config_file)
+        async for _ in watcher.changes():
+            try:
+                self._reload_config()
+            except Exception as e:
+                self.logger.error(f"Error reloading {self._config_file}: {e}")
+
+    def _reload_config(self) -> None:
+        """Apply a changed config, touching only the circuits that changed."""
+        try:
+            config = self._load_config()
+            self._validate_config(config)
+        except (OSError, yaml.YAMLError, pydantic.ValidationError, ValueError) as e:
+            self.logger.error(f"Ignoring invalid {self._config_file}: {e}")
+            return
+
+        old_circuits = self._circuits_by_id
+        new_circuits = {circuit.id: circuit for circuit in config.circuits}
+        removed = old_circuits.keys() - new_circuits.keys()
+        added = new_circuits.keys() - old_circuits.keys()
+        changed = {
+            circuit_id
+            for circuit_id in new_circuits.keys() & old_circuits.keys()
+            if new_circuits[circuit_id] != old_circuits[circuit_id]
+        }
+        schedule_changed = config.schedule != self._config.schedule
+
+        self._config = config
+        self._index_circuits()
+
+        for circuit_id in removed:
+            self._forget_circuit(circuit_id)
+        for circuit_id in changed:
+            if new_circuits[circuit_id].group_id != old_circuits[circuit_id].group_id:
+                self._last_sent.pop(circuit_id, None)
+
+        for circuit_id in added | changed:
+            self._publish_circuit_status(new_circuits[circuit_id])
+
+        now = self._clock.now()
+        if schedule_changed:
+            self._compile_lighting()
+            rearm = set(new_circuits)
+        else:
+            for circuit_id in added | changed:
+                self._compile_circuit_lighting(new_circuits[circuit_id])
+            rearm = added | changed
+
+        # Circuits whose target didn't actually change are filtered out when
+        # their timer fires, so re-arming doesn't cause fleet-wide traffic.
+        for circuit_id in rearm:
+            self._schedule_circuit_lighting(circuit_id, now)
+
+        self.logger.info(
+            f"Reloaded {self._config_file}: {len(added)} added, {len(removed)} "
+            f"removed, {len(changed)} changed circuits"
+            + (", schedule changed" if schedule_changed else "")
+        )
+
+    def _validate_config(self, config: LightsConfig) -> None:
+        """Check a config against the discovered Zigbee network."""
+        schedule.CompiledSchedule(config.schedule)
+
+        circuit_ids = [circuit.id for circuit in config.circuits]
+        if len(set(circuit_ids)) != len(circuit_ids):
+            raise ValueError("Circuit ids must be unique")
+
+        for circuit in config.circuits:
+            devices: list[CircuitDevice] = [*circuit.lights, *circuit.switches]
+            try:
+                self._zigbee.get_group_by_id(circuit.group_id)
+                self._zigbee.get_devices_by_ieee([device.ieee for device in devices])
+            except KeyError as e:
+                raise ValueError(
+                    f"Circuit {circuit.id} references unknown device or group {e}"
+                )
+
+    def _forget_circuit(self, circuit_id: str) -> None:
+        """Drop all state for a circuit removed from the config."""
+        self._lighting_due.pop(circuit_id, None)
+        self._last_sent.pop(circuit_id, None)
+        self._drift_corrected.pop(circuit_id, None)
+        self._brightness_profiles.pop(circuit_id, None)
+        self._health_statuses.pop(circuit_id, None)
+        heal_job = self._heal_jobs.pop(circuit_id, None)
+        if heal_job is not None:
+            heal_job.cancel()
+        self._persist_last_sent()
+        self._unpublish_circuit_status(circuit_id)
+
+    def _index_circuits(self) -> None:
+        """Index circuits by id and by the IEEE address of each light and switch."""
+        self._circuits_by_id = {}
+        self._circuits_by_ieee = {}
+        for circuit in self._config.circuits:
+            self._circuits_by_id[circuit.id] = circuit
+            devices: list[CircuitDevice] = [*circuit.lights, *circuit.switches]
+            for device in devices:
+                self._circuits_by_ieee.setdefault(device.ieee, []).append(circuit)
+
     async def _setup_schedulers(self):
         """Setup timers for lighting updates and health checks."""
         asyncio.create_task(self._lighting_loop())
         asyncio.create_task(self._health_loop())
+        asyncio.create_task(self._config_watch_loop())
 
     async def _lighting_loop(self):
-        """Run lighting updates aligned to every 5-minute mark."""
-        await asyncio.sleep(self._seconds_until_next_interval(5))
+        """Update each circuit when its scheduled target next changes."""
+        now = self._clock.now()
+        for circuit in self._config.circuits:
+            self._schedule_circuit_lighting(circuit.id, now)
+
         while True:
+            due_circuits = await self._wait_for_due_circuits()
             try:
-                await self._update_all_circuits_lighting(datetime.datetime.now())
+                self._update_circuits_lighting(due_circuits, self._clock.now())
             except Exception as e:
                 self.logger.error(f"Error in lighting update loop: {e}")
-            await asyncio.sleep(self._seconds_until_next_interval(5))
+
+    async def _wait_for_due_circuits(self) -> list[LightCircuit]:
+        """Sleep until the earliest circuit timer is due and pop all due circuits."""
+        while True:
+            self._lighting_wakeup.clear()
+            timeout = None
+            if self._lighting_timers:
+                timeout = (
+                    self._lighting_timers[0][0] - self._clock.now()
+                ).total_seconds()
+                if timeout <= 0:
+                    break
+
+            try:
+                await asyncio.wait_for(self._lighting_wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+        now = self._clock.now()
+        due_circuits = []
+        while self._lighting_timers and self._lighting_timers[0][0] <= now:
+            due, circuit_id = heapq.heappop(self._lighting_timers)
+            if self._lighting_due.get(circuit_id) != due:
+                continue
+
+            del self._lighting_due[circuit_id]
+            if circuit_id in self._circuits_by_id:
+                due_circuits.append(self._circuits_by_id[circuit_id])
+
+        return due_circuits
+
+    def _schedule_circuit_lighting(
+        self, circuit_id: str, due: datetime.datetime
+    ) -> None:
+        """(Re)arm a circuit's lighting timer, waking the loop if it's now earliest."""
+        is_earliest = not self._lighting_timers or due < self._lighting_timers[0][0]
+        self._lighting_due[circuit_id] = due
+        heapq.heappush(self._lighting_timers, (due, circuit_id))
+        if is_earliest:
+            self._lighting_wakeup.set()
+
+    def _schedule_next_lighting_change(
+        self,
+        circuit: LightCircuit,
+        now: datetime.datetime,
+        brightness: int,
+        temperature: int,
+    ) -> None:
+        """Arm the circuit's timer for when its target next crosses the threshold.
+
+        The timer also fires at the next schedule breakpoint so that a ramp is
+        picked up as soon as it starts.
+        """
+        minute = schedule.CompiledSchedule.minute_of_day(now)
+        minutes = self._schedule.minutes_until_change(
+            self._brightness_profiles[circuit.id],
+            minute,
+            brightness,
+            temperature,
+        )
+        if minutes is None:
+            # Flat schedule: nothing will change, but re-evaluate once a day.
+            minutes = schedule.MINUTES_PER_DAY
+        minutes = min(minutes, self._schedule.minutes_until_breakpoint(minute))
+
+        due = now.replace(second=0, microsecond=0) + datetime.timedelta(minutes=minutes)
+        self._schedule_circuit_lighting(circuit.id, due)
 
     async def _health_loop(self):
         """Run health checks aligned to every 15-minute mark."""
-        await asyncio.sleep(self._seconds_until_next_interval(15))
+        await self._clock.sleep(
+            self._seconds_until_next_interval(HEALTH_INTERVAL_MINUTES)
+        )
         while True:
             try:
-                await self._run_healthchecks(datetime.datetime.now())
+                await self._run_healthchecks(self._clock.now())
             except Exception as e:
                 self.logger.error(f"Error in health check loop: {e}")
-            await asyncio.sleep(self._seconds_until_next_interval(15))
+            await self._clock.sleep(
+                self._seconds_until_next_interval(HEALTH_INTERVAL_MINUTES)
+            )
 
     def _seconds_until_next_interval(self, minutes_interval: int) -> float:
         """Return seconds until the next aligned N-minute boundary."""
-        now = datetime.datetime.now()
+        now = self._clock.now()
         seconds_since_hour = now.minute * 60 + now.second + now.microsecond / 1_000_000
         interval_seconds = minutes_interval * 60
         remaining = interval_seconds - (seconds_since_hour % interval_seconds)
@@ -132,187 +427,652 @@ class LightsApp:
         """Return True if the circuit belongs to a bedroom."""
         return "bedroom" in circuit.id.lower()
 
-    async def _update_all_circuits_lighting(self, now: datetime.datetime) -> None:
-        if self._lighting_lock.locked():
-            return
-        async with self._lighting_lock:
-            self.logger.info("Updating lighting for all circuits")
-            default_transition = 30  # seconds
-            calculated_lighting = [
-                (self._calculate_circuit_lighting(circuit, now), circuit)
-                for circuit in self._config.circuits
+    def _update_circuits_lighting(
+        self, circuits: list[LightCircuit], now: datetime.datetime
+    ) -> None:
+        """Send the scheduled lighting to due circuits and re-arm their timers.
+
+        During a schedule ramp each circuit gets one long transition to the end
+        of the ramp segment, and is only woken again once that segment ends.
+        """
+        updates_by_topic: dict[
+            str, list[tuple[LightCircuit, int, int, datetime.datetime]]
+        ] = {}
+        for circuit in circuits:
+            brightness, temperature, until = self._plan_circuit_lighting(circuit, now)
+            if self._needs_lighting_update(circuit, brightness, temperature):
+                group = self._zigbee.get_group_by_id(circuit.group_id)
+                updates_by_topic.setdefault(group.base_topic, []).append(
+                    (circuit, brightness, temperature, until)
+                )
+
+            if until > now:
+                self._schedule_circuit_lighting(circuit.id, until)
+            else:
+                self._schedule_next_lighting_change(
+                    circuit, now, brightness, temperature
+                )
+
+        if updates_by_topic:
+            self._create_background_task(
+                self._dispatch_lighting_sweep(updates_by_topic)
+            )
+
+    async def _dispatch_lighting_sweep(
+        self,
+        updates_by_topic: dict[
+            str, list[tuple[LightCircuit, int, int, datetime.datetime]]
+        ],
+    ) -> None:
+        """Spread a sweep's commands evenly across the dispatch window per coordinator."""
+        started = asyncio.get_running_loop().time()
+        count = sum(len(updates) for updates in updates_by_topic.values())
+        self.logger.info(
+            f"Updating lighting for {count} circuits on "
+            f"{len(updates_by_topic)} coordinators"
+        )
+
+        await asyncio.gather(
+            *[
+                self._dispatch_topic_updates(updates)
+                for updates in updates_by_topic.values()
             ]
-            tasks = []
+        )
+
+        self.logger.info(
+            f"Lighting sweep of {count} circuits took "
+            f"{asyncio.get_running_loop().time() - started:.1f}s"
+        )
 
-            async def sleep_then_update(
-                circuit: LightCircuit, brightness: int, temperature: int
-            ) -> None:
-                await asyncio.sleep(random.uniform(0, 60))
+    async def _dispatch_topic_updates(
+        self, updates: list[tuple[LightCircuit, int, int, datetime.datetime]]
+    ) -> None:
+        default_transition = 30  # seconds
+        spacing = self._pacer.spacing(
+            len(updates), LIGHTING_UPDATE_MESSAGES, self._dispatch_window
+        )
+        for i, (circuit, brightness, temperature, until) in enumerate(updates):
+            if i:
+                await self._clock.sleep(spacing)
+
+            transition = max(
+                default_transition,
+                round((until - self._clock.now()).total_seconds()),
+            )
+            try:
                 await self._update_circuit_lighting(
-                    circuit, brightness, temperature, default_transition
+                    circuit, brightness, temperature, transition
+                )
+            except Exception as e:
+                self.logger.error(
+                    f"Failed to update lighting for {circuit.friendly_name}: {e}"
+                )
+                self._schedule_circuit_lighting(
+                    circuit.id, self._clock.now() + datetime.timedelta(minutes=1)
                 )
 
-            for (brightness, temperature), circuit in calculated_lighting:
-                if self._needs_lighting_update(circuit, brightness, temperature):
-                    tasks.append(sleep_then_update(circuit, brightness, temperature))
+    def _create_background_task(self, coroutine: typing.Coroutine) -> asyncio.Task:
+        """Start a task and keep a reference to it until it finishes."""
+        task = asyncio.create_task(coroutine)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
 
-            if tasks:
-                await asyncio.gather(*tasks)
+    def _on_device_state(
+        self,
+        ieee: str,
+        device: zigbee.ZigBeeDevice,
+        previous_properties: dict[str, typing.Any],
+        previous_updated_at: datetime.datetime | None,
+    ) -> None:
+        """Reapply scheduled lighting when a circuit's switch turns on.
+
+        Lights that lost power are picked up by _on_device_announce. Lights
+        reporting a settled level that has drifted from the last command also get
+        their circuit re-anchored.
+        """
+        self._status.update(
+            f"{self._status_path}/coordinators/{device.base_topic}",
+            last_state_at=self._clock.now(),
+        )
+        circuits = self._circuits_by_ieee.get(ieee)
+        if not circuits:
+            return
+
+        turned_on = (
+            previous_updated_at is not None
+            and device.state.properties.get("state") == "ON"
+            and previous_properties.get("state") != "ON"
+        )
+        for circuit in circuits:
+            if circuit.id in self._heal_jobs:
+                continue  # healing power-cycles the circuit on purpose
+
+            is_light = any(light.ieee == ieee for light in circuit.lights)
+            if turned_on:
+                self._request_lighting_reapply(circuit)
+            elif is_light and self._has_drifted(circuit, device):
+                self._schedule_circuit_lighting(circuit.id, self._clock.now())
+
+    def _on_device_announce(self, ieee: str, device: zigbee.ZigBeeDevice) -> None:
+        """Reapply scheduled lighting when a circuit's device rejoins after power-up."""
+        for circuit in self._circuits_by_ieee.get(ieee, []):
+            if circuit.id not in self._heal_jobs:
+                self._request_lighting_reapply(circuit)
+
+    def _has_drifted(self, circuit: LightCircuit, device: zigbee.ZigBeeDevice) -> bool:
+        """Return True the first time a light settles away from the last command."""
+        last = self._last_sent.get(circuit.id)
+        observed = self._get_observed_lighting(device, last)
+        if last is None or observed is None:
+            return False
+
+        target = (last.brightness, last.temperature)
+        if not schedule.is_significant_change(*observed, *target):
+            return False
+
+        # Only correct once per target so lights that can't reach a level
+        # (e.g. a minimum brightness) don't get commanded in a loop.
+        if self._drift_corrected.get(circuit.id) == target:
+            return False
+
+        self._drift_corrected[circuit.id] = target
+        self.logger.info(
+            "%s in %s drifted to %s, expected %s",
+            device.friendly_name,
+            circuit.friendly_name,
+            observed,
+            target,
+        )
+        return True
+
+    def _request_lighting_reapply(self, circuit: LightCircuit) -> None:
+        """Push the current scheduled lighting to a circuit, coalescing bursts."""
+        if circuit.id in self._pending_reapplies:
+            return
+
+        self._pending_reapplies.add(circuit.id)
+        self._create_background_task(self._reapply_circuit_lighting(circuit))
+
+    async def _reapply_circuit_lighting(self, circuit: LightCircuit) -> None:
+        # A switch and its bulbs report within a moment of each other; wait
+        # briefly so they result in a single reapply.
+        await self._clock.sleep(REAPPLY_DEBOUNCE_SECONDS)
+        self._pending_reapplies.discard(circuit.id)
+
+        now = self._clock.now()
+        brightness, temperature = self._calculate_circuit_lighting(circuit, now)
+        self.logger.info("Reapplying scheduled lighting to %s", circuit.friendly_name)
+        try:
+            await self._update_circuit_lighting(circuit, brightness, temperature, 1)
+        except Exception as e:
+            self.logger.error(
+                f"Failed to reapply lighting for {circuit.friendly_name}: {e}"
+            )
+
+        # Re-anchor any schedule ramp from the freshly applied state
+        self._schedule_circuit_lighting(circuit.id, now)
 
     async def _run_healthchecks(self, now: datetime.datetime) -> None:
+        """Check a budgeted subset of circuits concurrently, bounded per coordinator.
+
+        Unhealthy circuits are handed to background heal jobs so a long reset
+        on one circuit doesn't hold up diagnosis of the others.
+        """
         if self._health_lock.locked():
             return
         async with self._health_lock:
-            self.logger.info("Running health checks for all circuits")
-            calculated_lighting = [
-                (self._calculate_circuit_lighting(circuit, now), circuit)
-                for circuit in self._config.circuits
-            ]
-            for (brightness, temperature), circuit in calculated_lighting:
-                if await self._heal_circuit_if_needed(circuit, now):
-                    # After a repair, quickly bring lights back to the desired state
-                    await self._update_circuit_lighting(
-                        circuit, brightness, temperature, 1
-                    )
+            circuits = self._select_circuits_for_health_check(now)
+            self.logger.info(f"Running health checks for {len(circuits)} circuits")
+            started = asyncio.get_running_loop().time()
+            await asyncio.gather(
+                *[self._check_circuit_health(circuit, now) for circuit in circuits]
+            )
+            self.logger.info(
+                f"Health checks for {len(circuits)} circuits took "
+                f"{asyncio.get_running_loop().time() - started:.1f}s"
+            )
+
+    def _select_circuits_for_health_check(
+        self, now: datetime.datetime
+    ) -> list[LightCircuit]:
+        """Pick the circuits to check this pass.
+
+        Circuits that would exceed the maximum staleness before the next pass
+        are always checked. The rest of the budget goes to the most suspicious
+        circuits.
+        """
+        candidates = [
+            circuit
+            for circuit in self._config.circuits
+            if circuit.id not in self._heal_jobs
+        ]
+
+        # The budget must be large enough to honour the staleness guarantee
+        passes_per_staleness = max(
+            1,
+            self._max_health_staleness
+            // datetime.timedelta(minutes=HEALTH_INTERVAL_MINUTES),
+        )
+        budget = max(
+            self._health_checks_per_pass or 0,
+            math.ceil(len(candidates) / passes_per_staleness),
+        )
+
+        next_pass = now + datetime.timedelta(minutes=HEALTH_INTERVAL_MINUTES)
+        due, optional = [], []
+        for circuit in candidates:
+            checked_at = self._get_health_status(circuit).checked_at
+            if (
+                checked_at is None
+                or next_pass - checked_at > self._max_health_staleness
+            ):
+                due.append(circuit)
+            else:
+                optional.append(circuit)
+
+        optional.sort(
+            key=lambda circuit: self._get_suspicion_score(circuit, now), reverse=True
+        )
+        return due + optional[: max(0, budget - len(due))]
+
+    def _get_suspicion_score(
+        self, circuit: LightCircuit, now: datetime.datetime
+    ) -> float:
+        """Score how likely a circuit is to be unhealthy; higher is checked first."""
+        status = self._get_health_status(circuit)
+        score = 3.0 * status.consecutive_failures + status.missed_verifications
+        if status.state in ("healed", "mitigated", "failed"):
+            score += 2.0
+
+        circuit_devices: list[CircuitDevice] = [*circuit.lights, *circuit.switches]
+        devices = self._zigbee.get_devices_by_ieee(
+            [device.ieee for device in circuit_devices]
+        )
+        for device in devices:
+            # Devices that haven't reported in hours may have dropped off
+            if device.state.updated_at is None:
+                score += 1.0
+            else:
+                hours = (now - device.state.updated_at).total_seconds() / 3600
+                score += min(hours / 4, 1.0)
+
+            # Weak links (zigbee2mqtt reports 0-255) are the usual cause of drops
+            link_quality = device.state.properties.get("linkquality")
+            if isinstance(link_quality, (int, float)) and link_quality < 50:
+                score += (50 - link_quality) / 25
+
+        # Break ties in favour of the circuit checked longest ago
+        if status.checked_at is not None:
+            score += (now - status.checked_at) / self._max_health_staleness
+        return score
+
+    async def _check_circuit_health(
+        self, circuit: LightCircuit, now: datetime.datetime
+    ) -> None:
+        base_topic = self._get_circuit_base_topic(circuit)
+        semaphore = self._health_semaphores.setdefault(
+            base_topic, asyncio.Semaphore(self._health_concurrency)
+        )
+        async with semaphore:
+            try:
+                health = await self._get_circuit_health(circuit)
+            except Exception as e:
+                self.logger.error(
+                    f"Health check failed for {circuit.friendly_name}: {e}"
+                )
+                return
+
+        status = self._get_health_status(circuit)
+        status.checked_at = self._clock.now()
+        status.missed_verifications = 0
+        if health.is_healthy:
+            status.consecutive_failures = 0
+            self._set_health_state(circuit, "healthy")
+        else:
+            status.consecutive_failures += 1
+            self._set_health_state(circuit, "unhealthy")
+            self._heal_jobs[circuit.id] = self._create_background_task(
+                self._run_heal_job(circuit, health, now)
+            )
+        self._publish_circuit_status(circuit)
+
+    async def _run_heal_job(
+        self,
+        circuit: LightCircuit,
+        health: LightCircuitHealth,
+        now: datetime.datetime,
+    ) -> None:
+        """Heal a circuit; heals run one at a time per coordinator."""
+        base_topic = self._get_circuit_base_topic(circuit)
+        semaphore = self._heal_semaphores.setdefault(base_topic, asyncio.Semaphore(1))
+        try:
+            async with semaphore:
+                self._set_health_state(circuit, "healing")
+                healed = await self._heal_circuit(circuit, health, now)
+
+            if not healed:
+                self._set_health_state(circuit, "mitigated")
+                return
+
+            # After a repair, quickly bring lights back to the desired state
+            brightness, temperature = self._calculate_circuit_lighting(
+                circuit, self._clock.now()
+            )
+            await self._update_circuit_lighting(circuit, brightness, temperature, 1)
+            # Re-anchor any schedule ramp from the repaired state
+            self._schedule_circuit_lighting(circuit.id, self._clock.now())
+            self._set_health_state(circuit, "healed")
+        except Exception as e:
+            self.logger.error(f"Failed to heal {circuit.friendly_name}: {e}")
+            self._set_health_state(circuit, "failed")
+        finally:
+            self._heal_jobs.pop(circuit.id, None)
+
+    def _get_health_status(self, circuit: LightCircuit) -> CircuitHealthStatus:
+        status = self._health_statuses.get(circuit.id)
+        if status is None:
+            status = self._health_statuses[circuit.id] = CircuitHealthStatus()
+        return status
+
+    def _set_health_state(self, circuit: LightCircuit, state: HealthState) -> None:
+        status = self._get_health_status(circuit)
+        if status.state == state:
+            return
+
+        self.logger.info(
+            f"Circuit {circuit.friendly_name} health: {status.state} -> {state}"
+        )
+        status.state = state
+        status.changed_at = self._clock.now()
+        self._publish_circuit_status(circuit)
+
+    def _get_circuit_base_topic(self, circuit: LightCircuit) -> str:
+        return self._zigbee.get_group_by_id(circuit.group_id).base_topic
+
+    def _publish_circuit_status(self, circuit: LightCircuit) -> None:
+        """Refresh a circuit's status document and the summaries it counts towards."""
+        health = self._get_health_status(circuit)
+        base_topic = self._get_circuit_base_topic(circuit)
+        key = (base_topic, health.state)
+        previous = self._status_keys.get(circuit.id)
+        if previous != key:
+            self._status_keys[circuit.id] = key
+            self._health_counts[key] += 1
+            base_topics = {base_topic}
+            if previous is not None:
+                self._health_counts[previous] -= 1
+                base_topics.add(previous[0])
+            self._publish_summary_status(base_topics)
+
+        last_sent = self._last_sent.get(circuit.id)
+        self._status.publish(
+            f"{self._status_path}/circuits/{circuit.id}",
+            {
+                "id": circuit.id,
+                "friendly_name": circuit.friendly_name,
+                "group_id": circuit.group_id,
+                "coordinator": base_topic,
+                "health": health.model_dump(mode="json"),
+                "last_sent": last_sent.model_dump(mode="json") if last_sent else None,
+            },
+        )
+
+    def _unpublish_circuit_status(self, circuit_id: str) -> None:
+        self._status.remove(f"{self._status_path}/circuits/{circuit_id}")
+        previous = self._status_keys.pop(circuit_id, None)
+        if previous is not None:
+            self._health_counts[previous] -= 1
+            self._publish_summary_status({previous[0]})
+
+    def _publish_summary_status(self, base_topics: set[str]) -> None:
+        """Publish the app summary and the given coordinators' summaries."""
+        by_state: collections.Counter[str] = collections.Counter()
+        by_topic: dict[str, dict[str, int]] = {}
+        for (base_topic, state), count in self._health_counts.items():
+            if count:
+                by_state[state] += count
+                by_topic.setdefault(base_topic, {})[state] = count
+
+        self._status.publish(
+            self._status_path,
+            {
+                "circuits": sum(by_state.values()),
+                "health": dict(by_state),
+                "coordinators": {
+                    base_topic: f"{self._status_path}/coordinators/{base_topic}"
+                    for base_topic in sorted(by_topic)
+                },
+            },
+        )
+        for base_topic in base_topics:
+            health = by_topic.get(base_topic, {})
+            self._status.update(
+                f"{self._status_path}/coordinators/{base_topic}",
+                base_topic=base_topic,
+                circuits=sum(health.values()),
+                health=health,
+            )
 
     def _calculate_circuit_lighting(
         self, circuit: LightCircuit, now: datetime.datetime
     ) -> tuple[int, int]:
-        brightness_pct, temperature_k = self._get_scheduled_lighting_values(now.time())
+        minute = schedule.CompiledSchedule.minute_of_day(now)
+        profile = self._brightness_profiles.get(circuit.id)
+        if profile is None:
+            profile = self._compile_circuit_lighting(circuit)
+
+        return (
+            self._schedule.brightness_table(profile)[minute],
+            self._schedule.color_temp[minute],
+        )
 
-        return self._map_lighting_for_circuit(circuit, brightness_pct, temperature_k)
+    def _plan_circuit_lighting(
+        self, circuit: LightCircuit, now: datetime.datetime
+    ) -> tuple[int, int, datetime.datetime]:
+        """Return the circuit's next command as (brightness, temperature, until).
+
+        Outside of a ramp this is the current target with `until` equal to the
+        start of the current minute. During a ramp it is the target at the end of
+        the longest transition the devices support.
+        """
+        minute = schedule.CompiledSchedule.minute_of_day(now)
+        profile = self._brightness_profiles.get(circuit.id)
+        if profile is None:
+            profile = self._compile_circuit_lighting(circuit)
+
+        span = self._schedule.transition_minutes(
+            profile, minute, zigbee.MAX_TRANSITION_SECONDS // 60
+        )
+        end_minute = (minute + span) % schedule.MINUTES_PER_DAY
+        until = now.replace(second=0, microsecond=0) + datetime.timedelta(minutes=span)
+        return (
+            self._schedule.brightness_table(profile)[end_minute],
+            self._schedule.color_temp[end_minute],
+            until,
+        )
 
     def _needs_lighting_update(
         self, circuit: LightCircuit, brightness: int, temperature: int
     ) -> bool:
+        """Compare the target against the lights' observed state.
+
+        Falls back to the last command sent (persisted across restarts) for
+        circuits without lights reporting a settled state.
+        """
         last = self._last_sent.get(circuit.id)
+        lights = self._zigbee.get_devices_by_ieee(
+            [light.ieee for light in circuit.lights]
+        )
+        observed = [
+            lighting
+            for lighting in (
+                self._get_observed_lighting(light, last) for light in lights
+            )
+            if lighting is not None
+        ]
+        if observed:
+            return any(
+                schedule.is_significant_change(*lighting, brightness, temperature)
+                for lighting in observed
+            )
+
         if last is None:
             return True
 
-        last_brightness, last_temperature = last
-        brightness_changed = abs(brightness - last_brightness) >= 255 * 0.01
-        temperature_changed = (
-            last_temperature > 0
-            and abs(temperature - last_temperature) / last_temperature >= 0.01
+        return schedule.is_significant_change(
+            last.brightness, last.temperature, brightness, temperature
         )
-        return brightness_changed or temperature_changed
 
-    def _get_scheduled_lighting_values(
-        self, current_time: datetime.time
-    ) -> tuple[float, int]:
-        """Get current brightness and temperature from schedule based on time.
+    def _get_observed_lighting(
+        self, light: zigbee.ZigBeeDevice, last: SentLighting | None
+    ) -> tuple[int, int] | None:
+        """Return a light's reported (brightness, color_temp) if it can be trusted.
 
-        Returns:
-            tuple: (brightness_percentage, temperature_kelvin)
+        Reports from lights that are off, or that predate the end of the last
+        command's transition, don't reflect the level the light will settle at.
         """
-        schedule = sorted(
-            self._config.schedule, key=lambda x: self._time_to_minutes(x.time)
-        )
-        current_minutes = self._time_to_minutes(current_time)
-
-        for i, next_entry in enumerate(schedule):
-            is_first_entry = i == 0
-            next_minutes = self._time_to_minutes(next_entry.time)
-            prev_entry = schedule[-1] if is_first_entry else schedule[i - 1]
-            prev_minutes = self._time_to_minutes(prev_entry.time)
-            transition_minutes = self._duration_to_minutes(next_entry.transition)
+        properties = light.state.properties
+        if properties.get("state") != "ON" or "brightness" not in properties:
+            return None
+        if light.state.updated_at is None or (
+            last is not None and light.state.updated_at < last.settles_at
+        ):
+            return None
 
-            if is_first_entry:
-                prev_minutes -= 24 * 60  # wrap backwards to previous day
+        color_temp = properties.get("color_temp")
+        if color_temp is None and last is not None:
+            color_temp = last.temperature
+        return properties["brightness"], color_temp or 0
 
-            if current_minutes < prev_minutes or current_minutes > next_minutes:
-                continue
+    def _load_last_sent(self) -> None:
+        """Restore the last commands sent before a restart."""
+        if not os.path.exists(self._last_sent_file):
+            return
 
-            transition_elapsed_pct = max(
-                0.0, 1 - ((next_minutes - current_minutes) / float(transition_minutes))
+        try:
+            with open(self._last_sent_file, "rb") as file:
+                self._last_sent = SentLightingByCircuit.validate_json(file.read())
+            self.logger.info(
+                f"Restored last sent lighting for {len(self._last_sent)} circuits"
             )
-
-            return (
-                float(
-                    self._apply_transition(
-                        prev_entry.brightness / 100.0,
-                        next_entry.brightness / 100.0,
-                        transition_elapsed_pct,
-                    )
-                ),
-                int(
-                    self._apply_transition(
-                        prev_entry.temperature,
-                        next_entry.temperature,
-                        transition_elapsed_pct,
-                    )
-                ),
+        except (OSError, pydantic.ValidationError) as e:
+            self.logger.warning(f"Ignoring unreadable {self._last_sent_file}: {e}")
+
+    def _persist_last_sent(self) -> None:
+        """Write the last sent commands to disk, batching bursts of updates."""
+        if self._last_sent_flush is None or self._last_sent_flush.done():
+            self._last_sent_flush = self._create_background_task(
+                self._flush_last_sent()
             )
 
-        return schedule[-1].brightness / 100.0, schedule[-1].temperature
-
-    def _time_to_minutes(self, time: str | int | datetime.time) -> int:
-        """Convert time to minutes since midnight."""
-        if isinstance(time, int):
-            time = datetime.time(hour=time // 100, minute=time % 100)
-        elif isinstance(time, str):
-            time = datetime.time.fromisoformat(time)
-
-        return time.hour * 60 + time.minute
-
-    def _duration_to_minutes(self, duration: str) -> int:
-        if duration.endswith("s"):
-            return int(duration[:-1]) // 60
-        elif duration.endswith("m"):
-            return int(duration[:-1])
-        elif duration.endswith("h"):
-            return int(duration[:-1]) * 60
-        else:
-            raise ValueError(f"Invalid duration format: {duration}")
-
-    def _apply_transition(
-        self, start_value: int | float, end_value: int | float, elapsed_pct: float
-    ) -> int | float:
-        value = start_value + (end_value - start_value) * elapsed_pct
-        if isinstance(start_value, int):
-            return round(value)
-        return value
-
-    def _map_lighting_for_circuit(
-        self, circuit: LightCircuit, brightness_pct: float, temperature_k: int
-    ) -> tuple[int, int]:
-        has_smart_lights = circuit.lights
-
-        brightness = round(brightness_pct * 255)
-        temperature = round(1000000 / temperature_k)
+    async def _flush_last_sent(self) -> None:
+        await self._clock.sleep(LAST_SENT_FLUSH_SECONDS)
+        if not os.path.isdir(os.path.dirname(self._last_sent_file)):
+            return
 
+        temp_file = f"{self._last_sent_file}.tmp"
+        try:
+            with open(temp_file, "wb") as file:
+                file.write(SentLightingByCircuit.dump_json(self._last_sent))
+            os.replace(temp_file, self._last_sent_file)
+        except OSError as e:
+            self.logger.warning(f"Failed to persist {self._last_sent_file}: {e}")
+
+    def _compile_lighting(self) -> None:
+        """Precompute the schedule and every circuit's brightness table."""
+        self._schedule = schedule.CompiledSchedule(self._config.schedule)
+        self._brightness_profiles = {}
+        for circuit in self._config.circuits:
+            self._compile_circuit_lighting(circuit)
+
+    def _compile_circuit_lighting(self, circuit: LightCircuit) -> str:
+        profile = self._get_brightness_profile(circuit)
+        self._schedule.brightness_table(profile)
+        self._brightness_profiles[circuit.id] = profile
+        return profile
+
+    def _get_brightness_profile(self, circuit: LightCircuit) -> str:
+        """Pick the brightness curve matching the circuit's light models."""
         lights = self._zigbee.get_devices_by_ieee(
             [light.ieee for light in circuit.lights]
         )
-        if has_smart_lights and all(
-            [light.model_id == "ABL-LIGHT-Z-001" for light in lights]
-        ):
-            max_lux = 52.24734230107197
-            lux = max_lux * brightness_pct
-            brightness = round(math.exp((lux - 4.26) / 8.66))
-
-        return brightness, temperature
+        profiles = {
+            schedule.PROFILES_BY_MODEL_ID.get(light.model_id or "") for light in lights
+        }
+        # Lights of different models fall back to the linear curve
+        profile = profiles.pop() if len(profiles) == 1 else None
+        return profile or schedule.LINEAR_PROFILE
 
     async def _update_circuit_lighting(
         self, circuit: LightCircuit, brightness: int, temperature: int, transition: int
     ):
         group = self._zigbee.get_group_by_id(circuit.group_id)
 
+        await self._pacer.acquire(group.base_topic, LIGHTING_UPDATE_MESSAGES)
         await self._zigbee.set_property(
             group, "brightness", brightness, transition=transition
         )
         await self._zigbee.set_property(
             group, "color_temp", temperature, transition=transition
         )
-        self._last_sent[circuit.id] = (brightness, temperature)
+        settles_at = self._clock.now() + datetime.timedelta(seconds=transition)
+        self._last_sent[circuit.id] = SentLighting(
+            brightness=brightness, temperature=temperature, settles_at=settles_at
+        )
+        self._persist_last_sent()
+        self._publish_circuit_status(circuit)
+        if circuit.lights:
+            self._create_background_task(
+                self._verify_circuit_lighting(circuit, settles_at)
+            )
 
-    async def _heal_circuit_if_needed(
-        self, circuit: LightCircuit, now: datetime.datetime
-    ) -> bool:
-        health = await self._get_circuit_health(circuit)
-        if health.is_healthy:
-            return False
+    async def _verify_circuit_lighting(
+        self, circuit: LightCircuit, settles_at: datetime.datetime
+    ) -> None:
+        """Read back the lights once a command settles so drift can be detected."""
+        delay = (settles_at - self._clock.now()).total_seconds()
+        await self._clock.sleep(max(0, delay) + VERIFY_AFTER_SETTLE_SECONDS)
+
+        last = self._last_sent.get(circuit.id)
+        if last is None or last.settles_at != settles_at:
+            return  # superseded by a newer command
+
+        # Lights that are off may be unpowered, so only expect replies from
+        # lights that were last seen on.
+        lights = [
+            light
+            for light in self._zigbee.get_devices_by_ieee(
+                [light.ieee for light in circuit.lights]
+            )
+            if light.state.properties.get("state") == "ON"
+        ]
+        updates = [light.state.update for light in lights]
+
+        group = self._zigbee.get_group_by_id(circuit.group_id)
+        await self._pacer.acquire(group.base_topic)
+        self._zigbee.request_properties(group, ["brightness", "color_temp"])
 
+        reported = asyncio.gather(*[update.wait() for update in updates])
+        try:
+            await asyncio.wait_for(reported, VERIFY_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            missed = sum(1 for update in updates if not update.is_set())
+            self._get_health_status(circuit).missed_verifications += missed
+            self._publish_circuit_status(circuit)
+        except asyncio.CancelledError:
+            # wait_for cancels the gather but never retrieves its CancelledError
+            reported.cancel()
+            await asyncio.gather(reported, return_exceptions=True)
+            raise
+
+    async def _heal_circuit(
+        self,
+        circuit: LightCircuit,
+        health: LightCircuitHealth,
+        now: datetime.datetime,
+    ) -> bool:
+        """Repair an unhealthy circuit; return True if its lights need reapplying."""
         lights = self._zigbee.get_devices_by_ieee(
             [light.ieee for light in circuit.lights]
         )
@@ -341,7 +1101,7 @@ class LightsApp:
         elif health.ungrouped_devices:
             for device in health.ungrouped_devices:
                 group = self._zigbee.get_group_by_id(circuit.group_id)
-                await self._zigbee.add_to_group(device, group)
+                await self._zigbee.add_to_group(device, group, pacer=self._pacer)
 
         return True
 
@@ -377,7 +1137,7 @@ class LightsApp:
         )
         for switch in hardwired_switches:
             if not await self._zigbee.set_and_verify_property(
-                switch, "smartBulbMode", "Disabled"
+                switch, "smartBulbMode", "Disabled", pacer=self._pacer
             ):
                 self.logger.error(
                     f"Failed to disable smart mode on {switch.friendly_name}"
@@ -416,7 +1176,7 @@ class LightsApp:
         try:
             for switch in hardwired_switches:
                 if not await self._zigbee.set_and_verify_property(
-                    switch, "smartBulbMode", "Disabled"
+                    switch, "smartBulbMode", "Disabled", pacer=self._pacer
                 ):
                     self.logger.error(
                         f"Failed to disable smart mode on {switch.friendly_name}"
@@ -440,29 +1200,35 @@ class LightsApp:
                 if not await self._power_cycle_switches(hardwired_switches, 1):
                     continue
 
-                if not await self._zigbee.permit_join(hardwired_switches[0], 120):
+                if not await self._zigbee.permit_join(
+                    hardwired_switches[0], 120, pacer=self._pacer
+                ):
                     continue
 
                 unresponsive_devices = await self._zigbee.get_unresponsive_devices(
-                    devices_to_check=unresponsive_devices, timeout=120
+                    devices_to_check=unresponsive_devices,
+                    timeout=120,
+                    pacer=self._pacer,
                 )
                 if not unresponsive_devices:
                     break
 
             group = self._zigbee.get_group_by_id(circuit.group_id)
             for device in lights:
-                await self._zigbee.add_to_group(device, group)
+                await self._zigbee.add_to_group(device, group, pacer=self._pacer)
 
             self.logger.info(f"Successfully reset circuit {circuit.friendly_name}")
 
         finally:
             for switch in hardwired_switches:
                 await self._zigbee.set_and_verify_property(
-                    switch, "smartBulbMode", "Smart Bulb Mode"
+                    switch, "smartBulbMode", "Smart Bulb Mode", pacer=self._pacer
                 )
 
             group = self._zigbee.get_group_by_id(circuit.group_id)
-            await self._zigbee.set_property(group, "state", initial_state)
+            await self._zigbee.set_property(
+                group, "state", initial_state, pacer=self._pacer
+            )
             self.logger.info(
                 f"Restored {circuit.friendly_name} to original state: {initial_state}"
             )
@@ -477,25 +1243,25 @@ class LightsApp:
         for cycle in range(cycles):
             for device in devices:
                 if not await self._zigbee.set_and_verify_property(
-                    device, "state", "OFF"
+                    device, "state", "OFF", pacer=self._pacer
                 ):
                     self.logger.error(
                         f"Failed to turn off switch {device.friendly_name}"
                     )
                     return False
 
-            await asyncio.sleep(2)
+            await self._clock.sleep(2)
 
             for device in devices:
                 if not await self._zigbee.set_and_verify_property(
-                    device, "state", "ON"
+                    device, "state", "ON", pacer=self._pacer
                 ):
                     self.logger.error(
                         f"Failed to turn on switch {device.friendly_name}"
                     )
                     return False
 
-            await asyncio.sleep(2)
+            await self._clock.sleep(2)
 
         return True
 
@@ -508,29 +1274,40 @@ class LightsApp:
             ]
         )
 
-        base_topic = f"zigbee2mqtt-{circuit.group_id[0]}"
+        base_topic = _expected_base_topic(circuit)
         group = self._zigbee.get_group_by_id(circuit.group_id)
         for device in devices:
             if device.base_topic != base_topic:
+                # Logged every pass until the network is fixed; the log
+                # drops repeats, so keep the message free of changing state.
                 self.logger.warning(
-                    f"Device {device.friendly_name} has wrong base topic. expected {base_topic}, actual {device.base_topic}: {device}"
+                    "Device %s (%s) has wrong base topic. expected %s, actual %s",
+                    device.friendly_name,
+                    device.ieee_address,
+                    base_topic,
+                    device.base_topic,
                 )
         if group.base_topic != base_topic:
             self.logger.warning(
-                f"Group {group.friendly_name} has wrong base topic. expected {base_topic}, actual {group.base_topic}: {group}"
+                "Group %s (%s) has wrong base topic. expected %s, actual %s",
+                group.friendly_name,
+                group.id,
+                base_topic,
+                group.base_topic,
             )
 
         ungrouped_devices = await self._zigbee.get_ungrouped_devices(
-            group=group, devices_to_check=devices
+            group=group, devices_to_check=devices, pacer=self._pacer
         )
         unresponsive_devices = await self._zigbee.get_unresponsive_devices(
-            devices_to_check=list(ungrouped_devices)
+            devices_to_check=list(ungrouped_devices), pacer=self._pacer
         )
 
         self.logger.info(
-            f"Health check for circuit {circuit.friendly_name}: "
-            f"{len(unresponsive_devices)} unresponsive, "
-            f"{len(ungrouped_devices)} ungrouped devices"
+            "Health check for circuit %s: %d unresponsive, %d ungrouped devices",
+            circuit.friendly_name,
+            len(unresponsive_devices),
+            len(ungrouped_devices),
         )
 
         return LightCircuitHealth(
@@ -0,0 +1,107 @@
+"""Logging that never blocks the event loop or the MQTT network thread.
+
+Records are put on a queue as they are logged and formatted and written to
+stdout by a dedicated thread, so a slow or blocked stdout pipe only delays
+the log. Messages logged with %-style arguments are formatted on that thread
+too, so a debug message on a hot path costs a level check unless debug
+logging is enabled.
+"""
+
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+# Identical warnings are logged at most once per this many seconds
+REPEAT_INTERVAL_SECONDS = 300
+MAX_TRACKED_MESSAGES = 1000
+
+
+# Arguments that can't change between logging and formatting on the listener
+_IMMUTABLE_ARGS = (str, int, float, bool, type(None))
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records without formatting them in the logging thread.
+
+    QueueHandler formats the message before queueing it so that arguments
+    can't change before it is written. Records whose arguments are all
+    strings, numbers or None, as on the hot paths, are queued as is. Others,
+    such as a dict the caller may go on to mutate, and tracebacks, which hold
+    on to frames, are rendered before queueing.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # A lone dict argument becomes args itself, and may be mutated
+        if record.exc_info or not isinstance(record.args or (), tuple):
+            return super().prepare(record)
+        if not all(isinstance(arg, _IMMUTABLE_ARGS) for arg in record.args or ()):
+            return super().prepare(record)
+        return record
+
+
+class DuplicateFilter(logging.Filter):
+    """Drop warnings identical to one logged in the last `interval` seconds.
+
+    The next time such a warning gets through, it says how many times it was
+    suppressed. Messages below WARNING are never dropped.
+    """
+
+    def __init__(self, interval: float = REPEAT_INTERVAL_SECONDS):
+        super().__init__()
+        self._interval = interval
+        # (logger name, level, message) -> (time last logged, times suppressed)
+        self._seen: dict[tuple[str, int, str], tuple[float, int]] = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno < logging.WARNING:
+            return True
+
+        message = record.getMessage()
+        key = (record.name, record.levelno, message)
+        now = time.monotonic()
+        last_logged, suppressed = self._seen.get(key, (None, 0))
+        if last_logged is not None and now - last_logged < self._interval:
+            self._seen[key] = (last_logged, suppressed + 1)
+            return False
+
+        if len(self._seen) >= MAX_TRACKED_MESSAGES:
+            self._seen = {
+                seen_key: seen
+                for seen_key, seen in self._seen.items()
+                if now - seen[0] < self._interval
+            }
+        self._seen[key] = (now, 0)
+        if suppressed:
+            record.msg = f"{message} (repeated {suppressed} more times)"
+            record.args = None
+        return True
+
+
+def setup_logging(
+    level: int, *, tag: str | None = None
+) -> logging.handlers.QueueListener:
+    """Route the root logger through a queue to stdout; returns the started listener.
+
+    A tag, such as a worker's base topic, prefixes every line. Stop the
+    listener at shutdown to flush what is still queued.
+    """
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(
+        logging.Formatter(f"[{tag}] {LOG_FORMAT}" if tag else LOG_FORMAT)
+    )
+    stream_handler.addFilter(DuplicateFilter())
+
+    listener = logging.handlers.QueueListener(log_queue, stream_handler)
+    listener.start()
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+    return listener
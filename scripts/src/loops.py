@@ -0,0 +1,168 @@
+"""Event loop selection, and a benchmark of loop implementations.
+
+The add-on's `event_loop` option picks the loop implementation: "uvloop"
+or "asyncio" (the standard selector loop), or "auto" for uvloop when it is
+installed. uvloop is optional, so asking for it without it installed falls
+back to asyncio.
+
+    python -m src.loops --messages 100000 --probes 10000 --sweepers 10000
+
+compares the implementations on the add-on's workload: messages handed
+over from the network thread and dispatched to JSON-decoding callbacks,
+health probes waiting in asyncio.wait_for() with timeouts, and sweep
+coroutines sleeping until their slot in the dispatch window.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import threading
+import time
+import typing
+
+from . import mqtt
+
+LOOP_IMPLEMENTATIONS = ("auto", "asyncio", "uvloop")
+
+LoopFactory = typing.Callable[[], asyncio.AbstractEventLoop]
+
+
+def _uvloop_factory() -> LoopFactory | None:
+    try:
+        import uvloop
+    except ImportError:
+        return None
+    return uvloop.new_event_loop
+
+
+def select_loop(name: str, logger: logging.Logger) -> tuple[str, LoopFactory]:
+    """Return the name and factory of the loop implementation to run on."""
+    if name not in LOOP_IMPLEMENTATIONS:
+        logger.warning("Unknown event_loop %r, using asyncio", name)
+        name = "asyncio"
+
+    if name in ("auto", "uvloop"):
+        factory = _uvloop_factory()
+        if factory is not None:
+            return "uvloop", factory
+        if name == "uvloop":
+            logger.warning("uvloop is not installed, using asyncio")
+
+    return "asyncio", asyncio.new_event_loop
+
+
+class _Result(typing.NamedTuple):
+    workload: str
+    wall_seconds: float
+    cpu_seconds: float
+    operations: int
+
+    def format(self) -> str:
+        # Timers and sleeps bound the wall time, so CPU per operation is the
+        # loop's own overhead
+        return (
+            f"  {self.workload:<10} {self.operations:>8} ops"
+            f" {self.wall_seconds:7.3f}s wall {self.cpu_seconds:7.3f}s CPU"
+            f" {self.cpu_seconds / self.operations * 1e6:8.1f}us CPU/op"
+        )
+
+
+async def _dispatch(messages: int) -> int:
+    """Messages handed from a network thread to the loop, then decoded."""
+    loop = asyncio.get_running_loop()
+    router = mqtt.TopicRouter(logging.getLogger(__name__))
+    done = asyncio.Event()
+    received = 0
+
+    def on_state(topic: str, payload: str) -> None:
+        nonlocal received
+        json.loads(payload)
+        received += 1
+        if received == messages:
+            done.set()
+
+    router.add("zigbee2mqtt-a/+", on_state)
+    payload = json.dumps({"state": "ON", "brightness": 254, "color_temp": 370})
+
+    def network_thread() -> None:
+        for i in range(messages):
+            loop.call_soon_threadsafe(
+                router.dispatch, f"zigbee2mqtt-a/0x{i % 1000:016x}", payload
+            )
+
+    threading.Thread(target=network_thread, daemon=True).start()
+    await done.wait()
+    return messages
+
+
+async def _probes(probes: int) -> int:
+    """Health probes: most answered within their timeout, some timing out."""
+    loop = asyncio.get_running_loop()
+
+    async def probe() -> None:
+        answered = asyncio.Event()
+        if random.random() < 0.9:
+            loop.call_later(random.uniform(0.0, 0.2), answered.set)
+        try:
+            await asyncio.wait_for(answered.wait(), 0.25)
+        except asyncio.TimeoutError:
+            pass
+
+    await asyncio.gather(*[probe() for _ in range(probes)])
+    return probes
+
+
+async def _sweepers(sweepers: int) -> int:
+    """Sweep coroutines each sleeping until their slot in the window, a few times."""
+    rounds = 5
+
+    async def sweeper() -> None:
+        for _ in range(rounds):
+            await asyncio.sleep(random.uniform(0.0, 0.1))
+
+    await asyncio.gather(*[sweeper() for _ in range(sweepers)])
+    return sweepers * rounds
+
+
+def _run(factory: LoopFactory, workload: str, coroutine: typing.Coroutine) -> _Result:
+    random.seed(0)
+    with asyncio.Runner(loop_factory=factory) as runner:
+        started = time.perf_counter()
+        started_cpu = time.process_time()
+        operations = runner.run(coroutine)
+        return _Result(
+            workload,
+            time.perf_counter() - started,
+            time.process_time() - started_cpu,
+            operations,
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=100_000)
+    parser.add_argument("--probes", type=int, default=10_000)
+    parser.add_argument("--sweepers", type=int, default=10_000)
+    args = parser.parse_args()
+
+    implementations = [("asyncio", asyncio.new_event_loop)]
+    uvloop_factory = _uvloop_factory()
+    if uvloop_factory is None:
+        print("uvloop is not installed; benchmarking asyncio only")
+    else:
+        implementations.append(("uvloop", uvloop_factory))
+
+    for name, factory in implementations:
+        print(name)
+        for result in [
+            _run(factory, "dispatch", _dispatch(args.messages)),
+            _run(factory, "probes", _probes(args.probes)),
+            _run(factory, "sweepers", _sweepers(args.sweepers)),
+        ]:
+            print(result.format())
+
+
+if __name__ == "__main__":
+    main()
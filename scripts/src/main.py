@@ -1,22 +1,45 @@
+import argparse
 import asyncio
+import datetime
 import json
 import logging
 import os
 import signal
 import sys
-import threading
-from http.server import BaseHTTPRequestHandler, HTTPServer
+import typing
+
+from . import apps, logs, loops, profiling, shards, status
+
+if typing.TYPE_CHECKING:
+    from . import mqtt
+
+# Seconds an app may take to initialize before it is given up on
+DEFAULT_APP_INIT_TIMEOUT_SECONDS = 120
 
-from . import lights_app, mqtt
 
 class AppManager:
     """Main application manager for the Scripts add-on."""
 
-    def __init__(self):
+    def __init__(self, shard: str | None = None, http_port: int = 8787):
         self.addon_config = self._load_addon_config()
+        self._shard = shard
+        self._http_port = http_port
+        if shard is not None:
+            # A worker only connects to its own coordinator
+            self.addon_config["zigbee_base_topics"] = [shard]
+            self.addon_config["shard"] = shard
         self.logger = self._setup_logging()
-        self.apps = []
+        self.apps: list[apps.App] = []
+        self._app_states: dict[str, str] = {}
         self._shutdown_event = asyncio.Event()
+        self.status = status.StatusBoard()
+        self._mqtt_connected = False
+        self._mqtt_changed_at: datetime.datetime | None = None
+        self._http_server: status.StatusServer | None = None
+        self._loop_monitor: profiling.LoopLagMonitor | None = None
+        self._watching_mqtt = False
+        self._mqtt_client: "mqtt.MqttClient | None" = None
+        self._supervisor: shards.Supervisor | None = None
 
     def _load_addon_config(self) -> dict:
         """Load add-on configuration from Home Assistant."""
@@ -38,11 +61,9 @@ class AppManager:
         """Set up logging with the configured level."""
         log_level = self.addon_config.get("log_level", "info").upper()
 
-        # Configure root logger
-        logging.basicConfig(
-            level=getattr(logging, log_level, logging.INFO),
-            format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-            handlers=[logging.StreamHandler(sys.stdout)]
+        # Configure root logger to write to stdout from a separate thread
+        self.log_listener = logs.setup_logging(
+            getattr(logging, log_level, logging.INFO), tag=self._shard
         )
 
         return logging.getLogger("scripts")
@@ -55,41 +76,78 @@ class AppManager:
         for sig in [signal.SIGTERM, signal.SIGINT]:
             signal.signal(sig, self._signal_handler)
 
-        # Initialize enabled apps
+        # Start HTTP health endpoint first so apps show up as they become ready
+        self._publish_status()
+        await self._start_http_health()
+        self._start_loop_monitor()
+
+        base_topics = self.addon_config.get("zigbee_base_topics", [])
+        if self._shard is None and self.addon_config.get("shard_by_base_topic", False):
+            # Apps run in one worker process per coordinator instead
+            self._supervisor = shards.Supervisor(
+                self.logger, self.status, base_topics, on_change=self._publish_status
+            )
+            self._supervisor.start()
+            self.logger.info(f"Running {len(base_topics)} workers, one per base topic")
+            return
+
+        # Initialize enabled apps concurrently; each becomes ready on its own
+        enabled_apps = []
         for app_config in self.addon_config.get("apps", []):
             if not app_config.get("enabled", True):
                 self.logger.info(f"Skipping disabled app: {app_config['name']}")
                 continue
+            enabled_apps.append(app_config)
 
-            app_name = app_config["name"]
-            self.logger.info(f"Initializing app: {app_name}")
+        await asyncio.gather(*[self._start_app(app_config) for app_config in enabled_apps])
 
-            try:
-                app = await self._create_app(app_name, app_config)
-                if app:
-                    self.apps.append(app)
-                    self.logger.info(f"Successfully initialized app: {app_name}")
-            except Exception as e:
-                self.logger.error(f"Failed to initialize app {app_name}: {e}")
-                # Continue with other apps rather than failing completely
+    async def _start_app(self, app_config: dict) -> None:
+        """Create and initialize one app, giving up after its init timeout."""
+        app_name = app_config["name"]
+        timeout = app_config.get("init_timeout_seconds", DEFAULT_APP_INIT_TIMEOUT_SECONDS)
+        self.logger.info(f"Initializing app: {app_name}")
+        self._set_app_state(app_name, "starting")
 
-        # Start HTTP health endpoint
-        await self._start_http_health()
+        try:
+            app = self._create_app(app_name, app_config)
+            if app is None:
+                self._set_app_state(app_name, "unknown")
+                return
+            await asyncio.wait_for(app.initialize(), timeout)
+        except asyncio.TimeoutError:
+            self.logger.error(f"App {app_name} did not initialize within {timeout}s")
+            self._set_app_state(app_name, "timed_out")
+            return
+        except Exception as e:
+            self.logger.error(f"Failed to initialize app {app_name}: {e}")
+            # Continue with other apps rather than failing completely
+            self._set_app_state(app_name, "failed")
+            return
 
-    async def _create_app(self, app_name: str, app_config: dict):
-        """Create and initialize an app instance."""
-        if app_name == "lights":
-            app = lights_app.LightsApp(
-                logger=logging.getLogger(f"scripts.{app_name}"),
-                addon_config=self.addon_config,
-                app_config=app_config
-            )
-            await app.initialize()
-            return app
-        else:
+        self.apps.append(app)
+        self._watch_mqtt_connection()
+        self._set_app_state(app_name, "ready")
+        self.logger.info(f"Successfully initialized app: {app_name}")
+
+    def _create_app(self, app_name: str, app_config: dict) -> apps.App | None:
+        """Create an app instance, importing its module on first use."""
+        try:
+            app_class = apps.load_app_class(app_name)
+        except KeyError:
             self.logger.warning(f"Unknown app type: {app_name}")
             return None
 
+        return app_class(
+            logger=logging.getLogger(f"scripts.{app_name}"),
+            addon_config=self.addon_config,
+            app_config=app_config,
+            status_board=self.status,
+        )
+
+    def _set_app_state(self, app_name: str, state: str) -> None:
+        self._app_states[app_name] = state
+        self._publish_status()
+
     def _signal_handler(self, signum, _):
         """Handle shutdown signals."""
         if self._shutdown_event.is_set():
@@ -101,23 +159,29 @@ class AppManager:
             self.logger.info(f"Received signal {signum}, initiating shutdown...")
             self._shutdown_event.set()
 
-            if self._health_server is not None:
-                self._health_server.shutdown()
-
     async def run(self):
         """Run the application manager."""
         await self.initialize()
 
-        if not self.apps:
-            self.logger.error("No apps initialized successfully, exiting")
-            return
+        if self._supervisor is None:
+            if not self.apps:
+                self.logger.error("No apps initialized successfully, exiting")
+                return
 
-        self.logger.info(f"Running with {len(self.apps)} active apps")
+            self.logger.info(f"Running with {len(self.apps)} active apps")
 
         # Wait for shutdown signal
         await self._shutdown_event.wait()
 
         self.logger.info("Shutting down...")
+        if self._supervisor is not None:
+            await self._supervisor.stop()
+        if self._loop_monitor is not None:
+            await self._loop_monitor.stop()
+        if self._http_server is not None:
+            await self._http_server.close()
+        if self._mqtt_client is not None:
+            self._mqtt_client.stop_capture()  # flush the last buffered records
         # Apps are designed to clean up automatically when the event loop stops
 
     async def health_check(self):
@@ -126,51 +190,106 @@ class AppManager:
         return len(self.apps) > 0
 
     async def _start_http_health(self) -> None:
-        """Expose a minimal HTTP endpoint using stdlib http.server on 0.0.0.0:8787."""
-        manager = self
-
-        class HealthHandler(BaseHTTPRequestHandler):
-            def do_GET(self):  # type: ignore[override]
-                status_code, body = manager._compute_health_sync()
-                self.send_response(status_code)
-                self.send_header("Content-Type", "text/plain; charset=utf-8")
-                self.send_header("Content-Length", str(len(body)))
-                self.end_headers()
-                self.wfile.write(body.encode("utf-8"))
-
-            def log_message(self, format, *args):  # noqa: A003
-                # Suppress default access logs to keep logs clean
-                return
-
+        """Serve health and status on 0.0.0.0 (port 8787 unless a worker) from the event loop."""
         try:
-            self._health_server = HTTPServer(("0.0.0.0", 8787), HealthHandler)
-            thread = threading.Thread(target=self._health_server.serve_forever, daemon=True)
-            thread.start()
-            self.logger.info("HTTP health endpoint listening on 0.0.0.0:8787")
+            self._http_server = status.StatusServer(
+                self.logger, self.status, self._is_healthy
+            )
+            # Profiles expose stack traces and cost loop time, so they are opt-in
+            if self.addon_config.get("debug_profiling", False):
+                self._http_server.add_route(
+                    "/debug/profile", profiling.Profiler(self.logger).handle_request
+                )
+            await self._http_server.start("0.0.0.0", self._http_port)
+            self.logger.info(f"HTTP health endpoint listening on 0.0.0.0:{self._http_port}")
         except Exception as e:
             self.logger.error(f"Failed to start HTTP health endpoint: {e}")
 
-    def _compute_health_sync(self) -> tuple[int, str]:
-        """Return (status_code, body) for health endpoint (sync)."""
+    def _start_loop_monitor(self) -> None:
+        """Publish event-loop scheduling lag and the slowest stalls at /status/loop."""
+        self._loop_monitor = profiling.LoopLagMonitor(
+            self.logger,
+            self.status,
+            interval=self.addon_config.get("loop_monitor_interval_seconds", 0.5),
+            stall_threshold=self.addon_config.get("loop_stall_threshold_ms", 100) / 1000,
+        )
+        self._loop_monitor.start()
+
+    def _watch_mqtt_connection(self) -> None:
+        """Track the MQTT connection from its events instead of polling the client.
+
+        Called as each app becomes ready; the first app to be ready has
+        connected the shared client.
+        """
+        if self._watching_mqtt:
+            return
+        self._watching_mqtt = True
+
+        from . import mqtt  # only once an app has needed it
+
         try:
-            apps_ok = len(self.apps) > 0
-            try:
-                mqtt_client = mqtt.MqttClient(self.logger, self.addon_config)
-                mqtt_ok = mqtt_client.is_connected
-            except Exception:
-                mqtt_ok = False
-
-            healthy = apps_ok and mqtt_ok
-            return (200, "connected\n") if healthy else (500, "disconnected\n")
+            self._mqtt_client = mqtt.MqttClient(self.logger, self.addon_config)
+            self._mqtt_client.add_connection_listener(self._on_mqtt_connection)
+            self._mqtt_connected = self._mqtt_client.is_connected
         except Exception as e:
-            self.logger.debug(f"Health computation error: {e}")
-            return (500, "disconnected\n")
+            self.logger.error(f"Failed to watch MQTT connection: {e}")
+            self._mqtt_connected = False
+        self._mqtt_changed_at = datetime.datetime.now()
+
+    def _on_mqtt_connection(self, connected: bool) -> None:
+        self._mqtt_connected = connected
+        self._mqtt_changed_at = datetime.datetime.now()
+        self._publish_status()
+
+    def _is_healthy(self) -> bool:
+        if self._supervisor is not None:
+            return self._supervisor.is_healthy()
+        return len(self.apps) > 0 and self._mqtt_connected
+
+    def _publish_status(self) -> None:
+        if self._supervisor is not None:
+            self.status.publish(
+                "/status",
+                {
+                    "healthy": self._is_healthy(),
+                    "loop": "/status/loop",
+                    "workers": {
+                        worker.base_topic: f"/status/workers/{worker.base_topic}"
+                        for worker in self._supervisor.workers
+                    },
+                    "apps": {
+                        app_name: {"status": f"/status/apps/{app_name}"}
+                        for app_name in sorted(
+                            {
+                                app_name
+                                for worker in self._supervisor.workers
+                                for app_name in worker.app_summaries
+                            }
+                        )
+                    },
+                },
+            )
+            return
 
+        self.status.publish(
+            "/status",
+            {
+                "healthy": self._is_healthy(),
+                "shard": self._shard,
+                "mqtt": {
+                    "connected": self._mqtt_connected,
+                    "changed_at": self._mqtt_changed_at,
+                },
+                "loop": "/status/loop",
+                "apps": {
+                    app_name: {"state": state, "status": f"/status/apps/{app_name}"}
+                    for app_name, state in self._app_states.items()
+                },
+            },
+        )
 
-async def main():
+async def main(manager: AppManager):
     """Main entry point."""
-    manager = AppManager()
-
     try:
         await manager.run()
     except KeyboardInterrupt:
@@ -180,7 +299,21 @@ async def main():
         sys.exit(1)
     finally:
         manager.logger.info("Scripts add-on stopped")
+        manager.log_listener.stop()  # flush queued log records
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--worker", metavar="BASE_TOPIC", help="run as the worker for one base topic")
+    parser.add_argument("--port", type=int, default=8787, help="port for health and status")
+    args = parser.parse_args()
+
+    manager = AppManager(shard=args.worker, http_port=args.port)
+
+    # Run on uvloop when it's installed, unless configured otherwise
+    loop_name, loop_factory = loops.select_loop(
+        manager.addon_config.get("event_loop", "auto"), manager.logger
+    )
+    manager.logger.info(f"Using the {loop_name} event loop")
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        runner.run(main(manager))
@@ -10,7 +10,62 @@ import typing
 
 import paho.mqtt.client
 
-from . import utils
+from . import capture, utils
+
+MessageCallback = typing.Callable[[str, str], None]
+# Called on the event loop with True on connect and False on disconnect
+ConnectionListener = typing.Callable[[bool], None]
+
+
+class Client(typing.Protocol):
+    """The MQTT interface ZigBeeClient uses, so replays can stand in for MqttClient."""
+
+    async def initialize(self) -> None: ...
+
+    def publish(
+        self, topic: str, payload: dict, qos: int = 0, retain: bool = False
+    ) -> None: ...
+
+    def subscribe(
+        self, topic: str, callback: MessageCallback, qos: int = 0
+    ) -> None: ...
+
+    def unsubscribe(self, topic: str, callback: MessageCallback) -> None: ...
+
+
+def topic_pattern(topic: str) -> re.Pattern:
+    """Compile an MQTT subscription filter (with + and # wildcards) to a regex."""
+    topic = re.escape(topic)
+    topic = topic.replace(r"\+", r"[^/]+")
+    topic = topic.replace(r"\#", r".+")
+    return re.compile(f"^{topic}$")
+
+
+class TopicRouter:
+    """Dispatches received messages to the callbacks subscribed to matching topics."""
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self._callbacks: list[tuple[str, re.Pattern, MessageCallback]] = []
+
+    def is_subscribed(self, topic: str) -> bool:
+        return any(topic == existing_topic for existing_topic, _, _ in self._callbacks)
+
+    def add(self, topic: str, callback: MessageCallback) -> None:
+        self._callbacks.append((topic, topic_pattern(topic), callback))
+
+    def remove(self, topic: str, callback: MessageCallback) -> None:
+        self._callbacks = [
+            c for c in self._callbacks if c[0] != topic or c[2] != callback
+        ]
+
+    def dispatch(self, topic: str, payload: str) -> None:
+        for _, pattern, callback in self._callbacks:
+            if pattern.match(topic):
+                try:
+                    callback(topic, payload)
+                except Exception as e:
+                    self.logger.error("Error in callback for topic %s: %s", topic, e)
 
 
 @utils.singleton
@@ -18,8 +73,16 @@ class MqttClient:
     _lock: asyncio.Lock = asyncio.Lock()
     _is_initialized: bool = False
 
-    def __init__(self, logger: logging.Logger, addon_config: dict):
+    def __init__(
+        self,
+        logger: logging.Logger,
+        addon_config: dict,
+        *,
+        client_factory: typing.Callable[[], paho.mqtt.client.Client] = paho.mqtt.client.Client,
+    ):
         self.logger = logger
+        # Builds the paho client; benchmarks swap in an in-process transport
+        self._client_factory = client_factory
 
         # Try to get MQTT config from addon options first
         if addon_config and all(key in addon_config for key in ["mqtt_host", "mqtt_username", "mqtt_password"]):
@@ -35,6 +98,18 @@ class MqttClient:
             self._username = mqtt_config["username"]
             self._password = mqtt_config["password"]
 
+        # Optionally tee all traffic into a capture file for offline replay
+        options = addon_config or {}
+        self._capture_file = options.get("mqtt_capture_file")
+        if self._capture_file and options.get("shard"):
+            # Worker processes each record their own coordinator's traffic
+            root, extension = os.path.splitext(self._capture_file)
+            self._capture_file = f"{root}.{options['shard']}{extension}"
+        self._capture_max_bytes = options.get("mqtt_capture_max_mb", 64) * 1024 * 1024
+        self._capture_backups = options.get("mqtt_capture_backups", 3)
+        self._capture: capture.CaptureWriter | None = None
+        self._connection_listeners: list[ConnectionListener] = []
+
     async def initialize(self) -> None:
         if self._is_initialized:
             return
@@ -44,10 +119,9 @@ class MqttClient:
                 return
 
             self.logger.info("Initializing MQTT client")
-            self._client = paho.mqtt.client.Client()
-            self._callbacks: list[
-                tuple[str, re.Pattern, typing.Callable[[str, str], None]]
-            ] = []
+            self._loop = asyncio.get_running_loop()
+            self._client = self._client_factory()
+            self._router = TopicRouter(self.logger)
             self._connected = False
             self._connect_event = asyncio.Event()
 
@@ -59,6 +133,14 @@ class MqttClient:
             # Set up authentication
             self._client.username_pw_set(self._username, self._password)
 
+            if self._capture_file:
+                self.logger.info(f"Capturing MQTT traffic to {self._capture_file}")
+                self._capture = capture.CaptureWriter(
+                    self._capture_file,
+                    max_bytes=self._capture_max_bytes,
+                    backups=self._capture_backups,
+                )
+
             self._client.connect(self._broker_host, self._broker_port, 60)
             self._client.loop_start()
 
@@ -72,21 +154,20 @@ class MqttClient:
             self._is_initialized = True
 
     def publish(self, topic: str, payload: dict, qos: int = 0, retain: bool = False):
-        self.logger.debug(f"Publishing to MQTT topic {topic}: {payload}")
+        data = json.dumps(payload)
+        self.logger.debug("Publishing to MQTT topic %s: %s", topic, data)
+        if self._capture is not None:
+            self._capture.write(capture.OUTBOUND, topic, data.encode("utf-8"))
 
-        error_code, _ = self._client.publish(topic, json.dumps(payload), qos, retain)
+        error_code, _ = self._client.publish(topic, data, qos, retain)
         if error_code != paho.mqtt.client.MQTT_ERR_SUCCESS:
             raise Exception(f"Failed to publish to MQTT topic {topic}: {paho.mqtt.client.error_string(error_code)} ({error_code})")
 
     def subscribe(
         self, topic: str, callback: typing.Callable[[str, str], None], qos: int = 0
     ):
-        self.logger.debug(f"Subscribing to MQTT topic {topic}")
-        is_already_subscribed = any(
-            topic == existing_topic for existing_topic, _, _ in self._callbacks
-        )
-
-        if not is_already_subscribed:
+        self.logger.debug("Subscribing to MQTT topic %s", topic)
+        if not self._router.is_subscribed(topic):
             error_code, _ = self._client.subscribe(topic, qos)
 
             if error_code != paho.mqtt.client.MQTT_ERR_SUCCESS:
@@ -94,40 +175,27 @@ class MqttClient:
                     f"Failed to subscribe to MQTT topic {topic}: {paho.mqtt.client.error_string(error_code)} ({error_code})"
                 )
 
-        self._callbacks.append((topic, self._convert_topic_to_regex(topic), callback))
+        self._router.add(topic, callback)
 
     def unsubscribe(self, topic: str, callback: typing.Callable[[str, str], None]):
         """Unsubscribe from MQTT topic."""
-        self.logger.debug(f"Unsubscribing from MQTT topic {topic}")
+        self.logger.debug("Unsubscribing from MQTT topic %s", topic)
 
-        matching_callbacks = [
-            c for c in self._callbacks if c[0] == topic and c[1] == callback
-        ]
-        is_last_subscription = not any(
-            c[0] == topic and c not in matching_callbacks for c in self._callbacks
-        )
-        if is_last_subscription:
+        self._router.remove(topic, callback)
+        if not self._router.is_subscribed(topic):
             error_code, _ = self._client.unsubscribe(topic)
             if error_code != paho.mqtt.client.MQTT_ERR_SUCCESS:
                 raise Exception(
                     f"Failed to unsubscribe from MQTT topic {topic}: {paho.mqtt.client.error_string(error_code)} ({error_code})"
                 )
 
-        for c in matching_callbacks:
-            self._callbacks.remove(c)
-
-    def _convert_topic_to_regex(self, topic: str) -> re.Pattern:
-        topic = re.escape(topic)
-        topic = topic.replace(r"\+", r"[^/]+")
-        topic = topic.replace(r"\#", r".+")
-        return re.compile(f"^{topic}$")
-
     def _on_connect(self, client, userdata, flags, error_code):
         """Callback for when client connects to broker."""
         if error_code == paho.mqtt.client.MQTT_ERR_SUCCESS:
             self._connected = True
             self.logger.info("Connected to MQTT broker")
             self._connect_event.set()
+            self._notify_connection(True)
         else:
             self.logger.error(f"Failed to connect to MQTT broker: {paho.mqtt.client.error_string(error_code)} ({error_code})")
             self._connect_event.set()
@@ -135,6 +203,7 @@ class MqttClient:
     def _on_disconnect(self, client, userdata, error_code):
         """Callback for when client disconnects from broker."""
         self._connected = False
+        self._notify_connection(False)
         if error_code != paho.mqtt.client.MQTT_ERR_SUCCESS:
             self.logger.warning(f"Unexpected disconnection from MQTT broker: {paho.mqtt.client.error_string(error_code)} ({error_code})")
         else:
@@ -144,16 +213,29 @@ class MqttClient:
     def _on_message(self, client, userdata, msg):
         """Handle incoming MQTT messages."""
         topic = msg.topic
+        if self._capture is not None:
+            self._capture.write(
+                capture.INBOUND, topic, msg.payload, retain=msg.retain
+            )
         payload = msg.payload.decode("utf-8")
 
-        self.logger.debug(f"Received MQTT message on {topic}: {payload}")
+        self.logger.debug("Received MQTT message on %s: %s", topic, payload)
 
-        for _, pattern, callback in self._callbacks:
-            if pattern.match(topic):
-                try:
-                    callback(topic, payload)
-                except Exception as e:
-                    self.logger.error(f"Error in callback for topic {topic}: {e}")
+        self._router.dispatch(topic, payload)
+
+    def stop_capture(self) -> None:
+        """Flush and close the traffic capture, if one is being written."""
+        writer, self._capture = self._capture, None
+        if writer is not None:
+            writer.close()
+
+    def add_connection_listener(self, listener: ConnectionListener) -> None:
+        """Register a callback to run on the event loop when the connection changes."""
+        self._connection_listeners.append(listener)
+
+    def _notify_connection(self, connected: bool) -> None:
+        for listener in self._connection_listeners:
+            self._loop.call_soon_threadsafe(listener, connected)
 
     @property
     def is_connected(self) -> bool:
@@ -0,0 +1,34 @@
+import asyncio
+
+
+class TopicPacer:
+    """Spaces outgoing messages per zigbee2mqtt base topic to a fixed rate budget.
+
+    Each coordinator gets its own budget, so a burst on one base topic never
+    delays commands on another. There is no burst allowance: every message
+    reserves the next free slot on its topic.
+    """
+
+    def __init__(self, messages_per_second: float):
+        if messages_per_second <= 0:
+            raise ValueError("messages_per_second must be positive")
+
+        self.messages_per_second = messages_per_second
+        self._next_free: dict[str, float] = {}
+
+    async def acquire(self, base_topic: str, messages: int = 1) -> None:
+        """Wait until the base topic's budget allows sending `messages` messages."""
+        delay = self.reserve(base_topic, messages)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def reserve(self, base_topic: str, messages: int = 1) -> float:
+        """Reserve the next free slot and return seconds until it starts."""
+        now = asyncio.get_running_loop().time()
+        start = max(now, self._next_free.get(base_topic, now))
+        self._next_free[base_topic] = start + messages / self.messages_per_second
+        return start - now
+
+    def spacing(self, count: int, messages: int, window: float) -> float:
+        """Return the even spacing for `count` commands spread across `window`."""
+        return max(window / count, messages / self.messages_per_second)
@@ -0,0 +1,242 @@
+"""Event-loop lag monitoring and on-demand profiling of the running add-on.
+
+LoopLagMonitor measures how late the event loop runs a timer, which is how
+long anything scheduled behind a blocking callback waits. A watchdog thread
+captures the loop thread's stack while the loop is stalled, so the slowest
+stalls are published along with what was running. Profiler takes a
+time-boxed profile on request, for the status server's /debug/profile.
+"""
+
+import asyncio
+import bisect
+import collections
+import cProfile
+import datetime
+import logging
+import marshal
+import os
+import sys
+import threading
+import time
+import types
+import typing
+
+from . import status
+
+# Upper bounds of the lag histogram buckets, in milliseconds
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+SLOWEST_STALLS = 10
+MAX_PROFILE_SECONDS = 60
+PROFILE_SAMPLE_INTERVAL_SECONDS = 0.005
+
+
+def _frame_name(code: types.CodeType) -> str:
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+def _stack(frame: types.FrameType | None) -> list[str]:
+    """Frame names of a stack, outermost first."""
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    names.reverse()
+    return names
+
+
+class LoopLagMonitor:
+    """Record how late the event loop runs timers, and what blocked it.
+
+    A task sleeps for `interval` seconds at a time and records how much
+    later than asked it woke up. Meanwhile a thread checks that the task
+    keeps ticking; once it is `stall_threshold` seconds overdue, the thread
+    samples the loop thread's stack, which is the code blocking the loop.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        board: status.StatusBoard,
+        *,
+        interval: float = 0.5,
+        stall_threshold: float = 0.1,
+        path: str = "/status/loop",
+    ):
+        self.logger = logger
+        self._board = board
+        self._interval = interval
+        self._stall_threshold = stall_threshold
+        self._path = path
+
+        self._histogram = [0] * (len(LAG_BUCKETS_MS) + 1)
+        self._samples = 0
+        self._max_lag = 0.0
+        self._slowest: list[dict[str, typing.Any]] = []
+
+        self._lock = threading.Lock()
+        self._expected_at = 0.0  # time.monotonic() the next tick is due
+        self._stall_stack: list[str] | None = None
+        self._loop_thread_id: int | None = None
+        self._task: asyncio.Task | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._expected_at = time.monotonic() + self._interval
+        self._task = asyncio.create_task(self._run())
+        threading.Thread(
+            target=self._watch, name="loop-lag-watchdog", daemon=True
+        ).start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._lock:
+                self._expected_at = time.monotonic() + self._interval
+            due = loop.time() + self._interval
+            await asyncio.sleep(self._interval)
+            lag = max(loop.time() - due, 0.0)
+
+            with self._lock:
+                stack, self._stall_stack = self._stall_stack, None
+            self._record(lag, stack)
+
+    def _record(self, lag: float, stack: list[str] | None) -> None:
+        lag_ms = lag * 1000
+        self._histogram[bisect.bisect_left(LAG_BUCKETS_MS, lag_ms)] += 1
+        self._samples += 1
+        self._max_lag = max(self._max_lag, lag)
+
+        if lag >= self._stall_threshold:
+            self.logger.debug("Event loop stalled for %.0fms", lag_ms)
+            self._slowest.append(
+                {
+                    "lag_ms": round(lag_ms, 1),
+                    "at": datetime.datetime.now(),
+                    "stack": stack,
+                }
+            )
+            self._slowest.sort(key=lambda stall: stall["lag_ms"], reverse=True)
+            del self._slowest[SLOWEST_STALLS:]
+
+        self._board.publish(self._path, self._document())
+
+    def _document(self) -> dict[str, typing.Any]:
+        buckets = {}
+        cumulative = 0
+        for bound, count in zip(LAG_BUCKETS_MS, self._histogram):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        buckets["+Inf"] = self._samples
+        return {
+            "interval_seconds": self._interval,
+            "samples": self._samples,
+            "max_lag_ms": round(self._max_lag * 1000, 1),
+            # Cumulative count of ticks at most this many milliseconds late
+            "lag_ms_buckets": buckets,
+            "slowest_stalls": self._slowest,
+        }
+
+    def _watch(self) -> None:
+        """Sample the loop thread's stack once the loop is stalled."""
+        check_interval = self._stall_threshold / 2
+        # start() records the loop thread before starting this one
+        assert self._loop_thread_id is not None
+        while not self._stopped.wait(check_interval):
+            with self._lock:
+                overdue = time.monotonic() - self._expected_at
+                if overdue < self._stall_threshold or self._stall_stack is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                self._stall_stack = _stack(frame)
+
+
+class Profiler:
+    """Time-boxed profiles of the running event loop, one at a time.
+
+    Serves GET /debug/profile?seconds=N&format=collapsed|pstats:
+
+    - collapsed: the loop thread's stack sampled every 5ms, as
+      "outer;inner count" lines for flamegraph.pl or speedscope
+    - pstats: a cProfile of the loop thread, loadable with pstats.Stats
+    """
+
+    def __init__(self, logger: logging.Logger):
+        self.logger = logger
+        self._running = False
+
+    async def handle_request(self, query: dict[str, str]) -> tuple[str, str, bytes]:
+        try:
+            seconds = float(query.get("seconds", "10"))
+        except ValueError:
+            return "400 Bad Request", "text/plain; charset=utf-8", b"bad seconds\n"
+        if not 0 < seconds <= MAX_PROFILE_SECONDS:
+            return (
+                "400 Bad Request",
+                "text/plain; charset=utf-8",
+                f"seconds must be between 0 and {MAX_PROFILE_SECONDS}\n".encode(),
+            )
+
+        output = query.get("format", "collapsed")
+        if output not in ("collapsed", "pstats"):
+            return "400 Bad Request", "text/plain; charset=utf-8", b"bad format\n"
+
+        if self._running:
+            return (
+                "409 Conflict",
+                "text/plain; charset=utf-8",
+                b"a profile is already running\n",
+            )
+
+        self._running = True
+        self.logger.info("Profiling for %ss (%s)", seconds, output)
+        try:
+            if output == "pstats":
+                body = await self.profile(seconds)
+                return "200 OK", "application/octet-stream", body
+            body = await self.sample(seconds)
+            return "200 OK", "text/plain; charset=utf-8", body
+        finally:
+            self._running = False
+
+    async def sample(self, seconds: float) -> bytes:
+        """Sample the loop thread's stack from another thread, as collapsed stacks."""
+        loop_thread_id = threading.get_ident()
+        counts: collections.Counter[str] = collections.Counter()
+
+        def run() -> None:
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                frame = sys._current_frames().get(loop_thread_id)
+                if frame is not None:
+                    counts[";".join(_stack(frame))] += 1
+                time.sleep(PROFILE_SAMPLE_INTERVAL_SECONDS)
+
+        await asyncio.to_thread(run)
+        return "".join(
+            f"{stack} {count}\n" for stack, count in counts.most_common()
+        ).encode("utf-8")
+
+    async def profile(self, seconds: float) -> bytes:
+        """Profile everything the loop thread runs, as a marshalled pstats dump."""
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profile.disable()
+
+        profile.create_stats()
+        return marshal.dumps(profile.stats)
@@ -0,0 +1,226 @@
+"""Replay an MQTT capture through MqttClient's dispatch path.
+
+Feeds a capture's inbound messages into a ZigBeeClient with their original
+spacing, sped up, or back to back, so topic dispatch, JSON decoding and
+state-update throughput can be profiled against real traffic:
+
+    python -m src.replay info /share/mqtt/capture.bin
+    python -m src.replay replay /share/mqtt/capture.bin --speed max
+    python -m src.replay replay /share/mqtt/capture.bin --speed 10x
+"""
+
+import argparse
+import asyncio
+import logging
+import re
+import time
+import typing
+
+import pydantic
+
+from . import capture, mqtt, zigbee
+
+# Retained topics zigbee2mqtt publishes that ZigBeeClient waits for on startup
+_DISCOVERY_TOPIC = re.compile(r".*/bridge/(devices|groups)$")
+
+
+class ReplayMqttClient:
+    """MqttClient stand-in that receives messages from a capture.
+
+    Subscriptions go through the same TopicRouter as MqttClient. The
+    capture's first value of each retained topic is handed to new subscribers
+    like a broker would; publishes are only counted.
+    """
+
+    def __init__(self, logger: logging.Logger, retained: dict[str, str]):
+        self.logger = logger
+        self._router = mqtt.TopicRouter(logger)
+        self._retained = retained
+        self.published = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    def publish(self, topic: str, payload: dict, qos: int = 0, retain: bool = False):
+        self.published += 1
+
+    def subscribe(
+        self, topic: str, callback: typing.Callable[[str, str], None], qos: int = 0
+    ):
+        self._router.add(topic, callback)
+        pattern = mqtt.topic_pattern(topic)
+        loop = asyncio.get_running_loop()
+        for retained_topic, payload in self._retained.items():
+            if pattern.match(retained_topic):
+                loop.call_soon(callback, retained_topic, payload)
+
+    def unsubscribe(self, topic: str, callback: typing.Callable[[str, str], None]):
+        self._router.remove(topic, callback)
+
+    def dispatch(self, topic: str, payload: str) -> None:
+        self._router.dispatch(topic, payload)
+
+    @property
+    def is_connected(self) -> bool:
+        return True
+
+
+class ReplayReport(pydantic.BaseModel):
+    messages: int
+    payload_bytes: int
+    state_updates: int
+    capture_seconds: float
+    wall_seconds: float
+
+    def format(self) -> str:
+        rate = self.messages / self.wall_seconds if self.wall_seconds else 0.0
+        return "\n".join(
+            [
+                f"Replayed {self.messages} messages ({self.payload_bytes} bytes) "
+                f"spanning {self.capture_seconds:.1f}s in {self.wall_seconds:.2f}s",
+                f"  {rate:.0f} messages/s, {self.state_updates} device state updates",
+            ]
+        )
+
+
+async def replay(
+    messages: list[capture.CapturedMessage],
+    client: ReplayMqttClient,
+    *,
+    speed: float | None = None,
+) -> tuple[int, int]:
+    """Dispatch a capture's inbound messages with their original spacing.
+
+    The spacing is divided by `speed`; with no speed, messages are dispatched
+    back to back. Returns the number of messages and payload bytes replayed.
+    """
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    first_timestamp = messages[0].timestamp if messages else 0.0
+    count = payload_bytes = 0
+    for message in messages:
+        if message.direction != capture.INBOUND:
+            continue
+
+        if speed is not None:
+            due = started + (message.timestamp - first_timestamp) / speed
+            if due > loop.time():
+                await asyncio.sleep(due - loop.time())
+        elif count % 1000 == 0:
+            # Let listeners scheduled by earlier messages run
+            await asyncio.sleep(0)
+
+        client.dispatch(message.topic, message.payload.decode("utf-8"))
+        count += 1
+        payload_bytes += len(message.payload)
+
+    await asyncio.sleep(0)
+    return count, payload_bytes
+
+
+async def _replay_into_zigbee(path: str, speed: float | None) -> ReplayReport:
+    logger = logging.getLogger("scripts.replay")
+    messages = list(capture.read_capture(path))
+
+    retained: dict[str, str] = {}
+    for message in messages:
+        if message.direction == capture.RETAINED or (
+            message.direction == capture.INBOUND
+            and _DISCOVERY_TOPIC.match(message.topic)
+        ):
+            retained.setdefault(message.topic, message.payload.decode("utf-8"))
+    base_topics = sorted(
+        topic.removesuffix("/bridge/devices")
+        for topic in retained
+        if topic.endswith("/bridge/devices")
+    )
+    if not base_topics:
+        raise ValueError(f"{path} has no zigbee2mqtt bridge/devices message")
+
+    client = ReplayMqttClient(logger, retained)
+    zigbee_client = zigbee.ZigBeeClient(
+        logger, {"zigbee_base_topics": base_topics}, mqtt_client=client
+    )
+    await zigbee_client.initialize()
+
+    state_updates = 0
+
+    def on_state(*args) -> None:
+        nonlocal state_updates
+        state_updates += 1
+
+    zigbee_client.add_state_listener(on_state)
+
+    wall_started = time.perf_counter()
+    count, payload_bytes = await replay(messages, client, speed=speed)
+    wall_seconds = time.perf_counter() - wall_started
+
+    return ReplayReport(
+        messages=count,
+        payload_bytes=payload_bytes,
+        state_updates=state_updates,
+        capture_seconds=(
+            messages[-1].timestamp - messages[0].timestamp if messages else 0.0
+        ),
+        wall_seconds=wall_seconds,
+    )
+
+
+def _parse_speed(value: str) -> float | None:
+    if value == "max":
+        return None
+    speed = float(value.removesuffix("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive")
+    return speed
+
+
+def _print_info(path: str) -> None:
+    counts: dict[tuple[int, str], tuple[int, int]] = {}
+    first = last = None
+    for message in capture.read_capture(path):
+        first = message.timestamp if first is None else first
+        last = message.timestamp
+        key = (message.direction, message.topic.split("/")[0])
+        messages, payload_bytes = counts.get(key, (0, 0))
+        counts[key] = (messages + 1, payload_bytes + len(message.payload))
+
+    print(f"Files: {', '.join(capture.capture_files(path))}")
+    if first is not None and last is not None:
+        print(f"Span: {last - first:.1f}s")
+    for (direction, base_topic), (messages, payload_bytes) in sorted(counts.items()):
+        label = {capture.INBOUND: "in", capture.OUTBOUND: "out"}.get(
+            direction, "retained"
+        )
+        print(f"  {label:<8} {base_topic}: {messages} messages, {payload_bytes} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log-level", default="warning")
+    commands = parser.add_subparsers(dest="command", required=True)
+    info = commands.add_parser("info", help="summarise a capture")
+    info.add_argument("path")
+    replay_parser = commands.add_parser("replay", help="replay into a ZigBeeClient")
+    replay_parser.add_argument("path")
+    replay_parser.add_argument(
+        "--speed",
+        type=_parse_speed,
+        default=None,
+        help='"max" (default), or a multiple of real time such as 1 or 10x',
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.WARNING),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    if args.command == "info":
+        _print_info(args.path)
+    else:
+        print(asyncio.run(_replay_into_zigbee(args.path, args.speed)).format())
+
+
+if __name__ == "__main__":
+    main()
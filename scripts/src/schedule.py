@@ -0,0 +1,260 @@
+import bisect
+import datetime
+import math
+import typing
+
+if typing.TYPE_CHECKING:
+    from .lights_app import LightSchedule
+
+MINUTES_PER_DAY = 24 * 60
+
+LINEAR_PROFILE = "linear"
+ABL_LIGHT_PROFILE = "abl"
+# Brightness profiles of light models calibrated for something other than linear
+PROFILES_BY_MODEL_ID = {"ABL-LIGHT-Z-001": ABL_LIGHT_PROFILE}
+
+
+def time_to_minutes(time: str | int | datetime.time) -> int:
+    """Convert time to minutes since midnight."""
+    if isinstance(time, int):
+        time = datetime.time(hour=time // 100, minute=time % 100)
+    elif isinstance(time, str):
+        time = datetime.time.fromisoformat(time)
+
+    return time.hour * 60 + time.minute
+
+
+def duration_to_minutes(duration: str) -> int:
+    if duration.endswith("s"):
+        return int(duration[:-1]) // 60
+    elif duration.endswith("m"):
+        return int(duration[:-1])
+    elif duration.endswith("h"):
+        return int(duration[:-1]) * 60
+    else:
+        raise ValueError(f"Invalid duration format: {duration}")
+
+
+def map_brightness(profile: str, brightness_pct: float) -> int:
+    """Map a scheduled brightness percentage onto a device brightness level."""
+    if profile == ABL_LIGHT_PROFILE:
+        max_lux = 52.24734230107197
+        lux = max_lux * brightness_pct
+        return round(math.exp((lux - 4.26) / 8.66))
+
+    return round(brightness_pct * 255)
+
+
+def is_significant_change(
+    last_brightness: int, last_color_temp: int, brightness: int, color_temp: int
+) -> bool:
+    """Return True if a target differs from the last one by at least 1%."""
+    brightness_changed = abs(brightness - last_brightness) >= 255 * 0.01
+    color_temp_changed = (
+        last_color_temp > 0
+        and abs(color_temp - last_color_temp) / last_color_temp >= 0.01
+    )
+    return brightness_changed or color_temp_changed
+
+
+class CompiledSchedule:
+    """Lighting schedule evaluated once for every minute of the day.
+
+    The schedule entries are parsed and interpolated when the config is loaded,
+    so looking up the target for a given time is an index into a table.
+    Device-level tables (brightness per profile, color temperature in mireds)
+    are derived from the same minute table and cached.
+    """
+
+    def __init__(self, entries: "list[LightSchedule]"):
+        if not entries:
+            raise ValueError("Schedule must contain at least one entry")
+
+        self._entries = sorted(entries, key=lambda x: time_to_minutes(x.time))
+        self._brightness_by_profile: dict[str, list[int]] = {}
+        self._next_change_cache: dict[tuple[str, int, int, int], int | None] = {}
+        self._transition_cache: dict[tuple[str, int, int], int] = {}
+
+        # Minutes of the day where the schedule's slope changes: the start and
+        # end of each entry's transition.
+        self._breakpoints = sorted(
+            {
+                minutes % MINUTES_PER_DAY
+                for entry in self._entries
+                for minutes in (
+                    time_to_minutes(entry.time),
+                    time_to_minutes(entry.time) - duration_to_minutes(entry.transition),
+                )
+            }
+        )
+
+        self.brightness_pct: list[float] = []
+        self.temperature_k: list[int] = []
+        for minute in range(MINUTES_PER_DAY):
+            brightness_pct, temperature_k = self._evaluate(minute)
+            self.brightness_pct.append(brightness_pct)
+            self.temperature_k.append(temperature_k)
+
+        self.color_temp: list[int] = [
+            round(1000000 / temperature_k) for temperature_k in self.temperature_k
+        ]
+
+    @staticmethod
+    def minute_of_day(now: datetime.datetime | datetime.time) -> int:
+        return now.hour * 60 + now.minute
+
+    def brightness_table(self, profile: str) -> list[int]:
+        """Return the per-minute device brightness table for a brightness profile."""
+        table = self._brightness_by_profile.get(profile)
+        if table is None:
+            table = [map_brightness(profile, pct) for pct in self.brightness_pct]
+            self._brightness_by_profile[profile] = table
+        return table
+
+    def minutes_until_change(
+        self, profile: str, minute: int, brightness: int, color_temp: int
+    ) -> int | None:
+        """Return minutes until the target significantly differs from the given one.
+
+        Returns None if the target stays within the change threshold for the
+        whole day, which is the case for a flat schedule.
+        """
+        key = (profile, minute, brightness, color_temp)
+        if key in self._next_change_cache:
+            return self._next_change_cache[key]
+
+        brightness_table = self.brightness_table(profile)
+        minutes: int | None = None
+        for offset in range(1, MINUTES_PER_DAY + 1):
+            index = (minute + offset) % MINUTES_PER_DAY
+            if is_significant_change(
+                brightness,
+                color_temp,
+                brightness_table[index],
+                self.color_temp[index],
+            ):
+                minutes = offset
+                break
+
+        # Circuits sharing a profile mostly hold the same target, so the cache
+        # stays small; it is only reset to bound memory on pathological input.
+        if len(self._next_change_cache) > 10000:
+            self._next_change_cache.clear()
+        self._next_change_cache[key] = minutes
+        return minutes
+
+    def minutes_until_breakpoint(self, minute: int) -> int:
+        """Return minutes until the next transition start or end after this minute."""
+        index = bisect.bisect_right(self._breakpoints, minute)
+        if index < len(self._breakpoints):
+            return self._breakpoints[index] - minute
+        return self._breakpoints[0] + MINUTES_PER_DAY - minute
+
+    def transition_minutes(self, profile: str, minute: int, max_minutes: int) -> int:
+        """Return how long a single device transition starting at this minute can run.
+
+        The transition never crosses the next breakpoint or exceeds max_minutes,
+        and a linear ramp between its endpoints must stay within the change
+        threshold of the table at every minute in between (brightness curves
+        and mireds are not linear). Returns 0 if the target does not change
+        significantly before the next breakpoint.
+        """
+        key = (profile, minute, max_minutes)
+        if key in self._transition_cache:
+            return self._transition_cache[key]
+
+        brightness_table = self.brightness_table(profile)
+        limit = min(max_minutes, self.minutes_until_breakpoint(minute))
+        span = 0
+        for end in range(limit, 0, -1):
+            if self._tracks_linear_ramp(brightness_table, minute, end):
+                span = end
+                break
+
+        end_index = (minute + span) % MINUTES_PER_DAY
+        if span and not is_significant_change(
+            brightness_table[minute],
+            self.color_temp[minute],
+            brightness_table[end_index],
+            self.color_temp[end_index],
+        ):
+            span = 0
+
+        if len(self._transition_cache) > 10000:
+            self._transition_cache.clear()
+        self._transition_cache[key] = span
+        return span
+
+    def _tracks_linear_ramp(
+        self, brightness_table: list[int], minute: int, span: int
+    ) -> bool:
+        end_index = (minute + span) % MINUTES_PER_DAY
+        start = (brightness_table[minute], self.color_temp[minute])
+        end = (brightness_table[end_index], self.color_temp[end_index])
+        for offset in range(1, span):
+            index = (minute + offset) % MINUTES_PER_DAY
+            elapsed_pct = offset / span
+            if is_significant_change(
+                round(self._apply_transition(start[0], end[0], elapsed_pct)),
+                round(self._apply_transition(start[1], end[1], elapsed_pct)),
+                brightness_table[index],
+                self.color_temp[index],
+            ):
+                return False
+        return True
+
+    def _evaluate(self, current_minutes: int) -> tuple[float, int]:
+        """Get brightness and temperature from the schedule for a minute of the day.
+
+        Returns:
+            tuple: (brightness_percentage, temperature_kelvin)
+        """
+        schedule = self._entries
+
+        for i, next_entry in enumerate(schedule):
+            is_first_entry = i == 0
+            next_minutes = time_to_minutes(next_entry.time)
+            prev_entry = schedule[-1] if is_first_entry else schedule[i - 1]
+            prev_minutes = time_to_minutes(prev_entry.time)
+            transition_minutes = duration_to_minutes(next_entry.transition)
+
+            if is_first_entry:
+                prev_minutes -= MINUTES_PER_DAY  # wrap backwards to previous day
+
+            if current_minutes < prev_minutes or current_minutes > next_minutes:
+                continue
+
+            if transition_minutes > 0:
+                transition_elapsed_pct = max(
+                    0.0,
+                    1 - ((next_minutes - current_minutes) / float(transition_minutes)),
+                )
+            else:
+                transition_elapsed_pct = 1.0 if current_minutes >= next_minutes else 0.0
+
+            return (
+                float(
+                    self._apply_transition(
+                        prev_entry.brightness / 100.0,
+                        next_entry.brightness / 100.0,
+                        transition_elapsed_pct,
+                    )
+                ),
+                int(
+                    self._apply_transition(
+                        prev_entry.temperature,
+                        next_entry.temperature,
+                        transition_elapsed_pct,
+                    )
+                ),
+            )
+
+        return schedule[-1].brightness / 100.0, schedule[-1].temperature
+
+    def _apply_transition(
+        self, start_value: int | float, end_value: int | float, elapsed_pct: float
+    ) -> int | float:
+        value = start_value + (end_value - start_value) * elapsed_pct
+        if isinstance(start_value, int):
+            return round(value)
+        return value
@@ -0,0 +1,247 @@
+"""Run each zigbee2mqtt coordinator in its own worker process.
+
+With `shard_by_base_topic` enabled, the add-on process becomes a supervisor:
+it starts `python -m src.main --worker <base topic>` for each base topic, so
+every coordinator gets its own MQTT connection, event loop and GIL, and a
+pairing storm or long reset on one can't hold up commands to the others.
+Workers serve their status on their own port, which the supervisor polls to
+aggregate health and circuit counts, and restarts workers that exit.
+"""
+
+import asyncio
+import collections
+import datetime
+import json
+import logging
+import sys
+import typing
+
+from . import status
+
+WORKER_PORT_BASE = 8788
+POLL_INTERVAL_SECONDS = 10
+REQUEST_TIMEOUT_SECONDS = 5
+STOP_TIMEOUT_SECONDS = 10
+MIN_RESTART_DELAY_SECONDS = 1
+MAX_RESTART_DELAY_SECONDS = 60
+
+
+async def get_json(port: int, path: str) -> typing.Any:
+    """GET a status document from a worker on this host; None unless it is 200 OK."""
+    reader, writer = await asyncio.wait_for(
+        asyncio.open_connection("127.0.0.1", port), REQUEST_TIMEOUT_SECONDS
+    )
+    try:
+        request = f"GET {path} HTTP/1.1\r\nHost: 127.0.0.1\r\nConnection: close\r\n\r\n"
+        writer.write(request.encode("latin-1"))
+        response = await asyncio.wait_for(reader.read(), REQUEST_TIMEOUT_SECONDS)
+    finally:
+        writer.close()
+
+    head, _, body = response.partition(b"\r\n\r\n")
+    if not head.startswith(b"HTTP/1.1 200"):
+        return None
+    return json.loads(body)
+
+
+class Worker:
+    """A worker process for one base topic and what it last reported."""
+
+    def __init__(self, base_topic: str, port: int):
+        self.base_topic = base_topic
+        self.port = port
+        self.process: asyncio.subprocess.Process | None = None
+        self.restarts = 0
+        self.started_at: datetime.datetime | None = None
+        # Why the worker last stopped or failed to start
+        self.last_error: str | None = None
+        # The worker's /status document and its apps' summaries
+        self.status: dict[str, typing.Any] | None = None
+        self.app_summaries: dict[str, dict[str, typing.Any]] = {}
+        self.polled_at: datetime.datetime | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.process is not None and self.process.returncode is None
+
+    def is_healthy(self, now: datetime.datetime) -> bool:
+        return (
+            self.running
+            and self.status is not None
+            and self.status.get("healthy", False)
+            and self.polled_at is not None
+            and now - self.polled_at
+            < datetime.timedelta(seconds=3 * POLL_INTERVAL_SECONDS)
+        )
+
+
+class Supervisor:
+    """Start, restart and poll one worker process per base topic."""
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        board: status.StatusBoard,
+        base_topics: list[str],
+        *,
+        port_base: int = WORKER_PORT_BASE,
+        on_change: typing.Callable[[], None] | None = None,
+    ):
+        self.logger = logger
+        self._board = board
+        self._on_change = on_change or (lambda: None)
+        self.workers = [
+            Worker(base_topic, port_base + index)
+            for index, base_topic in enumerate(base_topics)
+        ]
+        self._tasks: list[asyncio.Task] = []
+        self._stopping = False
+
+    def start(self) -> None:
+        for worker in self.workers:
+            self._tasks.append(asyncio.create_task(self._supervise(worker)))
+        self._tasks.append(asyncio.create_task(self._poll_loop()))
+
+    async def stop(self) -> None:
+        """Ask every worker to shut down, killing those that don't in time."""
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+
+        running = [
+            worker.process
+            for worker in self.workers
+            if worker.running and worker.process is not None
+        ]
+        for process in running:
+            process.terminate()
+        for process in running:
+            try:
+                await asyncio.wait_for(process.wait(), STOP_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"Worker {process.pid} did not stop; killing it")
+                process.kill()
+                await process.wait()
+
+    def is_healthy(self) -> bool:
+        if not self.workers:
+            return False
+        now = datetime.datetime.now()
+        return all(worker.is_healthy(now) for worker in self.workers)
+
+    async def _supervise(self, worker: Worker) -> None:
+        """Run a worker, restarting it with backoff whenever it exits."""
+        delay = MIN_RESTART_DELAY_SECONDS
+        while not self._stopping:
+            try:
+                worker.process = await asyncio.create_subprocess_exec(
+                    sys.executable,
+                    "-m",
+                    "src.main",
+                    "--worker",
+                    worker.base_topic,
+                    "--port",
+                    str(worker.port),
+                )
+            except OSError as e:
+                self.logger.error(
+                    f"Failed to start worker for {worker.base_topic}: {e}; "
+                    f"retrying in {delay}s"
+                )
+                worker.last_error = f"failed to start: {e}"
+                self._publish_worker(worker)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, MAX_RESTART_DELAY_SECONDS)
+                continue
+
+            worker.started_at = datetime.datetime.now()
+            self.logger.info(
+                f"Started worker {worker.process.pid} for {worker.base_topic}"
+            )
+            self._publish_worker(worker)
+
+            returncode = await worker.process.wait()
+            if self._stopping:
+                return
+
+            # A worker that ran for a while gets restarted promptly again
+            if datetime.datetime.now() - worker.started_at > datetime.timedelta(
+                seconds=MAX_RESTART_DELAY_SECONDS
+            ):
+                delay = MIN_RESTART_DELAY_SECONDS
+            self.logger.error(
+                f"Worker for {worker.base_topic} exited with {returncode}; "
+                f"restarting in {delay}s"
+            )
+            worker.restarts += 1
+            worker.last_error = f"exited with {returncode}"
+            worker.status = None
+            self._publish_worker(worker)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RESTART_DELAY_SECONDS)
+
+    async def _poll_loop(self) -> None:
+        while True:
+            await asyncio.gather(*[self._poll(worker) for worker in self.workers])
+            self._publish_apps()
+            self._on_change()
+            await asyncio.sleep(POLL_INTERVAL_SECONDS)
+
+    async def _poll(self, worker: Worker) -> None:
+        if not worker.running:
+            return
+        try:
+            worker.status = await get_json(worker.port, "/status")
+            worker.app_summaries = {}
+            for app_name, app in (worker.status or {}).get("apps", {}).items():
+                summary = await get_json(worker.port, app["status"])
+                if summary is not None:
+                    worker.app_summaries[app_name] = summary
+            worker.polled_at = datetime.datetime.now()
+        except (OSError, asyncio.TimeoutError, ValueError) as e:
+            # Still starting up, or stuck; it will show as unhealthy
+            self.logger.debug(f"Failed to poll worker for {worker.base_topic}: {e}")
+        self._publish_worker(worker)
+
+    def _publish_worker(self, worker: Worker) -> None:
+        self._board.publish(
+            f"/status/workers/{worker.base_topic}",
+            {
+                "base_topic": worker.base_topic,
+                "pid": worker.process.pid if worker.process else None,
+                "running": worker.running,
+                "healthy": worker.is_healthy(datetime.datetime.now()),
+                "started_at": worker.started_at,
+                "restarts": worker.restarts,
+                "last_error": worker.last_error,
+                "polled_at": worker.polled_at,
+                "url": f"http://127.0.0.1:{worker.port}/status",
+                "status": worker.status,
+                "apps": worker.app_summaries,
+            },
+        )
+
+    def _publish_apps(self) -> None:
+        """Publish each app's circuit counts summed across the workers."""
+        circuits: collections.Counter[str] = collections.Counter()
+        health: dict[str, collections.Counter[str]] = {}
+        coordinators: dict[str, dict[str, str]] = {}
+        for worker in self.workers:
+            for app_name, summary in worker.app_summaries.items():
+                circuits[app_name] += summary.get("circuits", 0)
+                health.setdefault(app_name, collections.Counter()).update(
+                    summary.get("health", {})
+                )
+                coordinators.setdefault(app_name, {})[
+                    worker.base_topic
+                ] = f"/status/workers/{worker.base_topic}"
+
+        for app_name, app_health in health.items():
+            self._board.publish(
+                f"/status/apps/{app_name}",
+                {
+                    "circuits": circuits[app_name],
+                    "health": dict(app_health),
+                    "coordinators": coordinators[app_name],
+                },
+            )
@@ -0,0 +1,433 @@
+"""Run LightsApp against simulated devices in virtual time.
+
+Drives a day (or more) of schedule in seconds and reports how many commands
+were sent, the message rate each coordinator saw, and the CPU time spent
+evaluating the schedule:
+
+    python -m src.simulation --config /config/lights.yaml --days 1
+    python -m src.simulation --circuits 80 --coordinators 2 --days 7
+"""
+
+import argparse
+import asyncio
+import collections
+import datetime
+import functools
+import logging
+import os
+import tempfile
+import time
+import typing
+
+import pydantic
+import yaml
+
+from . import clocks, lights_app, pacing, zigbee
+
+DEFAULT_SCHEDULE = [
+    {"time": "06:00", "brightness": 20, "temperature": 2700, "transition": "30m"},
+    {"time": "08:00", "brightness": 80, "temperature": 4000, "transition": "1h"},
+    {"time": "22:00", "brightness": 10, "temperature": 2200, "transition": "2h"},
+]
+
+
+class SimulationReport(pydantic.BaseModel):
+    circuits: int
+    simulated_seconds: float
+    wall_seconds: float
+    commands: dict[str, int]
+    messages_by_topic: dict[str, int]
+    peak_messages_per_second_by_topic: dict[str, int]
+    schedule_cpu_seconds: float
+
+    def format(self) -> str:
+        lines = [
+            f"Simulated {datetime.timedelta(seconds=self.simulated_seconds)} of "
+            f"{self.circuits} circuits in {self.wall_seconds:.2f}s",
+            f"Commands: {sum(self.commands.values())} "
+            + ", ".join(f"{k}={v}" for k, v in sorted(self.commands.items())),
+        ]
+        for topic, messages in sorted(self.messages_by_topic.items()):
+            lines.append(
+                f"  {topic}: {messages} messages, "
+                f"{messages / self.simulated_seconds:.4f}/s average, "
+                f"{self.peak_messages_per_second_by_topic[topic]}/s peak"
+            )
+        lines.append(
+            f"Schedule evaluation CPU: {self.schedule_cpu_seconds * 1000:.1f}ms"
+        )
+        return "\n".join(lines)
+
+
+def generate_config(circuits: int, coordinators: int) -> dict:
+    """Generate a lights config with two lights and a hardwired switch per circuit."""
+    config_circuits = []
+    for i in range(circuits):
+        coordinator = chr(ord("a") + i % coordinators)
+        config_circuits.append(
+            {
+                "id": f"circuit_{i}",
+                "group_id": f"{coordinator}-{i + 1}",
+                "lights": [{"ieee": _ieee(i, 1)}, {"ieee": _ieee(i, 2)}],
+                "switches": [{"ieee": _ieee(i, 0), "type": "hardwired"}],
+            }
+        )
+    return {"circuits": config_circuits, "schedule": DEFAULT_SCHEDULE}
+
+
+def _ieee(circuit: int, device: int) -> str:
+    value = f"{circuit:012x}{device:04x}"
+    return ":".join(value[i : i + 2] for i in range(0, 16, 2))
+
+
+class SimulatedZigBee:
+    """In-memory stand-in for ZigBeeClient whose devices always respond.
+
+    Commands update member devices after a fixed latency and notify state
+    listeners, like zigbee2mqtt state messages would. Every MQTT message the
+    real client would publish is counted per base topic.
+    """
+
+    def __init__(
+        self,
+        clock: clocks.Clock,
+        config: lights_app.LightsConfig,
+        *,
+        latency: float = 0.05,
+        light_model: str | None = None,
+    ):
+        self._clock = clock
+        self._latency = latency
+        self._listeners: list[zigbee.StateListener] = []
+        self._devices_by_ieee: dict[str, zigbee.ZigBeeDevice] = {}
+        self._groups_by_id: dict[str, zigbee.ZigBeeGroup] = {}
+        self._members_by_group: dict[str, list[zigbee.ZigBeeDevice]] = {}
+
+        self.commands: collections.Counter[str] = collections.Counter()
+        self.messages_by_topic: collections.Counter[str] = collections.Counter()
+        self.messages_by_second: dict[str, collections.Counter[int]] = (
+            collections.defaultdict(collections.Counter)
+        )
+
+        for circuit in config.circuits:
+            base_topic = f"zigbee2mqtt-{circuit.group_id[0]}"
+            group = zigbee.ZigBeeGroup(
+                base_topic=base_topic,
+                id=int(circuit.group_id.split("-")[-1]),
+                friendly_name=circuit.friendly_name,
+            )
+            self._groups_by_id[circuit.group_id] = group
+            self._members_by_group[group.friendly_name] = [
+                self._add_device(base_topic, light.ieee, "Router", light_model)
+                for light in circuit.lights
+            ]
+            for switch in circuit.switches:
+                self._add_device(base_topic, switch.ieee, "Router", None)
+
+    def _add_device(
+        self,
+        base_topic: str,
+        ieee: str,
+        type: typing.Literal["Coordinator", "Router", "EndDevice", "Unknown"],
+        model_id: str | None,
+    ) -> zigbee.ZigBeeDevice:
+        if ieee not in self._devices_by_ieee:
+            self._devices_by_ieee[ieee] = zigbee.ZigBeeDevice(
+                base_topic=base_topic,
+                type=type,
+                ieee_address=f"0x{ieee.replace(':', '')}",
+                network_address=len(self._devices_by_ieee) + 1,
+                friendly_name=ieee,
+                interview_completed=True,
+                interviewing=False,
+                supported=True,
+                model_id=model_id,
+                state=zigbee.ZigBeeDeviceState(
+                    updated_at=self._clock.now(),
+                    properties={"state": "ON", "linkquality": 120},
+                ),
+            )
+        return self._devices_by_ieee[ieee]
+
+    async def initialize(self) -> None:
+        pass
+
+    def add_state_listener(self, listener: zigbee.StateListener) -> None:
+        self._listeners.append(listener)
+
+    def add_announce_listener(self, listener: zigbee.AnnounceListener) -> None:
+        pass
+
+    def get_device_by_ieee(self, ieee: str) -> zigbee.ZigBeeDevice:
+        return self._devices_by_ieee[ieee]
+
+    def get_devices_by_ieee(self, ieees: list[str]) -> list[zigbee.ZigBeeDevice]:
+        return [self._devices_by_ieee[ieee] for ieee in ieees]
+
+    def get_group_by_id(self, group_id: str) -> zigbee.ZigBeeGroup:
+        return self._groups_by_id[group_id]
+
+    async def set_property(
+        self,
+        device: zigbee.ZigBeeDevice | zigbee.ZigBeeGroup,
+        property: str,
+        value: typing.Any,
+        *,
+        transition: int = 0,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> None:
+        await self._pace(pacer, device.base_topic, 2)
+        self.commands[property] += 1
+        self._count(device.base_topic, 2)  # the set and the follow-up get
+        self._report_later(device, {property: value})
+
+    def request_properties(
+        self,
+        device: zigbee.ZigBeeDevice | zigbee.ZigBeeGroup,
+        properties: list[str],
+    ) -> None:
+        self._count(device.base_topic)
+        self._report_later(device, {})
+
+    async def set_and_verify_property(
+        self,
+        device: zigbee.ZigBeeDevice,
+        property: str,
+        value: typing.Any,
+        *,
+        transition: int = 0,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> bool:
+        await self.set_property(
+            device, property, value, transition=transition, pacer=pacer
+        )
+        await self._clock.sleep(self._latency)
+        return True
+
+    async def get_ungrouped_devices(
+        self,
+        group: zigbee.ZigBeeGroup,
+        devices_to_check: list[zigbee.ZigBeeDevice],
+        *,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> list[zigbee.ZigBeeDevice]:
+        await self._pace(pacer, group.base_topic)
+        self._count(group.base_topic)
+        await self._clock.sleep(self._latency)
+        return []
+
+    async def get_unresponsive_devices(
+        self,
+        devices_to_check: list[zigbee.ZigBeeDevice],
+        timeout: int = 120,
+        *,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> list[zigbee.ZigBeeDevice]:
+        for device in devices_to_check:
+            await self._pace(pacer, device.base_topic)
+            self._count(device.base_topic)
+        await self._clock.sleep(self._latency)
+        return []
+
+    async def permit_join(
+        self,
+        device: zigbee.ZigBeeDevice,
+        duration: int = 60,
+        *,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> bool:
+        await self._pace(pacer, device.base_topic)
+        self._count(device.base_topic)
+        return True
+
+    async def add_to_group(
+        self,
+        device: zigbee.ZigBeeDevice,
+        group: zigbee.ZigBeeGroup,
+        *,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> bool:
+        await self._pace(pacer, device.base_topic)
+        self._count(device.base_topic)
+        return True
+
+    async def _pace(
+        self, pacer: pacing.TopicPacer | None, base_topic: str, messages: int = 1
+    ) -> None:
+        if pacer is not None:
+            await pacer.acquire(base_topic, messages)
+
+    def _count(self, base_topic: str, messages: int = 1) -> None:
+        second = int(asyncio.get_running_loop().time())
+        self.messages_by_topic[base_topic] += messages
+        self.messages_by_second[base_topic][second] += messages
+
+    def _report_later(
+        self, device: zigbee.ZigBeeDevice | zigbee.ZigBeeGroup, data: dict
+    ) -> None:
+        if isinstance(device, zigbee.ZigBeeGroup):
+            members = self._members_by_group.get(device.friendly_name, [])
+        else:
+            members = [device]
+
+        loop = asyncio.get_running_loop()
+        for member in members:
+            loop.call_later(self._latency, self._report, member, data)
+
+    def _report(self, device: zigbee.ZigBeeDevice, data: dict) -> None:
+        ieee = device.friendly_name
+        update = device.state.update
+        previous_properties = device.state.properties
+        previous_updated_at = device.state.updated_at
+        device.state.properties = device.state.properties | data
+        device.state.updated_at = self._clock.now()
+        device.state.update = asyncio.Event()
+        update.set()
+
+        for listener in self._listeners:
+            listener(ieee, device, previous_properties, previous_updated_at)
+
+
+class _CpuTimer:
+    def __init__(self):
+        self.seconds = 0.0
+
+    def wrap(self, function: typing.Callable) -> typing.Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.process_time()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.seconds += time.process_time() - start
+
+        return wrapper
+
+
+async def _simulate(
+    config_file: str,
+    *,
+    days: float,
+    start: datetime.datetime,
+    latency: float,
+    light_model: str | None,
+    app_config: dict,
+) -> SimulationReport:
+    clock = clocks.LoopClock(start)
+    with open(config_file, "r") as file:
+        config = lights_app.LightsConfig(**yaml.safe_load(file))
+
+    devices = SimulatedZigBee(clock, config, latency=latency, light_model=light_model)
+    base_topics = sorted({f"zigbee2mqtt-{c.group_id[0]}" for c in config.circuits})
+
+    with tempfile.TemporaryDirectory() as state_dir:
+        app = lights_app.LightsApp(
+            logging.getLogger("scripts.simulation"),
+            addon_config={"zigbee_base_topics": base_topics},
+            app_config=app_config
+            | {
+                "config_file": config_file,
+                "state_file": os.path.join(state_dir, "lights_last_sent.json"),
+            },
+            clock=clock,
+            zigbee_client=typing.cast(zigbee.ZigBeeClient, devices),
+        )
+
+        cpu = _CpuTimer()
+        for method in [
+            "_compile_lighting",
+            "_compile_circuit_lighting",
+            "_calculate_circuit_lighting",
+            "_plan_circuit_lighting",
+            "_needs_lighting_update",
+            "_schedule_next_lighting_change",
+        ]:
+            setattr(app, method, cpu.wrap(getattr(app, method)))
+
+        wall_start = time.perf_counter()
+        await app.initialize()
+        await asyncio.sleep(days * 24 * 60 * 60)
+        wall_seconds = time.perf_counter() - wall_start
+
+        current = asyncio.current_task()
+        tasks = [task for task in asyncio.all_tasks() if task is not current]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return SimulationReport(
+        circuits=len(config.circuits),
+        simulated_seconds=days * 24 * 60 * 60,
+        wall_seconds=wall_seconds,
+        commands=dict(devices.commands),
+        messages_by_topic=dict(devices.messages_by_topic),
+        peak_messages_per_second_by_topic={
+            topic: max(counts.values())
+            for topic, counts in devices.messages_by_second.items()
+        },
+        schedule_cpu_seconds=cpu.seconds,
+    )
+
+
+def run_simulation(
+    config_file: str,
+    *,
+    days: float = 1,
+    start: datetime.datetime | None = None,
+    latency: float = 0.05,
+    light_model: str | None = None,
+    app_config: dict | None = None,
+) -> SimulationReport:
+    """Run LightsApp for `days` of virtual time and return what it sent."""
+    start = start or datetime.datetime.combine(
+        datetime.date.today(), datetime.time(0, 0)
+    )
+    with asyncio.Runner(loop_factory=clocks.VirtualTimeEventLoop) as runner:
+        return runner.run(
+            _simulate(
+                config_file,
+                days=days,
+                start=start,
+                latency=latency,
+                light_model=light_model,
+                app_config=app_config or {},
+            )
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", help="lights config to simulate")
+    parser.add_argument("--circuits", type=int, default=80)
+    parser.add_argument("--coordinators", type=int, default=2)
+    parser.add_argument("--days", type=float, default=1)
+    parser.add_argument("--start", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--light-model", help="model_id reported by every light")
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level.upper(), logging.WARNING),
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+
+    with tempfile.TemporaryDirectory() as config_dir:
+        config_file = args.config
+        if config_file is None:
+            config_file = os.path.join(config_dir, "lights.yaml")
+            with open(config_file, "w") as file:
+                yaml.safe_dump(generate_config(args.circuits, args.coordinators), file)
+
+        report = run_simulation(
+            config_file,
+            days=args.days,
+            start=args.start,
+            latency=args.latency,
+            light_model=args.light_model,
+        )
+    print(report.format())
+
+
+if __name__ == "__main__":
+    main()
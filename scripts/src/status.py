@@ -0,0 +1,150 @@
+"""Health and status documents served over HTTP from the event loop."""
+
+import asyncio
+import datetime
+import json
+import logging
+import typing
+import urllib.parse
+
+# Seconds a client gets to send its request before the connection is dropped
+REQUEST_TIMEOUT_SECONDS = 5
+MAX_HEADER_LINES = 100
+
+# Handles a GET to a route, given its query parameters: (status, content type, body)
+RouteHandler = typing.Callable[
+    [dict[str, str]], typing.Awaitable[tuple[str, str, bytes]]
+]
+
+
+def _encode_value(value: typing.Any) -> typing.Any:
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot encode {type(value).__name__} as JSON")
+
+
+class StatusBoard:
+    """Status documents keyed by URL path, kept current by event handlers.
+
+    Apps publish or update documents as things happen. A document is encoded
+    to JSON the first time it is read after a change, so polling it is a
+    dictionary lookup however often it happens.
+    """
+
+    def __init__(self):
+        self._documents: dict[str, dict[str, typing.Any]] = {}
+        self._encoded: dict[str, bytes] = {}
+
+    def publish(self, path: str, document: dict[str, typing.Any]) -> None:
+        """Replace the document at a path."""
+        self._documents[path] = document
+        self._encoded.pop(path, None)
+
+    def update(self, path: str, **fields: typing.Any) -> None:
+        """Change some fields of the document at a path, creating it if needed."""
+        self._documents.setdefault(path, {}).update(fields)
+        self._encoded.pop(path, None)
+
+    def remove(self, path: str) -> None:
+        self._documents.pop(path, None)
+        self._encoded.pop(path, None)
+
+    def get(self, path: str) -> bytes | None:
+        """Return the JSON encoding of the document at a path, if there is one."""
+        encoded = self._encoded.get(path)
+        if encoded is None:
+            document = self._documents.get(path)
+            if document is None:
+                return None
+            encoded = self._encoded[path] = json.dumps(
+                document, default=_encode_value
+            ).encode("utf-8")
+        return encoded
+
+
+class StatusServer:
+    """Minimal HTTP/1.1 server for the watchdog and status documents.
+
+    GET / and /health answer "connected" or "disconnected" for the Supervisor
+    watchdog, paths added with add_route() are answered by their handler, and
+    any other path is looked up on the status board.
+    """
+
+    def __init__(
+        self,
+        logger: logging.Logger,
+        board: StatusBoard,
+        is_healthy: typing.Callable[[], bool],
+    ):
+        self.logger = logger
+        self._board = board
+        self._is_healthy = is_healthy
+        self._server: asyncio.Server | None = None
+        self._routes: dict[str, RouteHandler] = {}
+
+    def add_route(self, path: str, handler: RouteHandler) -> None:
+        self._routes[path] = handler
+
+    async def start(self, host: str, port: int) -> None:
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            async with asyncio.timeout(REQUEST_TIMEOUT_SECONDS):
+                request_line = await reader.readline()
+                for _ in range(MAX_HEADER_LINES):
+                    if (await reader.readline()) in (b"\r\n", b"\n", b""):
+                        break
+
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+            status, content_type, body = await self._respond(method, target)
+            writer.write(
+                (
+                    f"HTTP/1.1 {status}\r\n"
+                    f"Content-Type: {content_type}\r\n"
+                    f"Content-Length: {len(body)}\r\n"
+                    "Cache-Control: no-store\r\n"
+                    "Connection: close\r\n\r\n"
+                ).encode("latin-1")
+            )
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except (TimeoutError, ValueError, ConnectionError):
+            pass
+        except Exception as e:
+            self.logger.debug(f"Error serving status request: {e}")
+        finally:
+            writer.close()
+
+    async def _respond(self, method: str, target: str) -> tuple[str, str, bytes]:
+        if method not in ("GET", "HEAD"):
+            return "405 Method Not Allowed", "text/plain; charset=utf-8", b""
+
+        path, _, query = target.partition("?")
+        path = path.rstrip("/") or "/"
+        if path in ("/", "/health"):
+            if self._is_healthy():
+                return "200 OK", "text/plain; charset=utf-8", b"connected\n"
+            return (
+                "500 Internal Server Error",
+                "text/plain; charset=utf-8",
+                b"disconnected\n",
+            )
+
+        handler = self._routes.get(path)
+        if handler is not None:
+            return await handler(dict(urllib.parse.parse_qsl(query)))
+
+        body = self._board.get(path)
+        if body is None:
+            return "404 Not Found", "application/json", b'{"error": "not found"}'
+        return "200 OK", "application/json", body
@@ -11,4 +11,7 @@ def singleton(cls):
                 instances[cls] = cls(*args, **kwargs)
             return instances[cls]
 
+    # Keep the class reachable for callers that need an independent instance,
+    # such as benchmarks that build several clients in one process.
+    get_instance.__wrapped__ = cls  # type: ignore[attr-defined]
     return get_instance
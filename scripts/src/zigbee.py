@@ -7,7 +7,10 @@ import typing
 
 import pydantic
 
-from . import mqtt, utils
+from . import clocks, mqtt, pacing, utils
+
+# Zigbee transition times are an uint16 in tenths of a second (0xFFFF is reserved)
+MAX_TRANSITION_SECONDS = 6553
 
 
 class ZigBeeDeviceState(pydantic.BaseModel):
@@ -44,23 +47,45 @@ class ZigBeeGroup(pydantic.BaseModel):
     friendly_name: str
 
 
+# Called on the event loop as (ieee, device, previous properties, previous updated_at)
+StateListener = typing.Callable[
+    [str, ZigBeeDevice, dict[str, typing.Any], datetime.datetime | None], None
+]
+# Called on the event loop as (ieee, device) when a device announces itself
+AnnounceListener = typing.Callable[[str, ZigBeeDevice], None]
+
+
 @utils.singleton
 class ZigBeeClient:
 
     _lock = asyncio.Lock()
     _is_initialized: bool = False
 
-    _mqtt: mqtt.MqttClient
+    _mqtt: mqtt.Client
 
     _base_topics: list[str]
     _devices_by_ieee: dict[str, ZigBeeDevice]
     _devices_ieees_by_friendly_name: dict[str, str]
     _groups_by_id: dict[str, ZigBeeGroup]
+    _state_listeners: list[StateListener]
+    _announce_listeners: list[AnnounceListener]
+    _loop: asyncio.AbstractEventLoop
 
-    def __init__(self, logger: logging.Logger, addon_config: dict):
+    def __init__(
+        self,
+        logger: logging.Logger,
+        addon_config: dict,
+        *,
+        clock: clocks.Clock | None = None,
+        mqtt_client: mqtt.Client | None = None,
+    ):
         self.logger = logger
         self.addon_config = addon_config
+        self._clock = clock or clocks.Clock()
+        self._mqtt_client = mqtt_client
         self._base_topics = addon_config["zigbee_base_topics"]
+        self._state_listeners = []
+        self._announce_listeners = []
 
     async def initialize(self) -> None:
         """Initialize the app and its components."""
@@ -71,7 +96,10 @@ class ZigBeeClient:
             if self._is_initialized:
                 return
 
-            self._mqtt = mqtt.MqttClient(self.logger, self.addon_config)
+            self._loop = asyncio.get_running_loop()
+            self._mqtt = self._mqtt_client or mqtt.MqttClient(
+                self.logger, self.addon_config
+            )
             await self._mqtt.initialize()
 
             self._devices_by_ieee = {}
@@ -107,6 +135,9 @@ class ZigBeeClient:
                     raise TimeoutError("MQTT devices reception timeout")
 
                 self._mqtt.subscribe(f"{base_topic}/+", self._on_state_received())
+                self._mqtt.subscribe(
+                    f"{base_topic}/bridge/event", self._on_bridge_event_received()
+                )
 
         self._is_initialized = True
 
@@ -139,7 +170,7 @@ class ZigBeeClient:
                         ] = ieee
                 event.set()
             except json.JSONDecodeError as e:
-                self.logger.error(f"Error decoding JSON from {topic}: {e}")
+                self.logger.error("Error decoding JSON from %s: %s", topic, e)
 
         return callback
 
@@ -154,7 +185,7 @@ class ZigBeeClient:
                     )
                 event.set()
             except json.JSONDecodeError as e:
-                self.logger.error(f"Error decoding JSON from {topic}: {e}")
+                self.logger.error("Error decoding JSON from %s: %s", topic, e)
 
         return callback
 
@@ -170,15 +201,51 @@ class ZigBeeClient:
                 device = self._devices_by_ieee[ieee]
                 data = json.loads(payload)
                 update = device.state.update
+                previous_properties = device.state.properties
+                previous_updated_at = device.state.updated_at
                 device.state.properties = device.state.properties | data
-                device.state.updated_at = datetime.datetime.now()
+                device.state.updated_at = self._clock.now()
                 device.state.update = asyncio.Event()
                 update.set()
+
+                for listener in self._state_listeners:
+                    self._loop.call_soon_threadsafe(
+                        listener, ieee, device, previous_properties, previous_updated_at
+                    )
+            except json.JSONDecodeError as e:
+                self.logger.error("Error decoding JSON from %s: %s", topic, e)
+
+        return callback
+
+    def add_state_listener(self, listener: StateListener) -> None:
+        """Register a callback to run on the event loop after each device state update."""
+        self._state_listeners.append(listener)
+
+    def _on_bridge_event_received(self):
+        def callback(topic: str, payload: str):
+            """Callback for bridge events, such as devices announcing after power-up."""
+            try:
+                data = json.loads(payload)
+                if data.get("type") != "device_announce":
+                    return
+
+                friendly_name = data.get("data", {}).get("friendly_name")
+                ieee = self._devices_ieees_by_friendly_name.get(friendly_name)
+                if ieee is None:
+                    return
+
+                device = self._devices_by_ieee[ieee]
+                for listener in self._announce_listeners:
+                    self._loop.call_soon_threadsafe(listener, ieee, device)
             except json.JSONDecodeError as e:
-                self.logger.error(f"Error decoding JSON from {topic}: {e}")
+                self.logger.error("Error decoding JSON from %s: %s", topic, e)
 
         return callback
 
+    def add_announce_listener(self, listener: AnnounceListener) -> None:
+        """Register a callback to run on the event loop when a device announces."""
+        self._announce_listeners.append(listener)
+
     def get_device_by_ieee(self, ieee: str) -> ZigBeeDevice:
         """Get a ZigBee device by its IEEE address."""
         return self._devices_by_ieee[ieee]
@@ -205,8 +272,10 @@ class ZigBeeClient:
         value: typing.Any,
         *,
         transition: int = 0,
+        pacer: pacing.TopicPacer | None = None,
     ) -> None:
         data: typing.Any = None
+        transtime = min(transition, MAX_TRANSITION_SECONDS) * 10 if transition else 0
         if property == "brightness":
             data = {
                 "command": {
@@ -214,7 +283,7 @@ class ZigBeeClient:
                     "command": "moveToLevel",
                     "payload": {
                         "level": value,
-                        "transtime": transition * 10 if transition else 0,
+                        "transtime": transtime,
                     },
                 }
             }
@@ -225,7 +294,7 @@ class ZigBeeClient:
                     "command": "moveToColorTemp",
                     "payload": {
                         "colortemp": value,
-                        "transtime": transition * 10 if transition else 0,
+                        "transtime": transtime,
                     },
                 }
             }
@@ -234,11 +303,22 @@ class ZigBeeClient:
                 property: value,
             }
 
+        if pacer is not None:
+            await pacer.acquire(device.base_topic, 2)
         self._mqtt.publish(f"{device.base_topic}/{device.friendly_name}/set", data)
         self._mqtt.publish(
             f"{device.base_topic}/{device.friendly_name}/get", {property: ""}
         )
 
+    def request_properties(
+        self, device: ZigBeeDevice | ZigBeeGroup, properties: list[str]
+    ) -> None:
+        """Ask a device (or every member of a group) to report current values."""
+        self._mqtt.publish(
+            f"{device.base_topic}/{device.friendly_name}/get",
+            {property: "" for property in properties},
+        )
+
     async def set_and_verify_property(
         self,
         device: ZigBeeDevice,
@@ -246,18 +326,24 @@ class ZigBeeClient:
         value: typing.Any,
         *,
         transition: int = 0,
+        pacer: pacing.TopicPacer | None = None,
     ):
         """Set a property on a device and verify it was set correctly."""
         for _ in range(3):
             update = device.state.update
-            await self.set_property(device, property, value, transition=transition)
+            await self.set_property(
+                device, property, value, transition=transition, pacer=pacer
+            )
             for _ in range(10):
                 try:
                     await asyncio.wait_for(update.wait(), 1)
                     break
                 except asyncio.TimeoutError:
-                    self._mqtt.publish(
-                        f"{device.base_topic}/{device.friendly_name}/get", {"state": ""}
+                    await self._publish(
+                        device.base_topic,
+                        f"{device.base_topic}/{device.friendly_name}/get",
+                        {"state": ""},
+                        pacer=pacer,
                     )
 
             if not update.is_set():
@@ -278,13 +364,18 @@ class ZigBeeClient:
         self,
         group: ZigBeeGroup,
         devices_to_check: list[ZigBeeDevice],
+        *,
+        pacer: pacing.TopicPacer | None = None,
     ) -> list[ZigBeeDevice]:
         updates = [(device, device.state.update) for device in devices_to_check]
         ungrouped_devices: list[ZigBeeDevice] = []
 
         for attempt in range(24):
-            self._mqtt.publish(
-                f"{group.base_topic}/{group.friendly_name}/get", {"state": ""}
+            await self._publish(
+                group.base_topic,
+                f"{group.base_topic}/{group.friendly_name}/get",
+                {"state": ""},
+                pacer=pacer,
             )
 
             ungrouped_devices = [
@@ -301,19 +392,26 @@ class ZigBeeClient:
                 return []
 
         self.logger.warning(
-            f"Devices did not respond to group {group.friendly_name} after {attempt + 1} attempts: {','.join([d.friendly_name for d in ungrouped_devices])}"
+            "Devices did not respond to group %s after %d attempts: %s",
+            group.friendly_name,
+            attempt + 1,
+            ",".join([d.friendly_name for d in ungrouped_devices]),
         )
         return ungrouped_devices
 
     async def get_unresponsive_devices(
-        self, devices_to_check: list[ZigBeeDevice], timeout: int = 120
+        self,
+        devices_to_check: list[ZigBeeDevice],
+        timeout: int = 120,
+        *,
+        pacer: pacing.TopicPacer | None = None,
     ) -> list[ZigBeeDevice]:
         return [
             devices_to_check[i]
             for i, responsive in enumerate(
                 await asyncio.gather(
                     *[
-                        self.is_device_responsive(device, timeout=timeout)
+                        self.is_device_responsive(device, timeout=timeout, pacer=pacer)
                         for device in devices_to_check
                     ]
                 )
@@ -322,27 +420,40 @@ class ZigBeeClient:
         ]
 
     async def is_device_responsive(
-        self, device: ZigBeeDevice, timeout: int = 120
+        self,
+        device: ZigBeeDevice,
+        timeout: int = 120,
+        *,
+        pacer: pacing.TopicPacer | None = None,
     ) -> bool:
         update = device.state.update
 
-        end = datetime.datetime.now() + datetime.timedelta(seconds=timeout)
+        end = self._clock.now() + datetime.timedelta(seconds=timeout)
         attempt = 0
-        while datetime.datetime.now() < end:
+        while self._clock.now() < end:
             attempt += 1
-            self._mqtt.publish(
-                f"{device.base_topic}/{device.friendly_name}/get", {"state": ""}
+            await self._publish(
+                device.base_topic,
+                f"{device.base_topic}/{device.friendly_name}/get",
+                {"state": ""},
+                pacer=pacer,
             )
 
             if await self._wait_for(update, 5):
                 return True
 
         self.logger.warning(
-            f"Device {device.friendly_name} is unresponsive after {attempt} attempts"
+            "Device %s is unresponsive after %d attempts", device.friendly_name, attempt
         )
         return False
 
-    async def permit_join(self, device: ZigBeeDevice, duration: int = 60) -> bool:
+    async def permit_join(
+        self,
+        device: ZigBeeDevice,
+        duration: int = 60,
+        *,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> bool:
         return await self._send_bridge_request(
             device.base_topic,
             "permit_join",
@@ -350,9 +461,16 @@ class ZigBeeClient:
                 "time": duration,
                 "device": device.friendly_name,
             },
+            pacer=pacer,
         )
 
-    async def add_to_group(self, device: ZigBeeDevice, group: ZigBeeGroup) -> bool:
+    async def add_to_group(
+        self,
+        device: ZigBeeDevice,
+        group: ZigBeeGroup,
+        *,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> bool:
         return await self._send_bridge_request(
             device.base_topic,
             "group/members/add",
@@ -360,10 +478,16 @@ class ZigBeeClient:
                 "group": group.friendly_name,
                 "device": device.friendly_name,
             },
+            pacer=pacer,
         )
 
     async def _send_bridge_request(
-        self, base_topic: str, topic: str, payload: dict
+        self,
+        base_topic: str,
+        topic: str,
+        payload: dict,
+        *,
+        pacer: pacing.TopicPacer | None = None,
     ) -> bool:
         for attempt in range(3):
             responded = asyncio.Event()
@@ -380,9 +504,11 @@ class ZigBeeClient:
             )
 
             try:
-                self._mqtt.publish(
+                await self._publish(
+                    base_topic,
                     f"{base_topic}/bridge/request/{topic}",
                     payload | {"transaction": transaction},
+                    pacer=pacer,
                 )
 
                 if not await self._wait_for(responded, 15):
@@ -396,6 +522,19 @@ class ZigBeeClient:
             return True
         return False
 
+    async def _publish(
+        self,
+        base_topic: str,
+        topic: str,
+        payload: dict,
+        *,
+        pacer: pacing.TopicPacer | None = None,
+    ) -> None:
+        """Publish, first waiting for a slot in the base topic's budget if paced."""
+        if pacer is not None:
+            await pacer.acquire(base_topic)
+        self._mqtt.publish(topic, payload)
+
     async def _wait_for(self, event: asyncio.Event, timeout: int = 10) -> bool:
         """Wait for an update event with a timeout."""
         try:
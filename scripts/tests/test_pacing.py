@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+
+from src import pacing
+
+
+class TopicPacerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_spaces_messages_on_a_topic(self):
+        pacer = pacing.TopicPacer(4)
+        delays = [pacer.reserve("zigbee2mqtt-a") for _ in range(4)]
+        for delay, expected in zip(delays, [0.0, 0.25, 0.5, 0.75]):
+            self.assertAlmostEqual(delay, expected, delta=0.01)
+
+    async def test_multi_message_commands_reserve_several_slots(self):
+        pacer = pacing.TopicPacer(4)
+        self.assertAlmostEqual(pacer.reserve("zigbee2mqtt-a", 2), 0.0, delta=0.01)
+        self.assertAlmostEqual(pacer.reserve("zigbee2mqtt-a"), 0.5, delta=0.01)
+
+    async def test_topics_have_separate_budgets(self):
+        pacer = pacing.TopicPacer(4)
+        pacer.reserve("zigbee2mqtt-a", 8)
+        self.assertAlmostEqual(pacer.reserve("zigbee2mqtt-b"), 0.0, delta=0.01)
+
+    async def test_idle_time_does_not_build_a_burst_allowance(self):
+        pacer = pacing.TopicPacer(100)
+        pacer.reserve("zigbee2mqtt-a")
+        await asyncio.sleep(0.1)
+        self.assertAlmostEqual(pacer.reserve("zigbee2mqtt-a"), 0.0, delta=0.005)
+        self.assertAlmostEqual(pacer.reserve("zigbee2mqtt-a"), 0.01, delta=0.005)
+
+    async def test_acquire_waits_for_its_slot(self):
+        pacer = pacing.TopicPacer(20)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for _ in range(3):
+            await pacer.acquire("zigbee2mqtt-a")
+        self.assertGreaterEqual(loop.time() - start, 0.1)
+
+    def test_spacing_spreads_commands_across_the_window(self):
+        pacer = pacing.TopicPacer(4)
+        self.assertEqual(pacer.spacing(count=10, messages=2, window=60), 6.0)
+        # Too many commands to fit: the rate budget sets the spacing instead
+        self.assertEqual(pacer.spacing(count=1000, messages=2, window=60), 0.5)
+
+    def test_rejects_non_positive_rates(self):
+        with self.assertRaises(ValueError):
+            pacing.TopicPacer(0)
+
+
+if __name__ == "__main__":
+    unittest.main()
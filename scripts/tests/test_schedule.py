@@ -0,0 +1,123 @@
+import unittest
+
+from src import schedule
+from src.lights_app import LightSchedule
+
+LINEAR = schedule.LINEAR_PROFILE
+
+
+def minutes(time: str) -> int:
+    return schedule.time_to_minutes(time)
+
+
+def day_and_evening() -> schedule.CompiledSchedule:
+    """Full brightness from 07:00 (ramping up from 06:00), 10% from 22:00
+    (ramping down from 21:30), at a constant 4000K."""
+    return schedule.CompiledSchedule(
+        [
+            LightSchedule(
+                time="07:00", brightness=100, temperature=4000, transition="1h"
+            ),
+            LightSchedule(
+                time="22:00", brightness=10, temperature=4000, transition="30m"
+            ),
+        ]
+    )
+
+
+class MinutesUntilChangeTest(unittest.TestCase):
+    def test_flat_stretch_lasts_until_the_next_ramp_starts_moving(self):
+        compiled = day_and_evening()
+        # 255 and 250 mireds are the 08:00 target; the first minute of the
+        # evening ramp (21:31) is the first one that differs by 1%
+        self.assertEqual(
+            compiled.minutes_until_change(LINEAR, minutes("08:00"), 255, 250),
+            minutes("21:31") - minutes("08:00"),
+        )
+
+    def test_wraps_past_midnight(self):
+        compiled = day_and_evening()
+        self.assertEqual(
+            compiled.minutes_until_change(LINEAR, minutes("22:30"), 26, 250),
+            schedule.MINUTES_PER_DAY - minutes("22:30") + minutes("06:01"),
+        )
+
+    def test_compares_against_the_given_target(self):
+        compiled = day_and_evening()
+        # What was last sent is already off from the table
+        self.assertEqual(
+            compiled.minutes_until_change(LINEAR, minutes("08:00"), 128, 250), 1
+        )
+
+    def test_changes_every_minute_during_a_ramp(self):
+        compiled = day_and_evening()
+        minute = minutes("21:40")
+        brightness = compiled.brightness_table(LINEAR)[minute]
+        color_temp = compiled.color_temp[minute]
+        self.assertEqual(
+            compiled.minutes_until_change(LINEAR, minute, brightness, color_temp), 1
+        )
+
+    def test_flat_schedule_never_changes(self):
+        compiled = schedule.CompiledSchedule(
+            [
+                LightSchedule(
+                    time="00:00", brightness=50, temperature=3000, transition="0m"
+                )
+            ]
+        )
+        brightness = compiled.brightness_table(LINEAR)[0]
+        for minute in (0, minutes("12:00"), schedule.MINUTES_PER_DAY - 1):
+            self.assertIsNone(
+                compiled.minutes_until_change(
+                    LINEAR, minute, brightness, compiled.color_temp[0]
+                )
+            )
+
+    def test_cached_result_matches(self):
+        compiled = day_and_evening()
+        first = compiled.minutes_until_change(LINEAR, minutes("08:00"), 255, 250)
+        self.assertEqual(
+            compiled.minutes_until_change(LINEAR, minutes("08:00"), 255, 250), first
+        )
+
+
+class TransitionMinutesTest(unittest.TestCase):
+    def test_spans_a_linear_ramp_up_to_its_end(self):
+        compiled = day_and_evening()
+        self.assertEqual(compiled.transition_minutes(LINEAR, minutes("21:30"), 60), 30)
+        self.assertEqual(compiled.transition_minutes(LINEAR, minutes("06:00"), 120), 60)
+
+    def test_capped_at_max_minutes(self):
+        compiled = day_and_evening()
+        self.assertEqual(compiled.transition_minutes(LINEAR, minutes("21:30"), 10), 10)
+
+    def test_never_crosses_a_breakpoint(self):
+        compiled = day_and_evening()
+        # 15 minutes into the evening ramp, 15 are left before it ends
+        self.assertEqual(compiled.transition_minutes(LINEAR, minutes("21:45"), 60), 15)
+
+    def test_zero_when_nothing_changes_before_the_next_breakpoint(self):
+        compiled = day_and_evening()
+        self.assertEqual(compiled.transition_minutes(LINEAR, minutes("12:00"), 60), 0)
+
+    def test_ramp_stays_within_threshold_of_a_curved_profile(self):
+        compiled = day_and_evening()
+        minute = minutes("06:00")
+        span = compiled.transition_minutes(schedule.ABL_LIGHT_PROFILE, minute, 60)
+        # The morning ramp is linear in percent but not in ABL device levels
+        self.assertTrue(1 < span < 60)
+
+        table = compiled.brightness_table(schedule.ABL_LIGHT_PROFILE)
+        start, end = table[minute], table[minute + span]
+        for offset in range(1, span):
+            ramp = round(start + (end - start) * offset / span)
+            self.assertFalse(
+                schedule.is_significant_change(
+                    ramp, 250, table[minute + offset], compiled.color_temp[minute]
+                )
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()